@@ -0,0 +1,126 @@
+# CPU throughput and accuracy of the embedding backends (PyTorch, ONNX Runtime,
+# int8-quantized ONNX) on the same seeded corpus.
+#
+# Throughput: chunks/sec for document batches and p50 latency of single queries.
+# Accuracy, against the PyTorch baseline:
+#   - cosine agreement: cosine similarity between each chunk's two vectors
+#   - top-k overlap:    share of every query's k nearest chunks that both backends agree on
+# --min-cosine / --min-overlap turn the accuracy check into a gate (exit code 1 on failure),
+# e.g. before switching EMBEDDING_BACKEND on the ingestion nodes.
+# Usage (from the src/ directory):
+#   python -m benchmarks.embedding_backend_benchmark --chunks 2000 --threads 8
+import argparse
+import sys
+import time
+import numpy as np
+from faker import Faker
+from config import Config
+from storage.embedding_backends import BACKEND_TORCH, BACKENDS, build_embedding
+from telemetry import percentile
+
+
+def build_corpus(num_chunks: int, num_queries: int, seed: int) -> tuple[list[str], list[str]]:
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed)
+    chunks = [data_gen.paragraph(nb_sentences=6) for _ in range(num_chunks)]
+    queries = [data_gen.sentence(nb_words=10) for _ in range(num_queries)]
+    return chunks, queries
+
+
+def run_backend(backend: str, chunks: list[str], queries: list[str], batch_size: int, threads: int) -> dict:
+    started = time.perf_counter()
+    model = build_embedding(backend, batch_size=batch_size, threads=threads)
+    # First pass initializes the runtime kernels; not part of the measurement
+    model.get_text_embedding_batch(chunks[:batch_size])
+    load_secs = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunk_vectors = model.get_text_embedding_batch(chunks)
+    embed_secs = time.perf_counter() - started
+
+    query_latencies = []
+    query_vectors = []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(model.get_query_embedding(query))
+        query_latencies.append(time.perf_counter() - started)
+
+    return {
+        "load_secs": load_secs,
+        "chunks_per_sec": len(chunks) / embed_secs,
+        "query_p50_ms": percentile(query_latencies, 50) * 1000,
+        "chunks": _normalize(chunk_vectors),
+        "queries": _normalize(query_vectors),
+    }
+
+
+def _normalize(vectors: list[list[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def compare(baseline: dict, candidate: dict, top_k: int) -> dict:
+    """
+    Cosine agreement per chunk and top-k neighbour overlap per query against the baseline.
+    """
+    cosines = np.sum(baseline["chunks"] * candidate["chunks"], axis=1)
+
+    def top_ids(result):
+        scores = result["queries"] @ result["chunks"].T
+        return np.argsort(-scores, axis=1)[:, :top_k]
+
+    overlaps = [
+        len(set(expected) & set(found)) / top_k
+        for expected, found in zip(top_ids(baseline), top_ids(candidate))
+    ]
+    return {
+        "cosine_mean": float(cosines.mean()),
+        "cosine_min": float(cosines.min()),
+        "topk_overlap": float(np.mean(overlaps)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on CPU.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=Config.EMBEDDING_THREADS, help="Intra-op threads (0 = runtime default)")
+    parser.add_argument("--top-k", type=int, default=Config.RETRIEVAL_TOP_K)
+    parser.add_argument("--min-cosine", type=float, default=0.0, help="Fail if the mean cosine agreement is lower")
+    parser.add_argument("--min-overlap", type=float, default=0.0, help="Fail if the mean top-k overlap is lower")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks, queries = build_corpus(args.chunks, args.queries, args.seed)
+    print(f"[*] Corpus: {len(chunks)} chunks / {len(queries)} queries | batch={args.batch_size}, threads={args.threads or 'default'}")
+
+    # The baseline always runs, so every candidate can be compared against it
+    backends = [BACKEND_TORCH] + [backend for backend in args.backends if backend != BACKEND_TORCH]
+    results = {}
+    for backend in backends:
+        print(f"[*] Running {backend}...")
+        results[backend] = run_backend(backend, chunks, queries, args.batch_size, args.threads)
+
+    baseline = results[BACKEND_TORCH]
+    print(
+        f"\n   {'backend':<10} {'load s':>7} {'chunks/s':>9} {'speedup':>8} {'query p50 ms':>13} "
+        f"{'cos mean':>9} {'cos min':>8} {f'top-{args.top_k} overlap':>15}"
+    )
+    failed = []
+    for backend in backends:
+        result = results[backend]
+        accuracy = compare(baseline, result, args.top_k)
+        print(
+            f"   {backend:<10} {result['load_secs']:>7.1f} {result['chunks_per_sec']:>9.1f} "
+            f"{result['chunks_per_sec'] / baseline['chunks_per_sec']:>7.2f}x {result['query_p50_ms']:>13.1f} "
+            f"{accuracy['cosine_mean']:>9.4f} {accuracy['cosine_min']:>8.4f} {accuracy['topk_overlap']:>15.1%}"
+        )
+        if accuracy["cosine_mean"] < args.min_cosine or accuracy["topk_overlap"] < args.min_overlap:
+            failed.append(backend)
+
+    if failed:
+        print(f"\n[!] Below the accuracy threshold: {', '.join(failed)}")
+        sys.exit(1)
+    print("\n[OK] All backends within the accuracy thresholds.")
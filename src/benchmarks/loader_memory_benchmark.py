@@ -0,0 +1,103 @@
+# Measures peak resident memory when ingesting one large document, comparing the
+# original single-pass Unstructured partition ('legacy'), the materialized path
+# (load_and_chunk_file -> full list of chunks) and the streaming path
+# (iter_chunks -> ChunkSpool -> bounded windows). Each case runs in a fresh
+# subprocess so its peak RSS is not polluted by the previous one.
+# Usage (from the src/ directory):
+#   python -m benchmarks.loader_memory_benchmark --csv-rows 500000 --pdf-pages 400
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from reportlab.lib.pagesizes import LETTER
+from reportlab.pdfgen import canvas
+
+
+def make_csv(path: str, rows: int):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("id,name,department,notes\n")
+        for i in range(rows):
+            handle.write(f"{i},Employee {i},Dept {i % 40},Quarterly review completed without remarks\n")
+
+
+def make_pdf(path: str, pages: int):
+    c = canvas.Canvas(path, pagesize=LETTER)
+    width, height = LETTER
+    for page in range(pages):
+        y_position = height - 50
+        for line in range(45):
+            c.drawString(50, y_position, f"Page {page} line {line}: internal policy text for the benchmark corpus.")
+            y_position -= 15
+        c.showPage()
+    c.save()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(mode: str, path: str):
+    """
+    Child-process entry point: ingests 'path' once and prints "<chunks> <secs> <peak MB>".
+    """
+    from ingestion.loader import iter_chunks, load_and_chunk_file
+    from ingestion.spool import ChunkSpool
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "legacy":
+        from unstructured.partition.auto import partition
+        count = len([str(el) for el in partition(filename=path)])
+    elif mode == "materialized":
+        chunks = load_and_chunk_file(path)
+        count = len(chunks)
+    else:
+        spool = ChunkSpool.from_iter(iter_chunks(path))
+        count = 0
+        for window in spool.iter_windows():
+            count += len(window)
+        spool.discard()
+    elapsed = time.perf_counter() - started
+    print(f"{count} {elapsed:.3f} {peak_rss_mb() - baseline:.1f}")
+
+
+def run_case(mode: str, path: str) -> tuple[int, float, float]:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.loader_memory_benchmark", "--measure", mode, path],
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    count, secs, peak = output.split()
+    return int(count), float(secs), float(peak)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of materialized vs. streamed loading.")
+    parser.add_argument("--csv-rows", type=int, default=300000)
+    parser.add_argument("--pdf-pages", type=int, default=200)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        sys.exit(0)
+
+    tmp_dir = tempfile.mkdtemp(prefix="loader_bench_")
+    csv_path = os.path.join(tmp_dir, "large.csv")
+    pdf_path = os.path.join(tmp_dir, "large.pdf")
+    print(f"[*] Generating {args.csv_rows} CSV rows and {args.pdf_pages} PDF pages in {tmp_dir}")
+    make_csv(csv_path, args.csv_rows)
+    make_pdf(pdf_path, args.pdf_pages)
+
+    print(f"   {'file':<10} {'size MB':>8} {'mode':<13} {'chunks':>8} {'secs':>8} {'peak +MB':>9}")
+    for path in (csv_path, pdf_path):
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        for mode in ("legacy", "materialized", "streaming"):
+            count, secs, peak = run_case(mode, path)
+            print(f"   {os.path.basename(path):<10} {size_mb:>8.1f} {mode:<13} {count:>8} {secs:>8.2f} {peak:>9.1f}")
+
+    print("[OK] 'peak +MB' is the growth of the child's peak RSS while loading the file.")
@@ -0,0 +1,112 @@
+# Compares the throughput of per-chunk vs. batched PII scanning against the original
+# full-NLP, per-chunk Presidio analysis. That both return the reference findings is
+# checked by tests/test_pii_scanner.py.
+# Usage (from the src/ directory):
+#   python -m benchmarks.pii_scan_benchmark --docs 200 --chunks 8
+import argparse
+import random
+import time
+from faker import Faker
+from presidio_analyzer import AnalyzerEngine
+from ingestion.pii_scanner import (
+    scan_for_pii,
+    scan_chunks_for_pii,
+    TARGET_ENTITIES,
+    CONFIDENCE_THRESHOLD,
+    MAX_ANALYSIS_CHUNK_SIZE,
+)
+
+
+def build_corpus(num_docs: int, chunks_per_doc: int, pii_ratio: float, seed: int) -> list[list[str]]:
+    """
+    Generates documents made of prose chunks, with a share of chunks carrying PII.
+    Includes weak formats (e.g. undashed SSNs) that only pass the threshold via context words.
+    """
+    rng = random.Random(seed)
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed)
+
+    pii_templates = [
+        lambda: f"Contact: {data_gen.email()}",
+        lambda: f"Phone: {data_gen.phone_number()}",
+        lambda: f"SSN: {data_gen.ssn()}",
+        lambda: f"Employee social security number {data_gen.ssn().replace('-', ' ')}",
+        lambda: f"Credit Card: {data_gen.credit_card_number()}",
+        lambda: f"IBAN: {data_gen.iban()}",
+        lambda: f"Invoice total {rng.randint(10000, 99999)} due {data_gen.date()}",
+    ]
+
+    corpus = []
+    for _ in range(num_docs):
+        chunks = []
+        for _ in range(chunks_per_doc):
+            chunk = data_gen.paragraph(nb_sentences=rng.randint(2, 6))
+            if rng.random() < pii_ratio:
+                chunk = f"{chunk} {rng.choice(pii_templates)()}"
+            chunks.append(chunk)
+        corpus.append(chunks)
+    return corpus
+
+
+def reference_scan(analyzer: AnalyzerEngine, text_content: str) -> set[str]:
+    """
+    The original per-chunk behaviour: full NLP pipeline, no prefilter.
+    """
+    if not text_content or len(text_content.strip()) < 5:
+        return set()
+
+    detected = set()
+    for i in range(0, len(text_content), MAX_ANALYSIS_CHUNK_SIZE):
+        results = analyzer.analyze(
+            text=text_content[i : i + MAX_ANALYSIS_CHUNK_SIZE],
+            entities=TARGET_ENTITIES,
+            language='en'
+        )
+        detected.update(r.entity_type for r in results if r.score >= CONFIDENCE_THRESHOLD)
+    return detected
+
+
+def run_benchmark(num_docs: int, chunks_per_doc: int, pii_ratio: float, seed: int):
+    corpus = build_corpus(num_docs, chunks_per_doc, pii_ratio, seed)
+    total_chunks = sum(len(doc) for doc in corpus)
+    print(f"[*] Corpus: {num_docs} documents / {total_chunks} chunks (PII ratio {pii_ratio})")
+
+    # 1. Reference: a fresh, full NLP engine (NER enabled), one analyze() per chunk
+    print("[*] Loading reference AnalyzerEngine (full NLP pipeline)...")
+    reference_engine = AnalyzerEngine()
+    started = time.perf_counter()
+    flagged = sum(1 for doc in corpus for chunk in doc if reference_scan(reference_engine, chunk))
+    reference_secs = time.perf_counter() - started
+
+    # 2. Current per-chunk API (prefilter + configured NLP mode)
+    started = time.perf_counter()
+    for doc in corpus:
+        for chunk in doc:
+            scan_for_pii(chunk)
+    per_chunk_secs = time.perf_counter() - started
+
+    # 3. Document-level batch API
+    started = time.perf_counter()
+    for doc in corpus:
+        scan_chunks_for_pii(doc)
+    batched_secs = time.perf_counter() - started
+
+    for label, secs in [
+        ("reference (full NLP, per chunk)", reference_secs),
+        ("scan_for_pii (per chunk)", per_chunk_secs),
+        ("scan_chunks_for_pii (batched)", batched_secs),
+    ]:
+        print(f"   {label:<34} {secs:8.2f}s  {total_chunks / secs:9.1f} chunks/sec")
+
+    print(f"[*] {flagged} of {total_chunks} chunks carry PII (reference).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched PII scanning.")
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per document")
+    parser.add_argument("--pii-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run_benchmark(args.docs, args.chunks, args.pii_ratio, args.seed)
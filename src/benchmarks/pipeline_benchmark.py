@@ -0,0 +1,197 @@
+# End-to-end pipeline benchmark on a seeded synthetic corpus, fully offline.
+#
+# 1. Generates (or reuses) a deterministic corpus with generate_synthetic_data.
+# 2. Runs run_pipeline() in a fresh child process inside an isolated workspace
+#    (own data/, processed/ and Chroma directories), with DataHub replaced by the
+#    in-process MockGMSServer.
+# 3. Reports docs/sec, chunks/sec and per-stage latency percentiles, and compares
+#    them with a saved JSON baseline (non-zero exit on a throughput regression).
+#
+# Usage (from the src/ directory):
+#   python -m benchmarks.pipeline_benchmark --docs 2000 --save-baseline
+#   python -m benchmarks.pipeline_benchmark --docs 2000 --threshold 0.10
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from telemetry import percentile
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(SRC_DIR, "benchmarks", "baselines", "pipeline.json")
+
+
+def corpus_params(args) -> dict:
+    return {
+        "count": args.docs,
+        "seed": args.seed,
+        "pii_ratio": args.pii_ratio,
+        "formats": args.formats.split(","),
+        "size_distribution": args.sizes,
+    }
+
+
+def prepare_corpus(workspace: str, args) -> dict:
+    """
+    Generates the corpus into <workspace>/data/source unless an identical one is already there.
+    """
+    from generate_synthetic_data import generate_corpus
+
+    data_dir = os.path.join(workspace, "data", "source")
+    summary_path = os.path.join(data_dir, "corpus.json")
+    params = corpus_params(args)
+
+    if os.path.exists(summary_path):
+        with open(summary_path, "r", encoding="utf-8") as handle:
+            summary = json.load(handle)
+        if all(summary.get(key) == value for key, value in params.items()):
+            print(f"[*] Reusing corpus in {data_dir}")
+            return summary
+        shutil.rmtree(data_dir)
+
+    print(f"[*] Generating {args.docs} documents in {data_dir}")
+    return generate_corpus(data_dir, workers=args.gen_workers, **params)
+
+
+def run_child(workspace: str, args) -> dict:
+    """
+    Runs the pipeline once in a clean child process and returns its run report.
+    """
+    # Fresh index, manifest and DataHub state for every run
+    for path in (os.path.join(workspace, "data", "processed"), os.path.join(workspace, "chroma_db_storage")):
+        shutil.rmtree(path, ignore_errors=True)
+
+    report_path = os.path.join(workspace, "run_report.json")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": SRC_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "DATAHUB_EMITTER": "mock",
+        "DATAHUB_MOCK_LATENCY_MS": str(args.datahub_latency_ms),
+        "DATAHUB_SKIP_UNCHANGED": "false",
+        "INCREMENTAL_INGESTION": "false",
+        "EMBEDDING_CACHE_ENABLED": "true" if args.warm_cache else "false",
+    })
+
+    log_path = os.path.join(workspace, "run.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        # cwd=workspace: every Config path (data/, processed/, Chroma) resolves inside it
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--run-once", report_path],
+            cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT, check=True
+        )
+    with open(report_path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def run_once(report_path: str):
+    """
+    Child-process entry point: one pipeline run, report saved as JSON.
+    """
+    from main import run_pipeline
+
+    report = run_pipeline()
+    with open(report_path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle)
+
+
+def summarize(report: dict) -> dict:
+    elapsed = report["elapsed_secs"]
+    timings = dict(report["stage_timings"])
+    timings["vector_flush"] = report["vector_flush_timings"]
+    return {
+        "elapsed_secs": round(elapsed, 3),
+        "docs": report["processed"],
+        "chunks": report["stats"]["chunks"],
+        "docs_per_sec": round(report["processed"] / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_sec": round(report["stats"]["chunks"] / elapsed, 3) if elapsed else 0.0,
+        "mb_per_sec": round(report["stats"]["bytes"] / (1024 * 1024) / elapsed, 3) if elapsed else 0.0,
+        "failed": report["stats"]["store_failed"] + report["stats"]["emit_failed"] + report["errors"],
+        "secure": report["stats"]["secure"],
+        "public": report["stats"]["public"],
+        "stages": {
+            name: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for name, values in timings.items()
+        },
+    }
+
+
+def check_regression(result: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Returns a message per throughput metric that dropped more than 'threshold' below the baseline.
+    """
+    regressions = []
+    for metric in ("docs_per_sec", "chunks_per_sec"):
+        expected = baseline["result"][metric]
+        if expected and result[metric] < expected * (1 - threshold):
+            regressions.append(f"{metric}: {result[metric]:.2f} vs. baseline {expected:.2f} (-{1 - result[metric] / expected:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with baselines.")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pii-ratio", type=float, default=0.3)
+    parser.add_argument("--formats", default="pdf,txt,csv,docx")
+    parser.add_argument("--sizes", default="small:0.7,medium:0.25,large:0.05")
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--workspace", help="Reuse a workspace (and its corpus) between runs")
+    parser.add_argument("--datahub-latency-ms", type=float, default=0.0, help="Simulated GMS latency per request")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the embedding cache enabled")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed throughput drop vs. baseline (0.15 = 15%%)")
+    parser.add_argument("--run-once", metavar="REPORT_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:
+        run_once(args.run_once)
+        sys.exit(0)
+
+    workspace = args.workspace or tempfile.mkdtemp(prefix="pipeline_bench_")
+    os.makedirs(workspace, exist_ok=True)
+    corpus = prepare_corpus(workspace, args)
+
+    print(f"[*] Running pipeline on {corpus['count']} documents (log: {os.path.join(workspace, 'run.log')})")
+    result = summarize(run_child(workspace, args))
+
+    print(
+        f"[*] {result['docs']} docs / {result['chunks']} chunks in {result['elapsed_secs']:.1f}s: "
+        f"{result['docs_per_sec']:.1f} docs/sec, {result['chunks_per_sec']:.1f} chunks/sec, "
+        f"{result['mb_per_sec']:.2f} MB/sec, {result['failed']} failed"
+    )
+    print(f"   Routing: {result['secure']} secure / {result['public']} public (corpus has {corpus['pii_documents']} PII documents)")
+    print(f"   {'stage':<14} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stage in result["stages"].items():
+        print(f"   {name:<14} {stage['count']:>7} {stage['p50_ms']:>9.1f} {stage['p95_ms']:>9.1f} {stage['p99_ms']:>9.1f}")
+
+    params = corpus_params(args)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump({"corpus": params, "result": result}, handle, indent=2)
+        print(f"[OK] Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"[!] No baseline at {args.baseline}; run with --save-baseline first.")
+        sys.exit(0)
+
+    with open(args.baseline, "r", encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    if baseline["corpus"] != params:
+        print("[!] Baseline was recorded on a different corpus; throughput is not comparable.")
+
+    regressions = check_regression(result, baseline, args.threshold)
+    if regressions:
+        for message in regressions:
+            print(f"[!] REGRESSION {message}")
+        sys.exit(1)
+    print(f"[OK] Within {args.threshold:.0%} of baseline ({baseline['result']['docs_per_sec']:.1f} docs/sec).")
@@ -0,0 +1,53 @@
+# Profiles the pipeline on a single file, in-process, with cProfile and tracemalloc.
+#
+# Runs partition -> PII scan -> embedding inline (no process pools, so every
+# frame shows up in the profile) and prints the per-stage spans next to the
+# hottest functions and the largest allocation sites. Nothing is written to
+# Chroma or DataHub unless --store is given.
+#
+# Usage (from the src/ directory):
+#   python -m benchmarks.profile_file ../data/source/large_report.pdf
+#   python -m benchmarks.profile_file ../data/source/large_report.pdf --store --top 40
+import argparse
+import os
+from config import Config
+from telemetry import profiled, telemetry
+
+
+def profile_file(full_path: str, store: bool = False):
+    from pipeline.workers import partition_file, scan_chunks
+    from storage.vector_store import build_nodes, embed_nodes, store_nodes
+
+    filename = os.path.basename(full_path)
+    spool = partition_file(full_path)
+    findings = scan_chunks(spool)
+
+    ordinal = 0
+    for window in spool.iter_windows(Config.CHUNK_WINDOW_SIZE):
+        nodes = build_nodes(window, filename, start_ordinal=ordinal)
+        if store:
+            collection = Config.COLLECTION_SECURE if findings else Config.COLLECTION_PUBLIC
+            store_nodes(nodes, filename, collection)
+        else:
+            embed_nodes(nodes)
+        ordinal += len(window)
+    spool.discard()
+    return ordinal, len(findings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="cProfile + tracemalloc run of the pipeline on one file.")
+    parser.add_argument("path", help="Document to profile")
+    parser.add_argument("--store", action="store_true", help="Also write the vectors to Chroma")
+    parser.add_argument("--top", type=int, default=25, help="Functions listed by cumulative time")
+    parser.add_argument("--output-dir", default=Config.PROFILE_DIR)
+    args = parser.parse_args()
+
+    telemetry.enabled = True
+    with profiled(os.path.basename(args.path), output_dir=args.output_dir, top=args.top):
+        chunks, flagged = profile_file(os.path.abspath(args.path), store=args.store)
+
+    print(f"[*] {chunks} chunks, {flagged} with PII findings")
+    print(f"   {'histogram':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, histogram in telemetry.snapshot()["histograms"].items():
+        print(f"   {name:<40} {histogram['count']:>6} {histogram['p50_ms']:>9.1f} {histogram['p95_ms']:>9.1f}")
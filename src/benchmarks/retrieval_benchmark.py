@@ -0,0 +1,157 @@
+# Query latency (p50/p99) and QPS of the original per-query retrieval setup
+# (new ChromaVectorStore + VectorStoreIndex + retriever for every question, as in
+# the first version of test_retrieval.py) versus the warm RetrievalService:
+# single queries without and with the query-embedding LRU, batched queries, and
+# several concurrent clients.
+#
+# Two seeded collections are built first; queries follow a skewed (Zipf-like)
+# distribution over a fixed question set, like interactive traffic does.
+# Usage (from the src/ directory):
+#   python -m benchmarks.retrieval_benchmark --chunks 5000 --queries 500 --batch-size 16 --clients 4
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from faker import Faker
+from config import Config
+
+# Seeding must embed for real; query embeddings never use the cache anyway
+Config.EMBEDDING_CACHE_ENABLED = False
+
+from storage import vector_store  # noqa: E402
+from retrieval.service import ACCESS_PUBLIC, ACCESS_RESTRICTED, RetrievalService, embed_queries  # noqa: E402
+from storage.sharding import logical_name, shard_names  # noqa: E402
+from telemetry import percentile  # noqa: E402
+
+BENCH_PUBLIC = "bench_retrieval_public"
+BENCH_SECURE = "bench_retrieval_secure"
+BENCH_ACCESS = {ACCESS_PUBLIC: (BENCH_PUBLIC,), ACCESS_RESTRICTED: (BENCH_PUBLIC, BENCH_SECURE)}
+
+
+def reset_bench_collections():
+    # Every shard of both collections, wherever SHARD_PATHS put it
+    for path, name in vector_store.list_collections():
+        if logical_name(name) in (BENCH_PUBLIC, BENCH_SECURE):
+            vector_store.get_storage_client(path).delete_collection(name)
+            vector_store.forget_collection(name)
+
+
+def seed_collections(num_chunks: int, seed: int):
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed)
+    writer = vector_store.BufferedVectorWriter(max_delay=0)
+    for i in range(num_chunks // 4):
+        # Four chunks per file, one file in five lands in the secure index
+        chunks = [data_gen.paragraph(nb_sentences=5) for _ in range(4)]
+        writer.add(chunks, f"bench/doc_{i:05d}.txt", BENCH_SECURE if i % 5 == 0 else BENCH_PUBLIC)
+    writer.close()
+
+
+def build_workload(num_queries: int, distinct: int, seed: int) -> list[str]:
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed + 1)
+    questions = [data_gen.sentence(nb_words=10) for _ in range(distinct)]
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(questions, weights=weights, k=num_queries)
+
+
+def run_naive(queries: list[str], top_k: int) -> list[float]:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    embed_model = vector_store.get_embed_model()
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        # The old pattern: collection, store, index and retriever rebuilt per query
+        for collection_name in (*shard_names(BENCH_PUBLIC), *shard_names(BENCH_SECURE)):
+            chroma_collection = vector_store.get_chroma_client(collection_name).get_collection(collection_name)
+            index = VectorStoreIndex.from_vector_store(
+                ChromaVectorStore(chroma_collection=chroma_collection), embed_model=embed_model
+            )
+            index.as_retriever(similarity_top_k=top_k).retrieve(query)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_single(service: RetrievalService, queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        service.search(query, access_level=ACCESS_RESTRICTED)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_batched(service: RetrievalService, queries: list[str], batch_size: int) -> list[float]:
+    # Every query in a batch waits for the whole batch, so each gets the batch latency
+    latencies = []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        started = time.perf_counter()
+        service.search_batch(batch, access_level=ACCESS_RESTRICTED)
+        latencies.extend([time.perf_counter() - started] * len(batch))
+    return latencies
+
+
+def run_concurrent(service: RetrievalService, queries: list[str], clients: int) -> list[float]:
+    def timed_search(query):
+        started = time.perf_counter()
+        service.search(query, access_level=ACCESS_RESTRICTED)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(timed_search, queries))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency and QPS.")
+    parser.add_argument("--chunks", type=int, default=4000, help="Chunks seeded across both collections")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--distinct", type=int, default=100, help="Distinct questions in the workload")
+    parser.add_argument("--naive-queries", type=int, default=50, help="Queries for the slow per-query baseline")
+    parser.add_argument("--top-k", type=int, default=Config.RETRIEVAL_TOP_K)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded collections afterwards")
+    args = parser.parse_args()
+
+    reset_bench_collections()
+    print(f"[*] Seeding {args.chunks} chunks into '{BENCH_PUBLIC}' / '{BENCH_SECURE}'")
+    seed_collections(args.chunks, args.seed)
+    workload = build_workload(args.queries, args.distinct, args.seed)
+
+    # Model and collection handles are process-wide, so every case starts warm
+    embed_queries(["warm up"])
+    for collection_name in (*shard_names(BENCH_PUBLIC), *shard_names(BENCH_SECURE)):
+        vector_store.get_collection(collection_name)
+
+    def fresh_service(cache_size=Config.RETRIEVAL_QUERY_CACHE_SIZE):
+        # A new service starts with an empty query cache
+        return RetrievalService(top_k=args.top_k, cache_size=cache_size, access_collections=BENCH_ACCESS)
+
+    cases = [
+        ("per-query index (old)", lambda: (None, run_naive(workload[:args.naive_queries], args.top_k))),
+        ("service, no query cache", lambda: (s := fresh_service(cache_size=0), run_single(s, workload))),
+        ("service, LRU query cache", lambda: (s := fresh_service(), run_single(s, workload))),
+        (f"service, batched ({args.batch_size})", lambda: (s := fresh_service(), run_batched(s, workload, args.batch_size))),
+        (f"service, {args.clients} clients", lambda: (s := fresh_service(), run_concurrent(s, workload, args.clients))),
+    ]
+
+    print(f"   {'case':<28} {'queries':>8} {'p50 ms':>9} {'p99 ms':>9} {'QPS':>9}  cache hit rate")
+    for label, run in cases:
+        started = time.perf_counter()
+        service, latencies = run()
+        elapsed = time.perf_counter() - started
+        hit_rate = f"{service.query_cache.stats()['hit_rate']:.0%}" if service else "-"
+        print(
+            f"   {label:<28} {len(latencies):>8} {percentile(latencies, 50) * 1000:>9.1f} "
+            f"{percentile(latencies, 99) * 1000:>9.1f} {len(latencies) / elapsed:>9.1f}  {hit_rate}"
+        )
+        if service:
+            service.close()
+
+    if not args.keep:
+        reset_bench_collections()
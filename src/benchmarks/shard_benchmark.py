@@ -0,0 +1,130 @@
+# Write throughput and query latency/QPS of one logical collection split into
+# 1, 2, 4, ... shards (Config.SHARD_COUNT), plus the time to rebalance from the
+# largest layout back to a single collection.
+#
+# Every layout gets the same seeded corpus. Chunk embeddings are computed once in
+# a warm-up pass and served from the embedding cache afterwards, so the write
+# numbers measure routing + Chroma, not the model. Queries go through the
+# RetrievalService, which fans out to every shard and merges top-k by similarity.
+# Pass --paths to spread the shards over several storage directories.
+# Usage (from the src/ directory):
+#   python -m benchmarks.shard_benchmark --chunks 20000 --shards 1 2 4 8 --clients 4
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from faker import Faker
+from config import Config
+
+# The warm-up pass fills the cache; the timed passes must hit it
+Config.EMBEDDING_CACHE_ENABLED = True
+
+from retrieval.service import ACCESS_RESTRICTED, RetrievalService  # noqa: E402
+from storage import vector_store  # noqa: E402
+from storage.maintenance import IndexMaintenance  # noqa: E402
+from storage.sharding import logical_name, shard_names  # noqa: E402
+from telemetry import percentile  # noqa: E402
+
+BENCH_COLLECTION = "bench_shards"
+BENCH_ACCESS = {ACCESS_RESTRICTED: (BENCH_COLLECTION,)}
+
+
+def build_files(num_chunks: int, seed: int) -> list[tuple[str, list[str]]]:
+    # Four chunks per file, spread over 16 top-level folders (for SHARD_KEY=folder)
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed)
+    return [
+        (f"dept_{i % 16:02d}/doc_{i:06d}.txt", [data_gen.paragraph(nb_sentences=5) for _ in range(4)])
+        for i in range(num_chunks // 4)
+    ]
+
+
+def build_queries(num_queries: int, seed: int) -> list[str]:
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed + 1)
+    questions = [data_gen.sentence(nb_words=10) for _ in range(max(1, num_queries // 4))]
+    return random.Random(seed).choices(questions, k=num_queries)
+
+
+def reset_bench_collections():
+    for path, name in vector_store.list_collections():
+        if logical_name(name) == BENCH_COLLECTION:
+            vector_store.get_storage_client(path).delete_collection(name)
+            vector_store.forget_collection(name)
+
+
+def seed(files) -> float:
+    started = time.perf_counter()
+    writer = vector_store.BufferedVectorWriter(max_delay=0)
+    for filename, chunks in files:
+        writer.add(chunks, filename, BENCH_COLLECTION)
+    writer.close()
+    return time.perf_counter() - started
+
+
+def run_queries(service: RetrievalService, queries: list[str], clients: int) -> tuple[list[float], float]:
+    def timed_search(query):
+        started = time.perf_counter()
+        service.search(query, access_level=ACCESS_RESTRICTED)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(timed_search, queries))
+    return latencies, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharded collections across shard counts.")
+    parser.add_argument("--chunks", type=int, default=8000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--key", choices=["hash", "folder"], default=Config.SHARD_KEY)
+    parser.add_argument("--paths", nargs="+", default=Config.SHARD_PATHS, help="Storage directories for the shards")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--keep", action="store_true", help="Keep the last layout afterwards")
+    args = parser.parse_args()
+
+    Config.SHARD_KEY = args.key
+    Config.SHARD_PATHS = args.paths
+    files = build_files(args.chunks, args.seed)
+    queries = build_queries(args.queries, args.seed)
+    total_chunks = sum(len(chunks) for _, chunks in files)
+    print(f"[*] Corpus: {len(files)} files / {total_chunks} chunks | key={args.key}, paths={args.paths or [Config.CHROMA_DB_PATH]}")
+
+    # Warm-up: chunk embeddings into the cache, every query embedding into the service's LRU
+    reset_bench_collections()
+    Config.SHARD_COUNT = 1
+    seed(files)
+    service = RetrievalService(access_collections=BENCH_ACCESS, fanout_workers=max(4, *args.shards))
+    service.search_batch(list(dict.fromkeys(queries)), access_level=ACCESS_RESTRICTED)
+
+    print(f"   {'shards':>6} {'write s':>8} {'chunks/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'QPS':>8}  smallest/largest shard")
+    for shard_count in args.shards:
+        reset_bench_collections()
+        Config.SHARD_COUNT = shard_count
+        write_secs = seed(files)
+
+        run_queries(service, queries[:20], 1)
+        latencies, elapsed = run_queries(service, queries, args.clients)
+
+        # With SHARD_KEY=folder some shards may receive no files at all
+        shards = [vector_store.get_collection(name, create=False) for name in shard_names(BENCH_COLLECTION)]
+        sizes = [shard.count() if shard is not None else 0 for shard in shards]
+        print(
+            f"   {shard_count:>6} {write_secs:>8.2f} {total_chunks / write_secs:>9.1f} "
+            f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+            f"{len(latencies) / elapsed:>8.1f}  {min(sizes)}/{max(sizes)}"
+        )
+
+    service.close()
+
+    # Rebalancing cost: the last layout merged back into one collection
+    Config.SHARD_COUNT = 1
+    started = time.perf_counter()
+    moved = IndexMaintenance().rebalance([BENCH_COLLECTION])[BENCH_COLLECTION]["moved"]
+    print(f"[*] Rebalance {args.shards[-1]} -> 1 shard(s): {moved} vectors in {time.perf_counter() - started:.2f}s")
+
+    if not args.keep:
+        reset_bench_collections()
@@ -0,0 +1,52 @@
+# Reports import time and resident memory of the pipeline entry point, with lazy
+# resources left unloaded ('import') versus loaded right away ('import + preload',
+# which matches the old behaviour of building every model at import time).
+# Each case runs in a fresh interpreter.
+# Usage (from the src/ directory):
+#   python -m benchmarks.startup_benchmark --repeat 3
+import argparse
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "import": "import main",
+    "import + preload": "import main\nfrom pipeline.warmup import preload\npreload()",
+}
+
+PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+print(f"STARTUP {{elapsed:.3f}} {{peak_mb:.1f}}")
+"""
+
+
+def run_case(code: str) -> tuple[float, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    line = [line for line in output.splitlines() if line.startswith("STARTUP ")][-1]
+    _, secs, peak_mb = line.split()
+    return float(secs), float(peak_mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline startup time and memory.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"[*] {args.repeat} fresh interpreter(s) per case")
+    print(f"   {'case':<18} {'median s':>9} {'peak RSS MB':>12}")
+    for label, code in CASES.items():
+        runs = [run_case(code) for _ in range(args.repeat)]
+        print(
+            f"   {label:<18} {statistics.median(secs for secs, _ in runs):>9.2f} "
+            f"{max(peak for _, peak in runs):>12.1f}"
+        )
+
+    print("[OK] 'import' is what CLI tools and forked workers pay now; models load on first use.")
@@ -0,0 +1,83 @@
+# Compares chunks/sec of the per-file write path (save_to_chroma) with the
+# cross-file BufferedVectorWriter on the same synthetic corpus.
+# Usage (from the src/ directory):
+#   python -m benchmarks.vector_write_benchmark --files 300 --chunks 3
+import argparse
+import random
+import time
+from faker import Faker
+from config import Config
+
+# Both paths must pay for real embeddings; a warm cache would flatter the second run
+# (the model is created lazily, so overriding before first use is enough)
+Config.EMBEDDING_CACHE_ENABLED = False
+
+from storage import vector_store  # noqa: E402
+
+
+def build_files(num_files: int, chunks_per_file: int, seed: int) -> list[tuple[str, list[str]]]:
+    data_gen = Faker('en_US')
+    data_gen.seed_instance(seed)
+    rng = random.Random(seed)
+    return [
+        (
+            f"bench/file_{i:05d}.txt",
+            [data_gen.paragraph(nb_sentences=rng.randint(3, 8)) for _ in range(chunks_per_file)]
+        )
+        for i in range(num_files)
+    ]
+
+
+def _reset_collection(collection_name: str):
+    try:
+        vector_store.get_chroma_client().delete_collection(collection_name)
+    except Exception:
+        pass
+    vector_store._collections.pop(collection_name, None)
+
+
+def bench_per_file(files, collection_name: str) -> float:
+    started = time.perf_counter()
+    for filename, chunks in files:
+        vector_store.save_to_chroma(chunks, filename, collection_name)
+    return time.perf_counter() - started
+
+
+def bench_buffered(files, collection_name: str, batch_size: int) -> float:
+    started = time.perf_counter()
+    writer = vector_store.BufferedVectorWriter(batch_size=batch_size, max_delay=0)
+    for filename, chunks in files:
+        writer.add(chunks, filename, collection_name)
+    writer.close()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-file vs. buffered vector writes.")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=3, help="Chunks per file")
+    parser.add_argument("--batch-size", type=int, default=Config.VECTOR_WRITE_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    files = build_files(args.files, args.chunks, args.seed)
+    total_chunks = sum(len(chunks) for _, chunks in files)
+    print(f"[*] Corpus: {args.files} files / {total_chunks} chunks")
+
+    # Warm the model once so neither path pays the first-call overhead
+    vector_store.get_embed_model().get_text_embedding_batch(["warm up"])
+
+    results = {}
+    for label, collection_name, run in [
+        ("per-file (save_to_chroma)", "bench_per_file_writes", lambda name: bench_per_file(files, name)),
+        (f"buffered (batch={args.batch_size})", "bench_buffered_writes", lambda name: bench_buffered(files, name, args.batch_size)),
+    ]:
+        _reset_collection(collection_name)
+        secs = run(collection_name)
+        stored = vector_store.get_collection(collection_name).count()
+        results[label] = secs
+        print(f"   {label:<28} {secs:8.2f}s  {total_chunks / secs:9.1f} chunks/sec  ({stored} vectors stored)")
+        _reset_collection(collection_name)
+
+    per_file_secs, buffered_secs = results.values()
+    print(f"[OK] Buffered path speed-up: {per_file_secs / buffered_secs:.2f}x")
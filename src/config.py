@@ -3,6 +3,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _hnsw_settings(prefix: str) -> dict:
+    """
+    HNSW parameters of one collection: HNSW_<PREFIX>_<PARAM> overrides HNSW_<PARAM>.
+    The defaults are Chroma's own, so nothing changes unless configured.
+    """
+    def setting(name: str, default: str) -> str:
+        return os.getenv(f"HNSW_{prefix}_{name}", os.getenv(f"HNSW_{name}", default))
+
+    return {
+        "space": setting("SPACE", "l2").lower(),
+        "M": int(setting("M", "16")),
+        "construction_ef": int(setting("CONSTRUCTION_EF", "100")),
+        "search_ef": int(setting("SEARCH_EF", "10")),
+    }
+
 class Config:
     """
     Central configuration for the DataHub AI Governance Pipeline.
@@ -10,13 +25,197 @@ class Config:
     """
     DATAHUB_URL = os.getenv("DATAHUB_API_URL", "http://localhost:8080")
     DATAHUB_TOKEN = os.getenv("DATAHUB_ACCESS_TOKEN")
+
+    # --- DataHub Emission ---
+    # 'sync' sends every MCP inline; 'batched' queues them for a background sender that
+    # dedupes identical aspects, merges lineage per vector index and retries with backoff.
+    DATAHUB_EMIT_MODE = os.getenv("DATAHUB_EMIT_MODE", "batched").lower()
+    DATAHUB_BATCH_SIZE = int(os.getenv("DATAHUB_BATCH_SIZE", "100"))
+    DATAHUB_FLUSH_INTERVAL_SECS = float(os.getenv("DATAHUB_FLUSH_INTERVAL_SECS", "2"))
+    DATAHUB_MAX_IN_FLIGHT = int(os.getenv("DATAHUB_MAX_IN_FLIGHT", "4"))
+    DATAHUB_MAX_RETRIES = int(os.getenv("DATAHUB_MAX_RETRIES", "3"))
+    DATAHUB_RETRY_BACKOFF_SECS = float(os.getenv("DATAHUB_RETRY_BACKOFF_SECS", "0.5"))
+    DATAHUB_QUEUE_SIZE = int(os.getenv("DATAHUB_QUEUE_SIZE", "1000"))
+    # Skip aspects whose content matches the last emitted state (tracked locally);
+    # FORCE_RESYNC re-sends everything once, e.g. after restoring GMS from a backup.
+    DATAHUB_SKIP_UNCHANGED = os.getenv("DATAHUB_SKIP_UNCHANGED", "true").lower() == "true"
+    DATAHUB_FORCE_RESYNC = os.getenv("DATAHUB_FORCE_RESYNC", "false").lower() == "true"
+    # Backend: 'rest' (live GMS), 'file' (MCP dump for 'datahub ingest'), 'mock' (in-process stand-in)
+    DATAHUB_EMITTER = os.getenv("DATAHUB_EMITTER", "rest").lower()
+    DATAHUB_FILE_SINK_FORMAT = os.getenv("DATAHUB_FILE_SINK_FORMAT", "jsonl").lower()
+    DATAHUB_MOCK_LATENCY_MS = float(os.getenv("DATAHUB_MOCK_LATENCY_MS", "0"))
+    DATAHUB_MOCK_ERROR_RATE = float(os.getenv("DATAHUB_MOCK_ERROR_RATE", "0"))
+
+    # --- Vector Storage ---
     CHROMA_DB_PATH = os.path.join(os.getcwd(), "chroma_db_storage")
     COLLECTION_PUBLIC = "public_knowledge_base"
     COLLECTION_SECURE = "secure_restricted_index"
+    EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+    # --- Sharding ---
+    # Optional: each logical collection is split into SHARD_COUNT physical collections
+    # ('<name>__shardNN'). A file's shard is a stable hash of its relative path ('hash')
+    # or of its top-level folder ('folder'). Shards can be spread over several storage
+    # directories (SHARD_PATHS, comma-separated; shard N uses path N % len). After changing
+    # the count, key or paths, run 'main.py --rebalance'. Retrieval fans out to every shard.
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+    SHARD_KEY = os.getenv("SHARD_KEY", "hash").lower()
+    SHARD_PATHS = [path.strip() for path in os.getenv("SHARD_PATHS", "").split(",") if path.strip()]
+
+    # --- HNSW Index Parameters (per collection) ---
+    # Applied when a collection is created; an existing collection picks up changed
+    # values when 'main.py --maintain' rebuilds it.
+    COLLECTION_HNSW = {
+        COLLECTION_PUBLIC: _hnsw_settings("PUBLIC"),
+        COLLECTION_SECURE: _hnsw_settings("SECURE"),
+    }
     
     # --- Local File System ---
     DATA_DIR = os.path.join(os.getcwd(), "data", "source")
     PROCESSED_DIR = os.path.join(os.getcwd(), "data", "processed")
 
-for directory in [Config.DATA_DIR, Config.PROCESSED_DIR, Config.CHROMA_DB_PATH]:
-    os.makedirs(directory, exist_ok=True)
\ No newline at end of file
+    # --- Incremental Ingestion ---
+    # The manifest remembers size, mtime and content hash of every ingested file,
+    # so unchanged files are skipped and deleted files get purged on the next run.
+    INCREMENTAL_INGESTION = os.getenv("INCREMENTAL_INGESTION", "true").lower() == "true"
+    MANIFEST_PATH = os.path.join(PROCESSED_DIR, "ingestion_manifest.db")
+    DATAHUB_STATE_PATH = os.path.join(PROCESSED_DIR, "datahub_state.db")
+    # The file sink writes one dump per run into this directory. Runs never overwrite
+    # each other, since the aspect state already counts their MCPs as delivered.
+    DATAHUB_FILE_SINK_DIR = os.path.join(PROCESSED_DIR, "datahub_mcps")
+
+    # --- Streaming Partitioning ---
+    # TXT and CSV use native readers (NATIVE_LOADERS); PDF/DOCX go through Unstructured.
+    # Large documents are read in bounded windows (PDF page ranges, CSV row windows)
+    # and any chunk longer than MAX_CHUNK_CHARS is split. A file whose text exceeds
+    # SPOOL_THRESHOLD_CHARS is spilled to SPOOL_DIR and streamed between stages.
+    NATIVE_LOADERS = os.getenv("NATIVE_LOADERS", "true").lower() == "true"
+    MAX_CHUNK_CHARS = int(os.getenv("MAX_CHUNK_CHARS", "4000"))
+    PDF_PAGE_WINDOW = int(os.getenv("PDF_PAGE_WINDOW", "50"))
+    CSV_ROW_WINDOW = int(os.getenv("CSV_ROW_WINDOW", "200"))
+    CHUNK_WINDOW_SIZE = int(os.getenv("CHUNK_WINDOW_SIZE", "256"))
+    SPOOL_THRESHOLD_CHARS = int(os.getenv("SPOOL_THRESHOLD_CHARS", "2000000"))
+    SPOOL_DIR = os.path.join(PROCESSED_DIR, "spool")
+
+    # --- Pipeline Parallelism ---
+    # Partition and scan run in process pools (0 = run inline, no extra processes);
+    # embed, store and emit run on threads. Queues between stages are bounded so a
+    # slow stage throttles discovery instead of buffering the whole corpus in memory.
+    PIPELINE_PARTITION_WORKERS = int(os.getenv("PIPELINE_PARTITION_WORKERS", os.cpu_count() or 1))
+    PIPELINE_SCAN_WORKERS = int(os.getenv("PIPELINE_SCAN_WORKERS", os.cpu_count() or 1))
+    PIPELINE_STORE_WORKERS = int(os.getenv("PIPELINE_STORE_WORKERS", "1"))
+    PIPELINE_EMIT_WORKERS = int(os.getenv("PIPELINE_EMIT_WORKERS", "1"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+    # multiprocessing start method for the pools ('fork', 'spawn', 'forkserver'); empty = platform default
+    PIPELINE_START_METHOD = os.getenv("PIPELINE_START_METHOD", "")
+
+    # --- PII Scanning ---
+    # 'pattern' disables spaCy NER/parser (every target entity is regex/checksum based),
+    # 'full' keeps the whole NLP pipeline, 'auto' picks 'pattern' when the entity set allows it.
+    PII_NLP_MODE = os.getenv("PII_NLP_MODE", "auto").lower()
+    PII_BATCH_SIZE = int(os.getenv("PII_BATCH_SIZE", "32"))
+
+    # --- Embedding Backend ---
+    # Runtime for the embedding model, shared by ingestion and retrieval:
+    # 'torch' (PyTorch), 'onnx' (ONNX Runtime) or 'onnx-int8' (dynamically quantized ONNX).
+    # The ONNX exports are created once under EMBEDDING_ONNX_DIR.
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+    EMBEDDING_QUANTIZATION_CONFIG = os.getenv("EMBEDDING_QUANTIZATION_CONFIG", "avx2").lower()
+    EMBEDDING_ONNX_DIR = os.path.join(PROCESSED_DIR, "onnx_models")
+
+    # --- Embedding Cache ---
+    # Content-addressed vectors keyed by (model, normalized chunk text), shared by
+    # both collections and across runs. Least recently used entries go first past the cap.
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.path.join(PROCESSED_DIR, "embedding_cache.db")
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+    # --- Chunk Deduplication ---
+    # Optional: chunks whose text was already stored in the same collection (exact
+    # SHA-256 match, or MinHash/LSH estimated Jaccard >= SIMILARITY_THRESHOLD over
+    # word shingles) are not embedded again; the file is added to the stored chunk's
+    # 'duplicate_sources' metadata instead. NUM_PERM must be a multiple of LSH_BANDS.
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+    DEDUP_NEAR_DUPLICATES = os.getenv("DEDUP_NEAR_DUPLICATES", "true").lower() == "true"
+    DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.9"))
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_LSH_BANDS = int(os.getenv("DEDUP_LSH_BANDS", "32"))
+    DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+    DEDUP_INDEX_PATH = os.path.join(PROCESSED_DIR, "dedup_index.db")
+
+    # --- Stage Artifacts & Journal ---
+    # Each file's chunks are kept as a gzipped JSONL artifact and its metadata, PII
+    # findings, routing and per-stage completion in a SQLite journal, so an interrupted
+    # run can resume ('--resume') and store/emit can be replayed alone ('--replay').
+    ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "true").lower() == "true"
+    ARTIFACTS_DIR = os.path.join(PROCESSED_DIR, "artifacts")
+    ARTIFACTS_COMPRESSION_LEVEL = int(os.getenv("ARTIFACTS_COMPRESSION_LEVEL", "1"))
+    STAGE_JOURNAL_PATH = os.path.join(PROCESSED_DIR, "stage_journal.db")
+
+    # --- Index Maintenance ---
+    # 'main.py --maintain' purges orphaned, misrouted and duplicate vectors, then compacts
+    # (rebuilds) each collection; size and query latency are reported before and after.
+    MAINTENANCE_PAGE_SIZE = int(os.getenv("MAINTENANCE_PAGE_SIZE", "5000"))
+    MAINTENANCE_LATENCY_QUERIES = int(os.getenv("MAINTENANCE_LATENCY_QUERIES", "50"))
+    MAINTENANCE_REPORT_PATH = os.path.join(PROCESSED_DIR, "maintenance_report.json")
+
+    # --- Buffered Vector Writes ---
+    # Chunks from many files are embedded and upserted together per collection;
+    # a buffer is flushed at BATCH_SIZE chunks or after FLUSH_INTERVAL seconds.
+    VECTOR_WRITE_BUFFERED = os.getenv("VECTOR_WRITE_BUFFERED", "true").lower() == "true"
+    VECTOR_WRITE_BATCH_SIZE = int(os.getenv("VECTOR_WRITE_BATCH_SIZE", "512"))
+    VECTOR_FLUSH_INTERVAL_SECS = float(os.getenv("VECTOR_FLUSH_INTERVAL_SECS", "5"))
+
+    # --- Watch Daemon ---
+    # 'python main.py --watch' keeps models warm and ingests landing-zone changes as they
+    # happen. Backend: 'auto' (inotify via watchdog when available), 'inotify' or 'poll'.
+    DAEMON_WATCH_BACKEND = os.getenv("DAEMON_WATCH_BACKEND", "auto").lower()
+    DAEMON_DEBOUNCE_SECS = float(os.getenv("DAEMON_DEBOUNCE_SECS", "1.0"))
+    DAEMON_POLL_INTERVAL_SECS = float(os.getenv("DAEMON_POLL_INTERVAL_SECS", "2.0"))
+    DAEMON_TICK_SECS = float(os.getenv("DAEMON_TICK_SECS", "0.25"))
+    DAEMON_BATCH_SIZE = int(os.getenv("DAEMON_BATCH_SIZE", "64"))
+    DAEMON_MAX_ATTEMPTS = int(os.getenv("DAEMON_MAX_ATTEMPTS", "3"))
+    DAEMON_RECONCILE_SECS = float(os.getenv("DAEMON_RECONCILE_SECS", "3600"))
+    DAEMON_METRICS_INTERVAL_SECS = float(os.getenv("DAEMON_METRICS_INTERVAL_SECS", "10"))
+    DAEMON_QUEUE_PATH = os.path.join(PROCESSED_DIR, "work_queue.db")
+    DAEMON_METRICS_PATH = os.path.join(PROCESSED_DIR, "daemon_metrics.json")
+
+    # --- Retrieval Service ---
+    # retrieval.RetrievalService keeps the model and collection handles warm, caches
+    # query embeddings (LRU) and queries every collection the caller may read in parallel.
+    # Access levels: 'public' reads the public index only, 'restricted' both indices.
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+    RETRIEVAL_QUERY_CACHE_SIZE = int(os.getenv("RETRIEVAL_QUERY_CACHE_SIZE", "4096"))
+    RETRIEVAL_FANOUT_WORKERS = int(os.getenv("RETRIEVAL_FANOUT_WORKERS", "4"))
+    RETRIEVAL_DEFAULT_ACCESS = os.getenv("RETRIEVAL_DEFAULT_ACCESS", "public").lower()
+
+    # --- Telemetry ---
+    # Spans, counters and latency histograms across all stages (incl. pool workers).
+    # A JSON run report is written after every run; Prometheus and tracing are opt-in.
+    TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+    TELEMETRY_REPORT_PATH = os.path.join(PROCESSED_DIR, "run_report.json")
+    TELEMETRY_PROMETHEUS_PORT = int(os.getenv("TELEMETRY_PROMETHEUS_PORT", "0"))
+    # The endpoint has no authentication: loopback only unless explicitly widened
+    TELEMETRY_PROMETHEUS_HOST = os.getenv("TELEMETRY_PROMETHEUS_HOST", "127.0.0.1")
+    TELEMETRY_TRACE = os.getenv("TELEMETRY_TRACE", "false").lower() == "true"
+    TELEMETRY_TRACE_PATH = os.path.join(PROCESSED_DIR, "trace.json")
+    TELEMETRY_TRACE_MAX_EVENTS = int(os.getenv("TELEMETRY_TRACE_MAX_EVENTS", "200000"))
+    PROFILE_DIR = os.path.join(PROCESSED_DIR, "profiles")
+
+_directories_ready = False
+
+def ensure_directories():
+    """
+    Creates the data, processed and Chroma directories on first call.
+    Called by entry points and storage openers instead of at import time,
+    so importing Config stays free of filesystem side effects.
+    """
+    global _directories_ready
+    if _directories_ready:
+        return
+    for directory in [Config.DATA_DIR, Config.PROCESSED_DIR, Config.CHROMA_DB_PATH]:
+        # exist_ok makes concurrent first calls harmless
+        os.makedirs(directory, exist_ok=True)
+    _directories_ready = True
\ No newline at end of file
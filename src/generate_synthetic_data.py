@@ -1,5 +1,11 @@
+import argparse
+import csv
+import json
 import os
 import random
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
 from faker import Faker
 from reportlab.lib.pagesizes import LETTER
 from reportlab.pdfgen import canvas
@@ -33,7 +39,8 @@ def generate_hr_document(filename, include_sensitive_data=True):
         c.drawString(50, y_position, f"Email: {data_gen.email()}")
         c.drawString(50, y_position - 15, f"Phone: {data_gen.phone_number()}")
         c.drawString(50, y_position - 30, f"SSN: {data_gen.ssn()}") # <--- Compliance Trigger
-        c.drawString(50, y_position - 45, f"Address: {data_gen.address().replace('\n', ', ')}")
+        address = data_gen.address().replace('\n', ', ')
+        c.drawString(50, y_position - 45, f"Address: {address}")
         y_position -= 60
     else:
         # Inject Low Risk / Public Info (Simulating a clean profile)
@@ -83,7 +90,8 @@ def generate_finance_document(filename, is_confidential=False):
         c.drawString(50, y, f"Client Name: {data_gen.name()}")
         c.drawString(50, y-15, f"Credit Card: {data_gen.credit_card_number()}") 
         c.drawString(50, y-30, f"IBAN: {data_gen.iban()}") 
-        c.drawString(50, y-45, f"Billing Address: {data_gen.address().replace('\n', ', ')}")
+        address = data_gen.address().replace('\n', ', ')
+        c.drawString(50, y-45, f"Billing Address: {address}")
     else:
         # Inject Benign Corporate Text
         c.setFont("Helvetica", 10)
@@ -97,7 +105,213 @@ def generate_finance_document(filename, is_confidential=False):
     c.save()
     print(f"   [+] Generated Finance Artifact: {os.path.basename(filename)} | Risk Level: {'HIGH' if is_confidential else 'LOW'}")
 
-if __name__ == "__main__":
+# --- Scaled Corpus Generation (benchmarks & load tests) ---
+
+# Paragraphs per document for each size class (CSV files get 10 rows per paragraph)
+SIZE_PROFILES = {"small": (2, 4), "medium": (10, 30), "large": (80, 200)}
+CSV_ROWS_PER_PARAGRAPH = 10
+FORMATS = ("pdf", "txt", "csv", "docx")
+# Files per sub-directory, so 100k documents do not land in a single folder
+FILES_PER_DIR = 1000
+
+# One Faker per worker process, re-seeded for every document
+_worker_faker = None
+
+def parse_size_distribution(spec: str) -> list[tuple[str, float]]:
+    """
+    Parses 'small:0.7,medium:0.25,large:0.05' into [(size_class, weight), ...].
+    """
+    distribution = []
+    for item in spec.split(","):
+        name, weight = item.split(":")
+        if name not in SIZE_PROFILES:
+            raise ValueError(f"Unknown size class '{name}' (expected one of {', '.join(SIZE_PROFILES)})")
+        distribution.append((name, float(weight)))
+    return distribution
+
+def plan_corpus(count: int, seed: int, pii_ratio: float, formats: list[str], size_distribution) -> list[dict]:
+    """
+    Decides, up front and from a single seed, what every document will contain.
+    Each spec carries its own seed, so the output does not depend on how the
+    documents are spread across worker processes.
+    """
+    rng = random.Random(seed)
+    size_names = [name for name, _ in size_distribution]
+    size_weights = [weight for _, weight in size_distribution]
+
+    specs = []
+    for index in range(count):
+        specs.append({
+            "index": index,
+            "format": formats[index % len(formats)],
+            "size": rng.choices(size_names, weights=size_weights)[0],
+            "pii": rng.random() < pii_ratio,
+            "seed": rng.getrandbits(32),
+        })
+    return specs
+
+def corpus_path(spec: dict) -> str:
+    """
+    Relative path of a planned document; the name records its expected routing.
+    """
+    label = "pii" if spec["pii"] else "clean"
+    return os.path.join(
+        f"batch_{spec['index'] // FILES_PER_DIR:03d}",
+        f"doc_{spec['index']:06d}_{label}_{spec['size']}.{spec['format']}"
+    )
+
+def _pii_lines(fake, rng: random.Random) -> list[str]:
+    templates = [
+        lambda: f"Email: {fake.email()}",
+        lambda: f"Phone: {fake.phone_number()}",
+        lambda: f"SSN: {fake.ssn()}",
+        lambda: f"Credit Card: {fake.credit_card_number()}",
+        lambda: f"IBAN: {fake.iban()}",
+    ]
+    return [template() for template in rng.sample(templates, rng.randint(1, 3))]
+
+def _document_text(spec: dict, fake, rng: random.Random) -> tuple[str, list[str]]:
+    low, high = SIZE_PROFILES[spec["size"]]
+    paragraphs = [fake.paragraph(nb_sentences=rng.randint(3, 7)) for _ in range(rng.randint(low, high))]
+    if spec["pii"]:
+        # Leak the PII somewhere inside the document, not always at the top
+        for line in _pii_lines(fake, rng):
+            paragraphs.insert(rng.randint(0, len(paragraphs)), line)
+    return f"{fake.catch_phrase()} ({fake.year()})", paragraphs
+
+def _write_txt(path: str, title: str, paragraphs: list[str]):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(title + "\n\n" + "\n\n".join(paragraphs) + "\n")
+
+def _write_pdf(path: str, title: str, paragraphs: list[str]):
+    c = canvas.Canvas(path, pagesize=LETTER)
+    width, height = LETTER
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, height - 50, title)
+    c.setFont("Helvetica", 10)
+    y_position = height - 80
+
+    for paragraph in paragraphs:
+        for line in textwrap.wrap(paragraph, 95) + [""]:
+            if y_position < 50:
+                c.showPage()
+                c.setFont("Helvetica", 10)
+                y_position = height - 50
+            c.drawString(50, y_position, line)
+            y_position -= 14
+    c.save()
+
+def _write_docx(path: str, title: str, paragraphs: list[str]):
+    from docx import Document
+
+    document = Document()
+    document.add_heading(title, level=1)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+def _write_csv(path: str, spec: dict, fake, rng: random.Random, paragraph_count: int):
+    header = ["id", "name", "department", "amount", "notes"]
+    if spec["pii"]:
+        header += ["email", "ssn"]
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        for row_id in range(paragraph_count * CSV_ROWS_PER_PARAGRAPH):
+            row = [row_id, fake.name(), fake.job(), rng.randint(100, 9999), fake.sentence(nb_words=8)]
+            if spec["pii"]:
+                row += [fake.email(), fake.ssn()]
+            writer.writerow(row)
+
+def write_document(spec: dict, output_dir: str) -> int:
+    """
+    Writes one planned document.
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    global _worker_faker
+    if _worker_faker is None:
+        _worker_faker = Faker('en_US')
+    fake = _worker_faker
+    fake.seed_instance(spec["seed"])
+    rng = random.Random(spec["seed"])
+
+    path = os.path.join(output_dir, corpus_path(spec))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    title, paragraphs = _document_text(spec, fake, rng)
+    if spec["format"] == "txt":
+        _write_txt(path, title, paragraphs)
+    elif spec["format"] == "pdf":
+        _write_pdf(path, title, paragraphs)
+    elif spec["format"] == "docx":
+        _write_docx(path, title, paragraphs)
+    else:
+        _write_csv(path, spec, fake, rng, len(paragraphs))
+    return os.path.getsize(path)
+
+def _write_batch(args) -> int:
+    specs, output_dir = args
+    return sum(write_document(spec, output_dir) for spec in specs)
+
+def generate_corpus(
+    output_dir: str,
+    count: int,
+    seed: int = 42,
+    pii_ratio: float = 0.3,
+    formats: list[str] = FORMATS,
+    size_distribution: str = "small:0.7,medium:0.25,large:0.05",
+    workers: int = os.cpu_count() or 1,
+) -> dict:
+    """
+    Generates a deterministic corpus of 'count' documents in parallel.
+
+    The same (count, seed, pii_ratio, formats, size_distribution) always yields
+    byte-identical text content, whatever the worker count.
+
+    Returns:
+        dict: Corpus summary (parameters, per-format / PII counts, total bytes), also
+        saved as 'corpus.json' in the output directory.
+    """
+    specs = plan_corpus(count, seed, pii_ratio, list(formats), parse_size_distribution(size_distribution))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Batches of specs per task keep the inter-process overhead negligible
+    batch_size = max(1, min(500, count // (max(1, workers) * 8) or 1))
+    batches = [(specs[i : i + batch_size], output_dir) for i in range(0, len(specs), batch_size)]
+
+    started = time.perf_counter()
+    total_bytes = 0
+    if workers <= 1:
+        for batch in batches:
+            total_bytes += _write_batch(batch)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, written in enumerate(pool.map(_write_batch, batches), start=1):
+                total_bytes += written
+                if done % 20 == 0 or done == len(batches):
+                    print(f"   [+] {min(done * batch_size, count)}/{count} documents written")
+
+    summary = {
+        "count": count,
+        "seed": seed,
+        "pii_ratio": pii_ratio,
+        "formats": list(formats),
+        "size_distribution": size_distribution,
+        "per_format": {fmt: sum(1 for spec in specs if spec["format"] == fmt) for fmt in formats},
+        "pii_documents": sum(1 for spec in specs if spec["pii"]),
+        "total_bytes": total_bytes,
+        "generation_secs": round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(output_dir, "corpus.json"), "w", encoding="utf-8") as handle:
+        json.dump(summary, handle, indent=2)
+    return summary
+
+def generate_demo_documents():
+    """
+    The original fixed demo set: 16 HR and finance PDFs.
+    """
     print("[*] Initializing Synthetic Data Generation Sequence...")
     
     if not os.path.exists(Config.DATA_DIR):
@@ -118,4 +332,28 @@ if __name__ == "__main__":
     for i in range(1, 6):
         generate_finance_document(os.path.join(Config.DATA_DIR, f"Policy_Public_{i}.pdf"), is_confidential=False)
         
-    print(f"\n[OK] Generation Complete. 16 Synthetic Artifacts ready for ingestion.")
\ No newline at end of file
+    print(f"\n[OK] Generation Complete. 16 Synthetic Artifacts ready for ingestion.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic documents for the ingestion pipeline.")
+    parser.add_argument("--count", type=int, default=0, help="Generate a seeded corpus of N documents (default: the 16 demo PDFs)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pii-ratio", type=float, default=0.3, help="Share of documents that leak PII")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated subset of pdf,txt,csv,docx")
+    parser.add_argument("--sizes", default="small:0.7,medium:0.25,large:0.05", help="Size class weights")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=Config.DATA_DIR)
+    args = parser.parse_args()
+
+    if not args.count:
+        generate_demo_documents()
+    else:
+        print(f"[*] Generating {args.count} documents (seed={args.seed}, pii={args.pii_ratio:.0%}) in {args.output}")
+        summary = generate_corpus(
+            args.output, args.count, args.seed, args.pii_ratio,
+            args.formats.split(","), args.sizes, args.workers
+        )
+        print(
+            f"\n[OK] {summary['count']} documents ({summary['pii_documents']} with PII), "
+            f"{summary['total_bytes'] / (1024 * 1024):.1f} MB in {summary['generation_secs']}s"
+        )
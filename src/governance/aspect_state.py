@@ -0,0 +1,105 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from config import Config
+
+
+def _strip_volatile(value):
+    """
+    Removes fields that change on every emission without changing meaning:
+    the 'time' of audit stamps (any object carrying both 'time' and 'actor').
+    """
+    if isinstance(value, dict):
+        return {
+            key: _strip_volatile(item)
+            for key, item in value.items()
+            if not (key == "time" and "actor" in value)
+        }
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    return value
+
+
+def aspect_content_fingerprint(aspect) -> str:
+    """
+    Stable hash of an aspect's content, ignoring audit-stamp times.
+    """
+    payload = aspect.to_obj() if hasattr(aspect, "to_obj") else aspect
+    canonical = json.dumps(_strip_volatile(payload), sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AspectStateStore:
+    """
+    Local record of the last aspect content successfully emitted per (URN, aspect key).
+
+    DataHubGovernor consults it to skip emissions whose content has not changed
+    since the previous run, cutting steady-state GMS / MAE traffic to near zero.
+
+    State is kept per emitter target (a GMS URL, or 'file:<dir>' for the file sink),
+    so delivering to one target never suppresses emissions to another.
+    """
+
+    def __init__(self, target: str, db_path: str = Config.DATAHUB_STATE_PATH):
+        self.target = target
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(aspect_state)")]
+        if columns and "target" not in columns:
+            # Rows from before per-target state cannot be attributed to a target
+            # (they may come from mock or file runs); drop them and re-send once
+            print("[*] Resetting the DataHub aspect state (now tracked per target); every aspect is re-sent once.")
+            self._conn.execute("DROP TABLE aspect_state")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS aspect_state (
+                target TEXT NOT NULL,
+                urn TEXT NOT NULL,
+                aspect_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                emitted_at REAL NOT NULL,
+                PRIMARY KEY (target, urn, aspect_key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def is_unchanged(self, urn: str, aspect_key: str, fingerprint: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint FROM aspect_state WHERE target = ? AND urn = ? AND aspect_key = ?",
+                (self.target, urn, aspect_key)
+            ).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def remember(self, entries: list[tuple[str, str, str]]):
+        """
+        Records delivered aspects.
+
+        Args:
+            entries (list[tuple[str, str, str]]): (urn, aspect_key, fingerprint) triples.
+        """
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO aspect_state (target, urn, aspect_key, fingerprint, emitted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.target, urn, aspect_key, fingerprint, now) for urn, aspect_key, fingerprint in entries]
+            )
+            self._conn.commit()
+
+    def forget_urn(self, urn: str):
+        """
+        Drops all state for an entity, so its next emission is sent in full.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM aspect_state WHERE target = ? AND urn = ?", (self.target, urn))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,315 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datahub.specific.dataset import DatasetPatchBuilder
+from config import Config
+from telemetry import telemetry
+
+# Control markers understood by the background batching thread
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+def aspect_fingerprint(mcp) -> tuple:
+    """
+    Identity of an MCP for deduplication: target URN, aspect name, change type and
+    the serialized aspect payload.
+    """
+    aspect = mcp.aspect.to_obj() if hasattr(mcp.aspect, "to_obj") else mcp.aspect
+    return (
+        mcp.entityUrn,
+        getattr(mcp, "aspectName", None) or type(mcp.aspect).__name__,
+        str(mcp.changeType),
+        json.dumps(aspect, sort_keys=True, default=str),
+    )
+
+
+class _Batch:
+    """
+    MCPs and lineage edges sent together, plus the submissions waiting on their outcome.
+    """
+
+    def __init__(self):
+        self.mcps = []
+        self.lineage = {}
+        self.keys = []
+        self.waiters = []
+
+
+class _Waiter:
+    """
+    One submission's on_done callback: fires once every batch carrying its aspects is done.
+    """
+
+    def __init__(self, on_done):
+        self.on_done = on_done
+        self.pending = 0
+        self.ok = True
+
+
+class BatchingEmitter:
+    """
+    Non-blocking front for a DataHub emitter.
+
+    Submitted MCPs are queued and sent from a background thread in batches of
+    'batch_size' (or every 'flush_interval' seconds). An aspect identical to one that
+    is still queued or in flight is not sent twice. The upstream edges collected for
+    one vector index are merged into a single lineage patch per batch. At most
+    'max_in_flight' batches are on the wire at once, and failed batches are retried
+    with exponential backoff.
+
+    A submission's callback reports the outcome of every batch that carries its
+    aspects, including earlier batches its duplicates were folded into. Once a batch is
+    delivered or dropped, its aspects are forgotten, so a later submission sends them again.
+    """
+
+    def __init__(
+        self,
+        emitter,
+        batch_size: int = Config.DATAHUB_BATCH_SIZE,
+        flush_interval: float = Config.DATAHUB_FLUSH_INTERVAL_SECS,
+        max_in_flight: int = Config.DATAHUB_MAX_IN_FLIGHT,
+        max_retries: int = Config.DATAHUB_MAX_RETRIES,
+        retry_backoff: float = Config.DATAHUB_RETRY_BACKOFF_SECS,
+        queue_size: int = Config.DATAHUB_QUEUE_SIZE,
+    ):
+        self.emitter = emitter
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = {"submitted": 0, "deduplicated": 0, "sent": 0, "batches": 0, "failed_batches": 0}
+
+        # Bounded: if GMS falls behind, producers eventually block instead of buffering forever
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="datahub-emit")
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Aspect fingerprint / lineage edge -> the queued or in-flight _Batch carrying it.
+        # Written by the batching thread and by senders finishing a batch.
+        self._carriers = {}
+        self._carriers_lock = threading.Lock()
+        # Owned by the batching thread only
+        self._pending = _Batch()
+
+        self._worker = threading.Thread(target=self._run, name="datahub-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, mcps: list, lineage: tuple | None = None, on_done=None):
+        """
+        Queues the MCPs of one file.
+
+        Args:
+            mcps (list): Aspect MCPs to emit.
+            lineage (tuple): Optional (vector_index_urn, UpstreamClass) edge to merge into a patch.
+            on_done (callable): Optional callback(bool) fired once every batch carrying these
+                MCPs is sent (True) or one of them was dropped (False).
+        """
+        self._queue.put((mcps, lineage, on_done))
+
+    def flush(self):
+        """
+        Barrier: returns once everything submitted so far has been sent (or given up on).
+        """
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait()
+
+    def close(self):
+        """
+        Final flush, then stops the background thread and the sender pool.
+        """
+        self.flush()
+        self._queue.put((_STOP, None))
+        self._worker.join()
+        self._pool.shutdown(wait=True)
+
+    # --- Background thread ---
+
+    def _run(self):
+        last_dispatch = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_dispatch))
+            try:
+                item = self._queue.get(timeout=timeout if self.flush_interval > 0 else None)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item[0] == _STOP:
+                return
+
+            # The thread must survive any single item: flush() and close() wait on it
+            try:
+                if item is None:
+                    # Time threshold reached
+                    self._dispatch()
+                    last_dispatch = time.monotonic()
+                elif item[0] == _FLUSH:
+                    try:
+                        self._dispatch()
+                        self._wait_for_in_flight()
+                    finally:
+                        item[1].set()
+                        last_dispatch = time.monotonic()
+                else:
+                    self._submit_item(*item)
+                    if len(self._pending.mcps) + len(self._pending.lineage) >= self.batch_size:
+                        self._dispatch()
+                        last_dispatch = time.monotonic()
+            except Exception as e:
+                print(f"   [!] DataHub Error: Batching failed ({e})")
+
+    def _submit_item(self, mcps, lineage, on_done):
+        try:
+            self._accumulate(mcps, lineage, on_done)
+        except Exception as e:
+            # e.g. an aspect that does not serialize; the file is retried on the next run
+            print(f"   [!] DataHub Error: Could not queue {len(mcps)} MCPs ({e})")
+            if on_done:
+                self._notify(on_done, False)
+
+    def _accumulate(self, mcps, lineage, on_done):
+        with self._stats_lock:
+            self.stats["submitted"] += len(mcps) + (1 if lineage else 0)
+
+        batch = self._pending
+        items = [(aspect_fingerprint(mcp), mcp) for mcp in mcps]
+        if lineage:
+            vector_urn, upstream = lineage
+            items.append(((vector_urn, upstream.dataset), None))
+
+        deduplicated = 0
+        # Always wait on the current batch, so callbacks keep their submission order
+        carriers = {id(batch): batch}
+        with self._carriers_lock:
+            for key, mcp in items:
+                carrier = self._carriers.get(key)
+                if carrier is None:
+                    self._carriers[key] = batch
+                    batch.keys.append(key)
+                    if mcp is None:
+                        batch.lineage.setdefault(vector_urn, []).append(upstream)
+                    else:
+                        batch.mcps.append(mcp)
+                    continue
+
+                # Queued or in flight: this submission is only delivered once that batch is
+                deduplicated += 1
+                carriers[id(carrier)] = carrier
+
+            if on_done:
+                waiter = _Waiter(on_done)
+                waiter.pending = len(carriers)
+                for carrier in carriers.values():
+                    carrier.waiters.append(waiter)
+
+        if deduplicated:
+            with self._stats_lock:
+                self.stats["deduplicated"] += deduplicated
+
+    def _dispatch(self):
+        batch = self._pending
+        if not (batch.mcps or batch.lineage or batch.waiters):
+            return
+        self._pending = _Batch()
+
+        try:
+            payload = list(batch.mcps)
+            # One lineage patch per vector index, carrying every upstream edge collected
+            for vector_urn, upstreams in batch.lineage.items():
+                patch_builder = DatasetPatchBuilder(vector_urn)
+                for upstream in upstreams:
+                    patch_builder.add_upstream_lineage(upstream)
+                payload.extend(patch_builder.build())
+        except Exception as e:
+            print(f"   [!] DataHub Error: Could not build a batch of {len(batch.mcps)} MCPs ({e})")
+            self._finish(batch, False)
+            return
+
+        # Blocks while 'max_in_flight' batches are already being sent
+        self._in_flight.acquire()
+        future = self._pool.submit(self._send, payload, batch)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget_future)
+
+    def _forget_future(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def _wait_for_in_flight(self):
+        with self._futures_lock:
+            pending = list(self._futures)
+        for future in pending:
+            future.result()
+
+    # --- Sender threads ---
+
+    def _send(self, payload: list, batch: _Batch):
+        ok = False
+        try:
+            ok = self._send_with_retry(payload)
+        finally:
+            self._in_flight.release()
+            self._finish(batch, ok)
+
+    def _finish(self, batch: _Batch, ok: bool):
+        """
+        Records a batch's outcome and fires the callbacks that were only waiting on it.
+        """
+        ready = []
+        with self._carriers_lock:
+            # Delivered or dropped, the next submission of these aspects is sent again:
+            # metadata may have changed in between (A -> B -> A), and the aspect state
+            # already skips what is unchanged across runs
+            for key in batch.keys:
+                if self._carriers.get(key) is batch:
+                    del self._carriers[key]
+            for waiter in batch.waiters:
+                waiter.ok = waiter.ok and ok
+                waiter.pending -= 1
+                if waiter.pending == 0:
+                    ready.append(waiter)
+            batch.waiters = []
+
+        for waiter in ready:
+            self._notify(waiter.on_done, waiter.ok)
+
+    @staticmethod
+    def _notify(on_done, ok: bool):
+        try:
+            on_done(ok)
+        except Exception as e:
+            print(f"   [!] DataHub callback failed ({e})")
+
+    def _send_with_retry(self, batch: list) -> bool:
+        if not batch:
+            return True
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with telemetry.span("datahub_send_batch", mcps=len(batch), attempt=attempt):
+                    if hasattr(self.emitter, "emit_mcps"):
+                        self.emitter.emit_mcps(batch)
+                    else:
+                        for mcp in batch:
+                            self.emitter.emit(mcp)
+                telemetry.count("datahub_mcps_sent", len(batch))
+                with self._stats_lock:
+                    self.stats["sent"] += len(batch)
+                    self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                telemetry.count("datahub_send_errors")
+                if attempt == self.max_retries:
+                    with self._stats_lock:
+                        self.stats["failed_batches"] += 1
+                    print(f"   [!] DataHub Error: Dropping batch of {len(batch)} MCPs after {attempt + 1} attempts ({e})")
+                    return False
+                # Exponential backoff: backoff, 2x backoff, 4x backoff, ...
+                time.sleep(self.retry_backoff * (2 ** attempt))
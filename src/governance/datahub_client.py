@@ -1,20 +1,114 @@
+import threading
 import time
-from datahub.emitter.rest_emitter import DatahubRestEmitter
 from datahub.emitter.mcp import MetadataChangeProposalWrapper
 from datahub.specific.dataset import DatasetPatchBuilder
 import datahub.metadata.schema_classes as models
+from governance.batch_emitter import BatchingEmitter
+from governance.emitters import build_emitter, emitter_target
+from governance.urns import source_dataset_urn, vector_index_urn
+from governance.aspect_state import AspectStateStore, aspect_content_fingerprint
 from config import Config
+from telemetry import telemetry
 
 class DataHubGovernor:
     """
     Handles all interactions with the DataHub GMS.
     Responsible for emitting lineage, ownership, tags, and custom properties.
+
+    In 'batched' mode (Config.DATAHUB_EMIT_MODE) emission is handed to a
+    BatchingEmitter and no longer blocks the caller; call close() before exiting.
+
+    With change tracking enabled, aspects whose content (minus audit-stamp times)
+    matches what was last delivered for that URN to the same target are skipped.
+    'force_resync' re-sends everything while still refreshing the local state.
+    The in-process mock GMS starts empty every run, so it is never tracked.
+
+    The backend is pluggable: pass any object with emit()/emit_mcps(), or let
+    Config.DATAHUB_EMITTER pick one ('rest', 'file' or 'mock').
     """
     
-    def __init__(self):
-        self.emitter = DatahubRestEmitter(gms_server=Config.DATAHUB_URL, token=Config.DATAHUB_TOKEN)
+    def __init__(
+        self,
+        mode: str = Config.DATAHUB_EMIT_MODE,
+        track_changes: bool = Config.DATAHUB_SKIP_UNCHANGED,
+        force_resync: bool = Config.DATAHUB_FORCE_RESYNC,
+        emitter=None,
+    ):
+        self.mock_server = None
+        if emitter is None:
+            emitter, self.mock_server = build_emitter()
+        self.emitter = emitter
+        self.batcher = BatchingEmitter(self.emitter) if mode == "batched" else None
+        track_changes = track_changes and self.mock_server is None
+        self.state = AspectStateStore(emitter_target(self.emitter)) if track_changes else None
+        self.force_resync = force_resync
+        self.skipped_unchanged = 0
+        self._stats_lock = threading.Lock()
+
+    def flush(self):
+        """
+        Blocks until every queued MCP has been sent (no-op in sync mode).
+        """
+        if self.batcher:
+            self.batcher.flush()
+
+    def close(self):
+        """
+        Final flush/barrier; must run before the pipeline returns.
+        """
+        if self.batcher:
+            self.batcher.close()
+        if self.state:
+            self.state.close()
+        if hasattr(self.emitter, "close"):
+            self.emitter.close()
+        if self.mock_server:
+            self.mock_server.stop()
+
+    def emission_stats(self) -> dict:
+        stats = dict(self.batcher.stats) if self.batcher else {}
+        stats["skipped_unchanged"] = self.skipped_unchanged
+        return stats
+
+    def _filter_unchanged(self, mcps, lineage_key):
+        """
+        Drops aspects identical to the last delivered state.
+
+        Returns:
+            tuple: (changed mcps, whether the lineage edge changed, state entries to record on delivery)
+        """
+        vector_db_urn, upstream = lineage_key
+        candidates = [(mcp.entityUrn, mcp.aspectName, aspect_content_fingerprint(mcp.aspect)) for mcp in mcps]
+        # Lineage is appended edge by edge, so it is tracked per upstream source
+        lineage_entry = (vector_db_urn, f"upstreamLineage:{upstream.dataset}", aspect_content_fingerprint(upstream))
+
+        if not self.state:
+            return mcps, True, []
+
+        changed_mcps = []
+        pending_entries = []
+        skipped = 0
+        for mcp, entry in zip(mcps, candidates):
+            if not self.force_resync and self.state.is_unchanged(*entry):
+                skipped += 1
+                continue
+            changed_mcps.append(mcp)
+            pending_entries.append(entry)
+
+        lineage_changed = self.force_resync or not self.state.is_unchanged(*lineage_entry)
+        if lineage_changed:
+            pending_entries.append(lineage_entry)
+        else:
+            skipped += 1
+
+        with self._stats_lock:
+            self.skipped_unchanged += skipped
+        telemetry.count("datahub_aspects_skipped_unchanged", skipped)
+
+        return changed_mcps, lineage_changed, pending_entries
 
-    def emit_file_metadata(self, filename, target_collection, pii_details, chunk_count, system_meta=None):
+    @telemetry.timed("datahub_emit")
+    def emit_file_metadata(self, filename, target_collection, pii_details, chunk_count, system_meta=None, on_done=None):
         """
         Emits metadata for a processed file.
         
@@ -24,14 +118,13 @@ class DataHubGovernor:
             pii_details (list): List of Personally Identifiable Information, findings (if any).
             chunk_count (int): Number of text chunks extracted.
             system_meta (dict): OS level metadata (size, creation time, etc.).
+            on_done (callable): Optional callback(bool) fired once the metadata is delivered.
         """
-        # Ensure URNs are cross platform compatible
-        clean_filename = filename.replace("\\", "/")
-        source_urn = f"urn:li:dataset:(urn:li:dataPlatform:external,file://{clean_filename},PROD)"
-        vector_db_urn = f"urn:li:dataset:(urn:li:dataPlatform:pinecone,{target_collection},PROD)"
+        source_urn = source_dataset_urn(filename)
+        vector_db_urn = vector_index_urn(target_collection)
 
         # 1. Assigning Ownership
-        self.emitter.emit(MetadataChangeProposalWrapper(
+        ownership_mcp = MetadataChangeProposalWrapper(
             entityUrn=vector_db_urn,
             aspect=models.OwnershipClass(
                 owners=[models.OwnerClass(
@@ -39,22 +132,67 @@ class DataHubGovernor:
                     type=models.OwnershipTypeClass.DATA_STEWARD
                 )]
             )
-        ))
+        )
 
-        # 2. Patch Lineage
-        # We used DatasetPatchBuilder to append upstream edges without overwriting existing lineage 
-        patch_builder = DatasetPatchBuilder(vector_db_urn)
-        patch_builder.add_upstream_lineage(models.UpstreamClass(
+        # 2. Lineage Edge (Source File -> Vector Index)
+        upstream = models.UpstreamClass(
             dataset=source_urn,
             type=models.DatasetLineageTypeClass.TRANSFORMED,
             auditStamp=models.AuditStampClass(
                 time=int(time.time() * 1000), 
                 actor="urn:li:corpuser:ingestion-script"
             )
-        ))
-        
-        for patch_mcp in patch_builder.build():
-            self.emitter.emit(patch_mcp)
+        )
+
+        governance_mcps = self._build_governance_mcps(source_urn, vector_db_urn, pii_details, chunk_count, system_meta)
+
+        # 4. Changed-Aspect Filter
+        # Only aspects that differ from the last delivered state go on the wire
+        mcps, lineage_changed, pending_entries = self._filter_unchanged(
+            [ownership_mcp] + governance_mcps, (vector_db_urn, upstream)
+        )
+
+        def _on_delivered(ok):
+            if ok and self.state:
+                self.state.remember(pending_entries)
+            if on_done:
+                on_done(ok)
+
+        if not mcps and not lineage_changed:
+            _on_delivered(True)
+            return
+
+        if self.batcher:
+            # Queued: ownership/tags are deduplicated and lineage merged per vector index
+            self.batcher.submit(
+                mcps,
+                lineage=(vector_db_urn, upstream) if lineage_changed else None,
+                on_done=_on_delivered
+            )
+            return
+
+        if ownership_mcp in mcps:
+            self.emitter.emit(ownership_mcp)
+
+        # We used DatasetPatchBuilder to append upstream edges without overwriting existing lineage 
+        if lineage_changed:
+            patch_builder = DatasetPatchBuilder(vector_db_urn)
+            patch_builder.add_upstream_lineage(upstream)
+            for patch_mcp in patch_builder.build():
+                self.emitter.emit(patch_mcp)
+
+        for mcp in mcps:
+            if mcp is not ownership_mcp:
+                self.emitter.emit(mcp)
+        telemetry.count("datahub_mcps_sent", len(mcps) + (1 if lineage_changed else 0))
+
+        _on_delivered(True)
+
+    def _build_governance_mcps(self, source_urn, vector_db_urn, pii_details, chunk_count, system_meta):
+        """
+        Builds the properties, glossary term and PII tag aspects for a file.
+        """
+        mcps = []
 
         # 3. Construct Properties & Governance Aspects
         # Initialize base operational metadata
@@ -75,7 +213,7 @@ class DataHubGovernor:
                 "pii_audit_log": " | ".join(pii_details[:10])
             })
             
-            self.emitter.emit(MetadataChangeProposalWrapper(
+            mcps.append(MetadataChangeProposalWrapper(
                 entityUrn=source_urn,
                 aspect=models.GlossaryTermsClass(
                     terms=[models.GlossaryTermAssociationClass(urn="urn:li:glossaryTerm:Classification.Sensitive")],
@@ -84,7 +222,7 @@ class DataHubGovernor:
             ))
             
             # Tag destination index as containing PII
-            self.emitter.emit(MetadataChangeProposalWrapper(
+            mcps.append(MetadataChangeProposalWrapper(
                 entityUrn=vector_db_urn,
                 aspect=models.GlobalTagsClass(tags=[models.TagAssociationClass(tag="urn:li:tag:PII")])
             ))
@@ -95,7 +233,8 @@ class DataHubGovernor:
             })
 
         # Emit final properties to the source entity
-        self.emitter.emit(MetadataChangeProposalWrapper(
+        mcps.append(MetadataChangeProposalWrapper(
             entityUrn=source_urn,
             aspect=models.DatasetPropertiesClass(customProperties=custom_props)
-        ))
\ No newline at end of file
+        ))
+        return mcps
\ No newline at end of file
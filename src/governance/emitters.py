@@ -0,0 +1,238 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from datahub.emitter.rest_emitter import DatahubRestEmitter
+from config import Config
+
+
+class FileEmitter:
+    """
+    Offline sink that writes MCPs to disk instead of calling GMS.
+
+    'jsonl' writes one serialized MCP per line (easy to split, stream and diff);
+    'json' writes a single JSON array, the layout 'datahub ingest' reads with the
+    file source, so runs can be bulk-replayed later:
+
+        source:
+          type: file
+          config:
+            path: data/processed/datahub_mcps
+
+    Every run gets its own file under DATAHUB_FILE_SINK_DIR: the aspect state marks
+    the MCPs as delivered, so a dump must survive until it has been ingested.
+    An explicit 'path' is overwritten.
+    """
+
+    def __init__(self, path: str | None = None, fmt: str = Config.DATAHUB_FILE_SINK_FORMAT):
+        self.path = path or run_sink_path(fmt)
+        self.fmt = fmt
+        self.records_written = 0
+        self._lock = threading.Lock()
+        self._handle = open(self.path, "w", encoding="utf-8")
+        if self.fmt == "json":
+            self._handle.write("[\n")
+
+    def emit(self, mcp, callback=None):
+        self.emit_mcps([mcp])
+        if callback:
+            callback(None, "success")
+
+    def emit_mcps(self, mcps: list) -> int:
+        lines = [json.dumps(mcp.to_obj(), sort_keys=True) for mcp in mcps]
+        with self._lock:
+            for line in lines:
+                if self.fmt == "json":
+                    self._handle.write((",\n" if self.records_written else "") + line)
+                else:
+                    self._handle.write(line + "\n")
+                self.records_written += 1
+        return len(lines)
+
+    def flush(self):
+        with self._lock:
+            self._handle.flush()
+
+    def close(self):
+        with self._lock:
+            if self._handle.closed:
+                return
+            if self.fmt == "json":
+                self._handle.write("\n]\n")
+            self._handle.close()
+
+
+def run_sink_path(fmt: str = Config.DATAHUB_FILE_SINK_FORMAT, sink_dir: str = Config.DATAHUB_FILE_SINK_DIR) -> str:
+    """
+    A new, timestamped dump file for this run, e.g. 'mcps-20240501-101500.jsonl'.
+    """
+    os.makedirs(sink_dir, exist_ok=True)
+    stem = f"mcps-{time.strftime('%Y%m%d-%H%M%S')}"
+    extension = "json" if fmt == "json" else "jsonl"
+    path = os.path.join(sink_dir, f"{stem}.{extension}")
+    attempt = 1
+    # Two runs within the same second
+    while os.path.exists(path):
+        attempt += 1
+        path = os.path.join(sink_dir, f"{stem}-{attempt}.{extension}")
+    return path
+
+
+class MockGMSServer:
+    """
+    In-process HTTP stand-in for DataHub GMS, for offline runs, profiling and load tests.
+
+    Accepts the Rest.li ingestion endpoints used by DatahubRestEmitter, records every
+    request, and can inject a fixed per-request latency and a random error rate.
+
+    Usage:
+        with MockGMSServer(latency_ms=20) as gms:
+            emitter = DatahubRestEmitter(gms_server=gms.url)
+    """
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0, port: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = []
+        self.mcp_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-gms", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _record(self, method: str, path: str, body: dict | None) -> bool:
+        """
+        Stores the request; returns False when an error should be injected.
+        """
+        proposals = 0
+        if body:
+            if "proposals" in body:
+                proposals = len(body["proposals"])
+            elif "proposal" in body:
+                proposals = 1
+
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+            self.requests.append({
+                "method": method,
+                "path": path,
+                "proposals": proposals,
+                "failed": fail,
+                "received_at": time.time(),
+            })
+            if not fail:
+                self.mcp_count += proposals
+        return not fail
+
+    def _handler_class(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                # Keep the CLI output clean
+                pass
+
+            def _reply(self, status: int, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if urlparse(self.path).path == "/config":
+                    self._reply(200, {
+                        "noCode": "true",
+                        "patchCapable": True,
+                        "statefulIngestionCapable": True,
+                        "versions": {"acryldata/datahub": {"version": "v0.13.0", "commit": "mock-gms"}},
+                    })
+                else:
+                    self._reply(404, {"message": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = None
+
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+
+                parsed = urlparse(self.path)
+                action = parse_qs(parsed.query).get("action", [""])[0]
+                ok = server._record("POST", f"{parsed.path}?action={action}" if action else parsed.path, body)
+
+                if not ok:
+                    self._reply(500, {"message": "Injected failure", "status": 500})
+                elif action == "ingestProposalBatch":
+                    self._reply(200, {"value": [None] * len((body or {}).get("proposals", []))})
+                else:
+                    self._reply(200, {"value": None})
+
+        return _Handler
+
+
+def emitter_target(emitter) -> str:
+    """
+    Where an emitter delivers to: the GMS URL, or 'file:<dir>' for the file sink.
+    Keys the aspect state, so one target's deliveries never count for another.
+    """
+    if isinstance(emitter, FileEmitter):
+        return f"file:{os.path.dirname(os.path.abspath(emitter.path))}"
+    gms_server = getattr(emitter, "_gms_server", None)
+    if gms_server:
+        return gms_server.rstrip("/")
+    return type(emitter).__name__
+
+
+def build_emitter(kind: str = Config.DATAHUB_EMITTER):
+    """
+    Creates the emitter backend selected in Config.
+
+    Args:
+        kind (str): 'rest' (live GMS), 'file' (offline MCP dump) or 'mock' (in-process GMS stand-in).
+
+    Returns:
+        tuple: (emitter, mock_server or None). The mock server must be stopped by the caller.
+    """
+    if kind == "file":
+        return FileEmitter(), None
+
+    if kind == "mock":
+        mock_server = MockGMSServer(
+            latency_ms=Config.DATAHUB_MOCK_LATENCY_MS,
+            error_rate=Config.DATAHUB_MOCK_ERROR_RATE
+        ).start()
+        return DatahubRestEmitter(gms_server=mock_server.url), mock_server
+
+    return DatahubRestEmitter(gms_server=Config.DATAHUB_URL, token=Config.DATAHUB_TOKEN), None
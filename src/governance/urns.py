@@ -0,0 +1,19 @@
+# DataHub URNs of the entities the pipeline emits metadata for.
+# Kept free of DataHub SDK imports, so the retrieval side can attach the same
+# lineage identifiers to search results without loading the emitter stack.
+
+
+def source_dataset_urn(filename: str) -> str:
+    """
+    URN of a landing-zone source file.
+    """
+    # Ensure URNs are cross platform compatible
+    clean_filename = filename.replace("\\", "/")
+    return f"urn:li:dataset:(urn:li:dataPlatform:external,file://{clean_filename},PROD)"
+
+
+def vector_index_urn(collection_name: str) -> str:
+    """
+    URN of a vector index (Chroma collection).
+    """
+    return f"urn:li:dataset:(urn:li:dataPlatform:pinecone,{collection_name},PROD)"
@@ -1,14 +1,194 @@
-from unstructured.partition.auto import partition
+import csv
+import io
+import os
+from config import Config
+from telemetry import telemetry
 
+def partition(*args, **kwargs):
+    # Unstructured is imported on first use: it is slow to import and the
+    # native TXT/CSV readers never need it
+    from unstructured.partition.auto import partition as unstructured_partition
+    return unstructured_partition(*args, **kwargs)
+
+def split_oversized(text: str, max_chars: int = Config.MAX_CHUNK_CHARS) -> list[str]:
+    """
+    Size-aware chunking: splits text longer than 'max_chars' into windows,
+    cutting at the last whitespace before the limit where possible.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + max_chars // 2, end)
+            if cut == -1:
+                cut = text.rfind("\n", start + max_chars // 2, end)
+            if cut != -1:
+                end = cut + 1
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+def format_csv_rows(header: list[str] | None, rows: list[list[str]]) -> str:
+    """
+    Renders a window of CSV rows as text, repeating the header so every window keeps its column context.
+    """
+    lines = [" ".join(header)] if header else []
+    lines.extend(" ".join(row) for row in rows)
+    return "\n".join(lines)
+
+def _iter_pdf_elements(file_path: str):
+    # Page-range partitioning: only 'PDF_PAGE_WINDOW' pages are parsed at a time
+    from pypdf import PdfReader, PdfWriter
+
+    try:
+        reader = PdfReader(file_path)
+        page_count = len(reader.pages)
+    except Exception:
+        # pypdf could not read it; let Unstructured handle the whole file as before
+        page_count = 0
+
+    if page_count <= Config.PDF_PAGE_WINDOW:
+        # Small document: a single pass, identical to the original behaviour
+        yield from partition(filename=file_path)
+        return
+
+    for start in range(0, page_count, Config.PDF_PAGE_WINDOW):
+        writer = PdfWriter()
+        for page_number in range(start, min(start + Config.PDF_PAGE_WINDOW, page_count)):
+            writer.add_page(reader.pages[page_number])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        buffer.seek(0)
+
+        yield from partition(file=buffer, content_type="application/pdf", metadata_filename=file_path)
+
+def _iter_unstructured_texts(file_path: str):
+    # 'partition' automatically detects file type (PDF, CSV, TXT, etc.)
+    return (str(el) for el in partition(filename=file_path))
+
+def _iter_pdf_texts(file_path: str):
+    return (str(el) for el in _iter_pdf_elements(file_path))
+
+def _iter_text_paragraphs(file_path: str, max_chars: int = Config.MAX_CHUNK_CHARS):
+    # Native TXT reader: one chunk per blank-line separated paragraph, lines joined
+    # with spaces (the same granularity Unstructured's text partitioner produces).
+    # A paragraph is cut into 'max_chars' windows while it is read, and lines are read
+    # at most 'max_chars' at a time, so a file without blank lines never sits in memory whole.
+    limit = max_chars if max_chars > 0 else -1
+    with open(file_path, "r", encoding="utf-8", errors="replace") as handle:
+        paragraph = ""
+        starts_line = True
+        for fragment in iter(lambda: handle.readline(limit), ""):
+            ends_line = fragment.endswith("\n")
+            text = fragment.lstrip() if starts_line else fragment
+            text = text.rstrip() if ends_line else text
+
+            if starts_line and ends_line and not text:
+                # Blank line: paragraph boundary
+                if paragraph:
+                    yield paragraph
+                    paragraph = ""
+            elif text:
+                # Lines are joined with a space; the pieces of one long line are not
+                paragraph += (" " if starts_line and paragraph else "") + text
+                if max_chars > 0 and len(paragraph) > max_chars:
+                    *windows, paragraph = split_oversized(paragraph, max_chars)
+                    yield from windows
+            starts_line = ends_line
+
+        if paragraph:
+            yield paragraph
+
+def _iter_csv_windows(file_path: str, max_chars: int = Config.MAX_CHUNK_CHARS):
+    # Native CSV reader: row windows that repeat the header, instead of one giant table element.
+    # A window closes after CSV_ROW_WINDOW rows or once it would exceed 'max_chars', so
+    # split_oversized never has to cut it (which would lose the header for the later pieces).
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        header_chars = len(" ".join(header)) if header else 0
+        # Each row costs its text plus the newline before it
+        row_budget = max_chars - header_chars if max_chars > 0 else 0
+        rows = []
+        rows_chars = 0
+        for row in reader:
+            row_chars = len(" ".join(row)) + 1
+            if rows and row_budget > 0 and rows_chars + row_chars > row_budget:
+                yield format_csv_rows(header, rows)
+                rows, rows_chars = [], 0
+
+            if header and row_budget > 0 and row_chars > row_budget:
+                # A single row wider than the budget: cut it, repeating the header on every piece
+                for piece in split_oversized(" ".join(row), row_budget - 1):
+                    yield format_csv_rows(header, [[piece]])
+                continue
+
+            rows.append(row)
+            rows_chars += row_chars
+            if len(rows) >= Config.CSV_ROW_WINDOW:
+                yield format_csv_rows(header, rows)
+                rows, rows_chars = [], 0
+        if rows or header:
+            yield format_csv_rows(header, rows)
+
+# Loader registry: file extension -> generator of raw text chunks.
+# Plain text and CSV are read natively; layout-heavy formats stay on Unstructured.
+LOADERS = {
+    ".pdf": _iter_pdf_texts,
+    ".docx": _iter_unstructured_texts,
+    ".txt": _iter_text_paragraphs,
+    ".csv": _iter_csv_windows,
+}
+
+# Reader names for error messages
+LOADER_NAMES = {
+    _iter_pdf_texts: "pypdf + Unstructured",
+    _iter_unstructured_texts: "Unstructured",
+    _iter_text_paragraphs: "native TXT",
+    _iter_csv_windows: "native CSV",
+}
+
+def select_loader(file_path: str, native: bool = Config.NATIVE_LOADERS):
+    """
+    The LOADERS reader for a file; Unstructured's auto-detection for unknown
+    extensions, or for TXT/CSV when 'native' is off.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    loader = LOADERS.get(extension, _iter_unstructured_texts)
+    if not native and loader in (_iter_text_paragraphs, _iter_csv_windows):
+        loader = _iter_unstructured_texts
+    return loader
+
+def loader_name(file_path: str, native: bool = Config.NATIVE_LOADERS) -> str:
+    return LOADER_NAMES[select_loader(file_path, native)]
+
+def iter_chunks(file_path: str, native: bool = Config.NATIVE_LOADERS):
+    """
+    Streams text chunks from a file without materializing the whole document.
+
+    The reader is picked from LOADERS by extension: PDFs are partitioned in page
+    ranges, TXT and CSV are read natively (paragraphs / header + row windows).
+    With 'native' off, or for unknown extensions, Unstructured's auto-detection
+    is used. Any chunk longer than Config.MAX_CHUNK_CHARS is split, so downstream
+    stages work on bounded windows.
+
+    Raises whatever the reader raises; callers decide how to report it.
+    """
+    for text in select_loader(file_path, native)(file_path):
+        yield from split_oversized(text)
+
+@telemetry.timed("partition")
 def load_and_chunk_file(file_path):
     """
-    We use Unstructured.io to automatically detect 
-    file types (PDF, CSV, DOCX, TXT) and extract text content.
+    Extracts text content from a file (PDF, CSV, DOCX, TXT) via the loader registry:
+    native readers for TXT/CSV, Unstructured.io for the rest.
     """
     try:
-        # 'partition' automatically detects file type (PDF, CSV, TXT, etc.)
-        elements = partition(filename=file_path)
-        return [str(el) for el in elements]
+        return list(iter_chunks(file_path))
     except Exception as e:
-        print(f" Unstructured Error: {e}")
-        return []
\ No newline at end of file
+        print(f" {loader_name(file_path)} Error: {e}")
+        return []
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+
+# Files are hashed in 1 MB blocks so large documents never sit fully in memory.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Change states reported by IngestionManifest.check()
+STATUS_NEW = "new"
+STATUS_MODIFIED = "modified"
+STATUS_UNCHANGED = "unchanged"
+
+
+def compute_content_hash(file_path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's raw bytes.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """
+    Persistent record of every file the pipeline has ingested.
+
+    Each entry is keyed by the file's path relative to Config.DATA_DIR and stores
+    its size, mtime and content hash, plus where its vectors were routed.
+    Size/mtime act as a cheap first check; the content hash is only computed
+    when they differ, so 'touched' but identical files are still skipped.
+    """
+
+    def __init__(self, db_path: str = Config.MANIFEST_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                rel_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                target_collection TEXT,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                ingested_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, rel_path: str) -> dict | None:
+        """
+        Returns the stored entry for a file, or None if it was never ingested.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash, target_collection, chunk_count "
+                "FROM files WHERE rel_path = ?",
+                (rel_path,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "size": row[0],
+            "mtime_ns": row[1],
+            "content_hash": row[2],
+            "target_collection": row[3],
+            "chunk_count": row[4],
+        }
+
+    def check(self, full_path: str, rel_path: str) -> tuple[str, dict]:
+        """
+        Compares a file on disk against its manifest entry.
+
+        Args:
+            full_path (str): Absolute path of the file.
+            rel_path (str): Path relative to Config.DATA_DIR (manifest key).
+
+        Returns:
+            tuple[str, dict]: The change status (new / modified / unchanged) and
+            the file's current fingerprint (size, mtime_ns, content_hash).
+        """
+        stats = os.stat(full_path)
+        entry = self.get(rel_path)
+
+        # Fast path: identical size and mtime means the file was not rewritten
+        if entry and entry["size"] == stats.st_size and entry["mtime_ns"] == stats.st_mtime_ns:
+            return STATUS_UNCHANGED, {
+                "size": stats.st_size,
+                "mtime_ns": stats.st_mtime_ns,
+                "content_hash": entry["content_hash"],
+            }
+
+        fingerprint = {
+            "size": stats.st_size,
+            "mtime_ns": stats.st_mtime_ns,
+            "content_hash": compute_content_hash(full_path),
+        }
+
+        if entry is None:
+            return STATUS_NEW, fingerprint
+
+        if entry["content_hash"] == fingerprint["content_hash"]:
+            # Touched (copied, restored from backup) but byte-identical: refresh stats only
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE rel_path = ?",
+                    (fingerprint["size"], fingerprint["mtime_ns"], rel_path)
+                )
+                self._conn.commit()
+            return STATUS_UNCHANGED, fingerprint
+
+        return STATUS_MODIFIED, fingerprint
+
+    def record(self, rel_path: str, fingerprint: dict, target_collection: str | None, chunk_count: int):
+        """
+        Stores (or replaces) the entry for a successfully processed file.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(rel_path, size, mtime_ns, content_hash, target_collection, chunk_count, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    rel_path,
+                    fingerprint["size"],
+                    fingerprint["mtime_ns"],
+                    fingerprint["content_hash"],
+                    target_collection,
+                    chunk_count,
+                    time.time(),
+                )
+            )
+            self._conn.commit()
+
+    def update_collection(self, rel_path: str, target_collection: str):
+        """
+        Points an existing entry at the collection now holding the file's vectors,
+        keeping its fingerprint (a re-routed file whose emission failed is still retried).
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET target_collection = ? WHERE rel_path = ?", (target_collection, rel_path)
+            )
+            self._conn.commit()
+
+    def remove(self, rel_path: str):
+        """
+        Drops a file from the manifest (used once its vectors are purged).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE rel_path = ?", (rel_path,))
+            self._conn.commit()
+
+    def paths_under(self, rel_dir: str) -> list[str]:
+        """
+        Relative paths of every recorded file below a directory (relative to DATA_DIR).
+        """
+        prefix = rel_dir.rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rel_path FROM files WHERE substr(rel_path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return [rel_path for (rel_path,) in rows]
+
+    def missing_files(self, seen_paths: set[str]) -> list[tuple[str, str | None]]:
+        """
+        Lists manifest entries whose file no longer exists in the landing zone.
+
+        Args:
+            seen_paths (set[str]): Relative paths discovered during this run.
+
+        Returns:
+            list[tuple[str, str | None]]: (rel_path, target_collection) pairs.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT rel_path, target_collection FROM files").fetchall()
+        return [(rel_path, collection) for rel_path, collection in rows if rel_path not in seen_paths]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,7 @@
-from presidio_analyzer import AnalyzerEngine
+import re
+import threading
+from config import Config
+from telemetry import telemetry
 
 # We limit the analysis chunk size to prevent NLP model memory overflows (spaCy limit).
 MAX_ANALYSIS_CHUNK_SIZE = 500_000
@@ -10,44 +13,181 @@ TARGET_ENTITIES = ["EMAIL_ADDRESS", "PHONE_NUMBER", "US_SSN", "CREDIT_CARD", "IB
 # Lowered to 0.4 to catch 'fuzzy' matches in OCR'd documents.
 CONFIDENCE_THRESHOLD = 0.4
 
-# Initialize the NLP engine once at module level to avoid reload overhead
-_analyzer = AnalyzerEngine()
+# Entities detected purely by Presidio's pattern / checksum recognizers.
+# None of them read spaCy's named entities, only tokens & lemmas (for context words).
+PATTERN_ENTITIES = {"EMAIL_ADDRESS", "PHONE_NUMBER", "US_SSN", "CREDIT_CARD", "IBAN_CODE"}
 
+# spaCy components that only feed NER-based recognizers (PERSON, LOCATION, ...).
+# The tagger & lemmatizer stay enabled: context enhancement needs the lemmas.
+NER_ONLY_COMPONENTS = ("ner", "parser")
+
+# Cheap prefilter: every pattern entity needs either an '@' (email) or a run of at
+# least 5 digits separated only by punctuation/whitespace (phone, SSN, card, IBAN).
+# Text without such a candidate cannot produce a finding, so Presidio is skipped.
+_CANDIDATE_PATTERN = re.compile(r"@|\d(?:[\W_]{0,4}\d){4,}")
+
+def _pattern_only_enabled() -> bool:
+    if Config.PII_NLP_MODE == "pattern":
+        return True
+    if Config.PII_NLP_MODE == "auto":
+        return set(TARGET_ENTITIES) <= PATTERN_ENTITIES
+    return False
+
+_PATTERN_ONLY = _pattern_only_enabled()
+
+# The NLP engine is built once per process, on first use, to avoid reload overhead
+# without making every importer (CLI tools, the parent of the worker pool) pay for spaCy.
+_analyzer = None
+_batch_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def _load_analyzers():
+    global _analyzer, _batch_analyzer
+    if _batch_analyzer is not None:
+        return
+    with _analyzer_lock:
+        if _batch_analyzer is not None:
+            return
+        from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+
+        analyzer = AnalyzerEngine()
+        if _PATTERN_ONLY:
+            # Skip the expensive NER/parser passes; findings for pattern entities are unaffected
+            for nlp in getattr(analyzer.nlp_engine, "nlp", {}).values():
+                for component in NER_ONLY_COMPONENTS:
+                    if component in nlp.pipe_names:
+                        nlp.disable_pipe(component)
+        _analyzer = analyzer
+        _batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+
+def get_analyzer():
+    """
+    Returns the process-wide Presidio AnalyzerEngine (thread-safe, loaded on first call).
+    """
+    _load_analyzers()
+    return _analyzer
+
+def get_batch_analyzer():
+    """
+    Returns the BatchAnalyzerEngine wrapping get_analyzer().
+    """
+    _load_analyzers()
+    return _batch_analyzer
+
+def _may_contain_pii(text: str) -> bool:
+    """
+    Returns False only when the text provably holds no candidate for the target entities.
+    """
+    # Only sound while every target entity is pattern based: a PERSON needs neither '@' nor digits
+    if not set(TARGET_ENTITIES) <= PATTERN_ENTITIES:
+        return True
+    return _CANDIDATE_PATTERN.search(text) is not None
+
+def _split_for_analysis(text_content: str) -> list[str]:
+    # Slice text into safe memory chunks
+    return [
+        text_content[i : i + MAX_ANALYSIS_CHUNK_SIZE]
+        for i in range(0, len(text_content), MAX_ANALYSIS_CHUNK_SIZE)
+    ]
+
+def _is_trivial(text_content) -> bool:
+    return not text_content or not isinstance(text_content, str) or len(text_content.strip()) < 5
+
+def _collect_findings(results, detected_entities: set):
+    for result in results:
+        if result.score >= CONFIDENCE_THRESHOLD:
+            detected_entities.add(result.entity_type)
+
+def _analyze_chunk(chunk: str, detected_entities: set):
+    try:
+        results = get_analyzer().analyze(
+            text=chunk,
+            entities=TARGET_ENTITIES,
+            language='en'
+        )
+        _collect_findings(results, detected_entities)
+
+    except Exception as e:
+        print(f"   [!] PII Scan Warning: Sub chunk analysis failed ({e})")
+
+@telemetry.timed("pii_scan_text")
 def scan_for_pii(text_content: str) -> list[str]:
     """
     Analyzes text for sensitive PII entities using Microsoft Presidio.
 
     Args:
         text_content (str): The raw string extracted from a document.
-        
+
     Returns:
         list[str]: Unique list of detected entity types (e.g. ['US_SSN', 'CREDIT_CARD']).
     """
     # Fail fast on empty or trivial input
-    if not text_content or not isinstance(text_content, str) or len(text_content.strip()) < 5:
+    if _is_trivial(text_content):
         return []
 
     detected_entities = set()
 
-    # Generator to slice text into safe memory chunks
-    chunks = (
-        text_content[i : i + MAX_ANALYSIS_CHUNK_SIZE] 
-        for i in range(0, len(text_content), MAX_ANALYSIS_CHUNK_SIZE)
-    )
+    for chunk in _split_for_analysis(text_content):
+        if _may_contain_pii(chunk):
+            _analyze_chunk(chunk, detected_entities)
+
+    return list(detected_entities)
+
+def scan_chunks_for_pii(text_chunks: list[str]) -> list[list[str]]:
+    """
+    Document-level variant of scan_for_pii: analyzes all chunks of a file in one call.
+
+    Chunks rejected by the prefilter never reach Presidio; the rest go through
+    spaCy's batched 'nlp.pipe' via Presidio's BatchAnalyzerEngine.
+
+    Args:
+        text_chunks (list[str]): Every chunk extracted from one document.
+
+    Returns:
+        list[list[str]]: Detected entity types per chunk, in input order
+        (identical to calling scan_for_pii on each chunk).
+    """
+    findings = [set() for _ in text_chunks]
+
+    # 1. Collect the sub chunks that actually need analysis, remembering their owner
+    pending_texts = []
+    owners = []
+    prefiltered = 0
+    for index, text_content in enumerate(text_chunks):
+        if _is_trivial(text_content):
+            continue
+        for chunk in _split_for_analysis(text_content):
+            if _may_contain_pii(chunk):
+                pending_texts.append(chunk)
+                owners.append(index)
+            else:
+                prefiltered += 1
+    telemetry.count("pii_chunks_analyzed", len(pending_texts))
+    telemetry.count("pii_chunks_prefiltered", prefiltered)
+
+    # 2. Batched analysis, falling back to one-by-one scanning if the batch fails
+    for start in range(0, len(pending_texts), Config.PII_BATCH_SIZE):
+        batch = pending_texts[start : start + Config.PII_BATCH_SIZE]
+        batch_owners = owners[start : start + Config.PII_BATCH_SIZE]
 
-    for chunk in chunks:
         try:
-            results = _analyzer.analyze(
-                text=chunk, 
-                entities=TARGET_ENTITIES, 
-                language='en'
+            batch_results = get_batch_analyzer().analyze_iterator(
+                texts=batch,
+                language='en',
+                entities=TARGET_ENTITIES,
+                batch_size=Config.PII_BATCH_SIZE
             )
-            
-            for result in results:
-                if result.score >= CONFIDENCE_THRESHOLD:
-                    detected_entities.add(result.entity_type)
-
         except Exception as e:
-            print(f"   [!] PII Scan Warning: Sub chunk analysis failed ({e})")
+            print(f"   [!] PII Scan Warning: Batch analysis failed, scanning individually ({e})")
+            for owner, chunk in zip(batch_owners, batch):
+                _analyze_chunk(chunk, findings[owner])
+            continue
+
+        for owner, results in zip(batch_owners, batch_results):
+            _collect_findings(results, findings[owner])
 
-    return list(detected_entities)
\ No newline at end of file
+    if telemetry.enabled:
+        for entities in findings:
+            for entity in entities:
+                telemetry.count("pii_hits", entity=entity)
+    return [list(entities) for entities in findings]
@@ -0,0 +1,105 @@
+import json
+import os
+import uuid
+from config import Config
+
+
+class ChunkSpool:
+    """
+    The extracted chunks of one file, handed between pipeline stages.
+
+    Small files keep their chunks in memory. Once the running text size passes
+    'spill_threshold' characters, every chunk is streamed to a JSONL file instead,
+    so arbitrarily large documents never sit fully in a worker's memory. Downstream
+    stages read the chunks back in bounded windows. The object is plain data, so it
+    pickles cheaply across the process pool.
+    """
+
+    def __init__(self, chunks: list[str] | None = None, path: str | None = None, count: int = 0, total_chars: int = 0):
+        self.chunks = chunks
+        self.path = path
+        self.count = count
+        self.total_chars = total_chars
+
+    @classmethod
+    def from_iter(
+        cls,
+        chunk_iter,
+        spill_dir: str = Config.SPOOL_DIR,
+        spill_threshold: int = Config.SPOOL_THRESHOLD_CHARS,
+    ) -> "ChunkSpool":
+        """
+        Consumes a chunk generator, spilling to disk once it grows past the threshold.
+        """
+        in_memory = []
+        total_chars = 0
+        count = 0
+        path = None
+        handle = None
+
+        try:
+            for chunk in chunk_iter:
+                count += 1
+                total_chars += len(chunk)
+
+                if handle is None and total_chars > spill_threshold:
+                    # Too big to hold: move what we have to disk and keep streaming there
+                    os.makedirs(spill_dir, exist_ok=True)
+                    path = os.path.join(spill_dir, f"{uuid.uuid4().hex}.jsonl")
+                    handle = open(path, "w", encoding="utf-8")
+                    for buffered in in_memory:
+                        handle.write(json.dumps(buffered) + "\n")
+                    in_memory = None
+
+                if handle is not None:
+                    handle.write(json.dumps(chunk) + "\n")
+                else:
+                    in_memory.append(chunk)
+        except BaseException:
+            if handle is not None:
+                handle.close()
+                os.remove(path)
+            raise
+
+        if handle is not None:
+            handle.close()
+            return cls(path=path, count=count, total_chars=total_chars)
+        return cls(chunks=in_memory, count=count, total_chars=total_chars)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def iter_windows(self, window_size: int = Config.CHUNK_WINDOW_SIZE):
+        """
+        Yields the chunks in lists of at most 'window_size', in document order.
+        """
+        window_size = max(1, window_size)
+        if self.path is None:
+            for start in range(0, len(self.chunks or []), window_size):
+                yield self.chunks[start : start + window_size]
+            return
+
+        window = []
+        with open(self.path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                window.append(json.loads(line))
+                if len(window) >= window_size:
+                    yield window
+                    window = []
+        if window:
+            yield window
+
+    def to_list(self) -> list[str]:
+        """
+        Materializes every chunk (only for callers that need the whole document at once).
+        """
+        return [chunk for window in self.iter_windows() for chunk in window]
+
+    def discard(self):
+        """
+        Deletes the spill file, if any.
+        """
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+        self.chunks = None
@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from config import Config
+
+
+class LandingZoneWatcher:
+    """
+    Reports files in the landing zone that were created, changed or deleted.
+
+    Change events come from inotify (through the optional 'watchdog' package) on
+    Linux, or from periodic directory snapshots as a fallback. Either way a file is
+    only reported once its size and mtime have stayed stable for 'debounce_secs',
+    so partially written or still-copying files are never ingested half-way.
+
+    A folder deleted or moved away arrives as a single inotify event; 'known_paths'
+    (e.g. IngestionManifest.paths_under) lists the ingested files below it, which
+    are then reported as deleted, just like the polling backend would.
+
+    Usage:
+        watcher = LandingZoneWatcher(extensions=VALID_EXTENSIONS, known_paths=manifest.paths_under).start()
+        settled, deleted = watcher.poll()   # call regularly
+    """
+
+    def __init__(
+        self,
+        data_dir: str = Config.DATA_DIR,
+        extensions: tuple = (),
+        debounce_secs: float = Config.DAEMON_DEBOUNCE_SECS,
+        poll_interval: float = Config.DAEMON_POLL_INTERVAL_SECS,
+        backend: str = Config.DAEMON_WATCH_BACKEND,
+        known_paths=None,
+    ):
+        self.data_dir = data_dir
+        self.known_paths = known_paths
+        self.extensions = extensions
+        self.debounce_secs = debounce_secs
+        self.poll_interval = poll_interval
+        self.backend = self._resolve_backend(backend)
+        self._lock = threading.Lock()
+        # rel_path -> [first_seen, last_change, size, mtime_ns]
+        self._candidates = {}
+        # rel_path -> first_seen
+        self._deleted = {}
+        self._observer = None
+        self._snapshot = {}
+        self._last_scan = 0.0
+
+    @staticmethod
+    def _resolve_backend(backend: str) -> str:
+        if backend == "poll":
+            return "poll"
+        try:
+            from watchdog.observers.inotify import InotifyObserver  # noqa: F401
+            return "inotify"
+        except Exception:
+            # Not Linux, or watchdog is not installed
+            if backend == "inotify":
+                print("[!] inotify backend unavailable (install 'watchdog' on Linux); falling back to polling")
+            return "poll"
+
+    def start(self):
+        if self.backend == "inotify":
+            from watchdog.observers.inotify import InotifyObserver
+
+            self._observer = InotifyObserver()
+            self._observer.schedule(self._event_handler(), self.data_dir, recursive=True)
+            self._observer.start()
+        else:
+            # Baseline: only changes after startup are reported
+            self._snapshot = self._scan()
+            self._last_scan = time.monotonic()
+        return self
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def poll(self) -> tuple[list[tuple[str, float]], list[tuple[str, float]]]:
+        """
+        Returns the changes that are ready to be processed.
+
+        Returns:
+            tuple: (settled, deleted), each a list of (rel_path, first_seen) pairs.
+        """
+        if self.backend == "poll" and time.monotonic() - self._last_scan >= self.poll_interval:
+            self._poll_snapshot()
+
+        now = time.time()
+        settled = []
+        with self._lock:
+            deleted = list(self._deleted.items())
+            self._deleted.clear()
+
+            for rel_path, state in list(self._candidates.items()):
+                first_seen, last_change, size, mtime_ns = state
+                try:
+                    stats = os.stat(os.path.join(self.data_dir, rel_path))
+                except FileNotFoundError:
+                    # Vanished before settling: report it as a deletion
+                    del self._candidates[rel_path]
+                    deleted.append((rel_path, first_seen))
+                    continue
+
+                if (stats.st_size, stats.st_mtime_ns) != (size, mtime_ns):
+                    # Still being written
+                    state[1:] = [now, stats.st_size, stats.st_mtime_ns]
+                elif now - last_change >= self.debounce_secs:
+                    del self._candidates[rel_path]
+                    settled.append((rel_path, first_seen))
+
+        return settled, deleted
+
+    def pending(self) -> int:
+        """
+        Number of changed files still waiting for their writes to settle.
+        """
+        with self._lock:
+            return len(self._candidates)
+
+    # --- Change intake ---
+
+    def _relevant(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return not name.startswith(".") and name.lower().endswith(self.extensions)
+
+    def _touch(self, full_path: str):
+        if not self._relevant(full_path):
+            return
+        rel_path = os.path.relpath(full_path, self.data_dir)
+        now = time.time()
+        try:
+            stats = os.stat(full_path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._deleted.pop(rel_path, None)
+            state = self._candidates.get(rel_path)
+            if state is None:
+                self._candidates[rel_path] = [now, now, stats.st_size, stats.st_mtime_ns]
+            else:
+                state[1:] = [now, stats.st_size, stats.st_mtime_ns]
+
+    def _mark_deleted(self, full_path: str):
+        if not self._relevant(full_path):
+            return
+        rel_path = os.path.relpath(full_path, self.data_dir)
+        with self._lock:
+            state = self._candidates.pop(rel_path, None)
+            self._deleted.setdefault(rel_path, state[0] if state else time.time())
+
+    def _mark_tree_deleted(self, directory: str):
+        rel_dir = os.path.relpath(directory, self.data_dir)
+        prefix = rel_dir + os.sep
+        with self._lock:
+            rel_paths = [rel_path for rel_path in self._candidates if rel_path.startswith(prefix)]
+        if self.known_paths:
+            rel_paths.extend(self.known_paths(rel_dir))
+        for rel_path in dict.fromkeys(rel_paths):
+            self._mark_deleted(os.path.join(self.data_dir, rel_path))
+
+    def _inside(self, path: str) -> bool:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(self.data_dir)]) == os.path.abspath(self.data_dir)
+
+    def _touch_tree(self, directory: str):
+        # A directory moved or copied in arrives as a single event
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                self._touch(os.path.join(root, filename))
+
+    # --- Polling backend ---
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        stack = [self.data_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif self._relevant(entry.name):
+                    try:
+                        stats = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.path] = (stats.st_size, stats.st_mtime_ns)
+        return snapshot
+
+    def _poll_snapshot(self):
+        current = self._scan()
+        for full_path, signature in current.items():
+            if self._snapshot.get(full_path) != signature:
+                self._touch(full_path)
+        for full_path in self._snapshot.keys() - current.keys():
+            self._mark_deleted(full_path)
+        self._snapshot = current
+        self._last_scan = time.monotonic()
+
+    # --- inotify backend ---
+
+    def _event_handler(self):
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if event.is_directory:
+                    watcher._touch_tree(event.src_path)
+                else:
+                    watcher._touch(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher._touch(event.src_path)
+
+            def on_closed(self, event):
+                watcher._touch(event.src_path)
+
+            def on_deleted(self, event):
+                if event.is_directory:
+                    watcher._mark_tree_deleted(event.src_path)
+                else:
+                    watcher._mark_deleted(event.src_path)
+
+            def on_moved(self, event):
+                if event.is_directory:
+                    # Renamed inside the zone or moved away: the old paths are gone either way
+                    watcher._mark_tree_deleted(event.src_path)
+                    if watcher._inside(event.dest_path):
+                        watcher._touch_tree(event.dest_path)
+                    return
+                watcher._mark_deleted(event.src_path)
+                watcher._touch(event.dest_path)
+
+        return _Handler()
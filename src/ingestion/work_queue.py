@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+from config import Config
+
+STATE_PENDING = "pending"
+STATE_IN_PROGRESS = "in_progress"
+# Changed again while being processed: goes back to pending once the current attempt ends
+STATE_REQUEUED = "requeued"
+
+
+class WorkQueue:
+    """
+    Persistent, deduplicated queue of landing-zone paths waiting to be ingested.
+
+    Each path appears at most once. A path that changes again while it is being
+    processed is re-queued after the current attempt, so no edit is lost. Rows
+    survive restarts: anything claimed but not finished is pending again on open.
+    """
+
+    def __init__(self, db_path: str = Config.DAEMON_QUEUE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work_queue (
+                rel_path TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL
+            )
+            """
+        )
+        # Recover from a crash or restart mid-batch
+        self._conn.execute(
+            "UPDATE work_queue SET state = ? WHERE state IN (?, ?)",
+            (STATE_PENDING, STATE_IN_PROGRESS, STATE_REQUEUED)
+        )
+        self._conn.commit()
+
+    def put(self, rel_path: str, first_seen: float | None = None):
+        """
+        Enqueues a path (no-op if it is already pending).
+
+        Args:
+            rel_path (str): Path relative to Config.DATA_DIR.
+            first_seen (float): When the change was first observed (epoch secs);
+                kept from the earliest enqueue, so lag covers the whole wait.
+        """
+        now = time.time()
+        first_seen = first_seen or now
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM work_queue WHERE rel_path = ?", (rel_path,)
+            ).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO work_queue (rel_path, first_seen, enqueued_at, attempts, state) "
+                    "VALUES (?, ?, ?, 0, ?)",
+                    (rel_path, first_seen, now, STATE_PENDING)
+                )
+            elif row[0] == STATE_IN_PROGRESS:
+                self._conn.execute(
+                    "UPDATE work_queue SET state = ? WHERE rel_path = ?", (STATE_REQUEUED, rel_path)
+                )
+            self._conn.commit()
+
+    def claim(self, limit: int) -> list[tuple[str, float, int]]:
+        """
+        Marks up to 'limit' of the oldest pending paths as in progress.
+
+        Returns:
+            list[tuple[str, float, int]]: (rel_path, first_seen, attempts) per claimed path.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rel_path, first_seen, attempts FROM work_queue "
+                "WHERE state = ? ORDER BY enqueued_at LIMIT ?",
+                (STATE_PENDING, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE work_queue SET state = ?, attempts = attempts + 1 WHERE rel_path = ?",
+                [(STATE_IN_PROGRESS, rel_path) for rel_path, _, _ in rows]
+            )
+            self._conn.commit()
+        return [(rel_path, first_seen, attempts + 1) for rel_path, first_seen, attempts in rows]
+
+    def finish(self, rel_path: str, retry: bool = False):
+        """
+        Ends the current attempt for a path.
+
+        Args:
+            rel_path (str): The claimed path.
+            retry (bool): Put it back in the queue (the attempt failed).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM work_queue WHERE rel_path = ?", (rel_path,)
+            ).fetchone()
+            if row is None:
+                return
+            if retry or row[0] == STATE_REQUEUED:
+                # A re-queued path restarts its attempt budget: it is a new version
+                attempts_sql = "attempts" if retry and row[0] != STATE_REQUEUED else "0"
+                self._conn.execute(
+                    f"UPDATE work_queue SET state = ?, enqueued_at = ?, attempts = {attempts_sql} "
+                    "WHERE rel_path = ?",
+                    (STATE_PENDING, time.time(), rel_path)
+                )
+            else:
+                self._conn.execute("DELETE FROM work_queue WHERE rel_path = ?", (rel_path,))
+            self._conn.commit()
+
+    def depth(self) -> int:
+        """
+        Number of paths waiting or being processed.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM work_queue").fetchone()[0]
+
+    def oldest_first_seen(self) -> float | None:
+        """
+        Observation time of the oldest queued change (for lag metrics), or None if empty.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT MIN(first_seen) FROM work_queue").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,88 +1,186 @@
-import os
-import datetime
-from config import Config
-from ingestion.loader import load_and_chunk_file
-from ingestion.pii_scanner import scan_for_pii
-from storage.vector_store import save_to_chroma
+import argparse
+import time
+from config import Config, ensure_directories
+from ingestion.manifest import IngestionManifest
 from governance.datahub_client import DataHubGovernor
+from pipeline.executor import StagedExecutor
+from pipeline.journal import StageJournal
+from pipeline.stages import IngestionStages
+from storage.vector_store import BufferedVectorWriter, dedup_stats, embedding_cache_stats
+from telemetry import MetricsServer, telemetry
 
-def run_pipeline():
+def run_pipeline(resume: bool = False):
     """
     Orchestrates the End-to-End RAG Pipeline:
     Discovery -> Extraction -> Inspection -> Routing -> Storage -> Governance
-    """
-    print(f"[*] Initializing Pipeline using Data Directory: {Config.DATA_DIR}")
-    
-    governor = DataHubGovernor()
-    valid_extensions = ('.pdf', '.csv', '.txt', '.docx')
-    
-    # 1. File Discovery (Deep Traversal)
-    pending_files = []
-    for root, _, filenames in os.walk(Config.DATA_DIR):
-        for filename in filenames:
-            if filename.lower().endswith(valid_extensions):
-                full_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(full_path, Config.DATA_DIR)
-                pending_files.append((full_path, rel_path))
 
-    if not pending_files:
-        print(f"[!] No valid documents found to process.")
-        return
+    Files stream through bounded queues between stages; partitioning and PII
+    scanning run in process pools, the remaining stages on worker threads.
 
-    print(f"[*] Found {len(pending_files)} documents. Beginning ingestion sequence...")
+    Args:
+        resume (bool): Continue files of an interrupted run from their last
+            journaled stage instead of re-partitioning and re-scanning them.
 
-    for full_path, rel_path in pending_files:
-        print(f"\n[Processing] {rel_path}")
+    Returns:
+        dict: Run report (counters, wall time, per-stage timings) for benchmarks and tooling.
+    """
+    print(f"[*] Initializing Pipeline using Data Directory: {Config.DATA_DIR}")
+    ensure_directories()
 
-        # 2. System Metadata Extraction (Operational Metadata)
-        # Capturing raw OS level attributes before processing
-        stats = os.stat(full_path)
-        system_meta = {
-            "file_size_kb": f"{round(stats.st_size / 1024, 2)}",
-            "created_at": datetime.datetime.fromtimestamp(stats.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-            "extension": os.path.splitext(filename)[1].lower()
-        }
+    governor = DataHubGovernor()
+    manifest = IngestionManifest() if Config.INCREMENTAL_INGESTION else None
+    # Unbuffered mode still goes through the writer, flushing every window immediately
+    writer = BufferedVectorWriter() if Config.VECTOR_WRITE_BUFFERED else BufferedVectorWriter(batch_size=1, max_delay=0)
+    journal = StageJournal() if Config.ARTIFACTS_ENABLED else None
+    if resume:
+        if journal:
+            print(f"[*] Resuming: {journal.incomplete_count()} files not yet stored and emitted in the journal")
+        else:
+            print("[!] --resume needs ARTIFACTS_ENABLED=true; running normally.")
+    stages = IngestionStages(governor, manifest, writer, journal, resume=resume)
+    executor = StagedExecutor(stages.build_stages())
+    metrics_server = MetricsServer().start() if Config.TELEMETRY_PROMETHEUS_PORT else None
 
-        # 3. Content Ingestion (via Unstructured.io)
-        text_chunks = load_and_chunk_file(full_path)
-        if not text_chunks:
-            print(f"   [Skipped] No text extracted.")
-            continue
+    print(
+        f"[*] Workers: partition={Config.PIPELINE_PARTITION_WORKERS}, scan={Config.PIPELINE_SCAN_WORKERS}, "
+        f"store={Config.PIPELINE_STORE_WORKERS}, "
+        f"emit={Config.PIPELINE_EMIT_WORKERS} | queue size={Config.PIPELINE_QUEUE_SIZE}"
+    )
 
-        # 4. Governance Policy Validation (PII Scanning)
-        has_pii = False
-        pii_log = []
-        
-        for i, chunk in enumerate(text_chunks):
-            secrets = scan_for_pii(chunk)
-            if secrets:
-                has_pii = True
-                # Log first few characters of chunk index for audit trail
-                pii_log.append(f"Chunk {i}: {', '.join(secrets)}")
+    started = time.perf_counter()
+    try:
+        processed = executor.run(stages.discover())
+    finally:
+        # Final flush: remaining buffered chunks are embedded and written before we exit
+        writer.close()
+        # Barrier: every queued DataHub MCP is delivered before the run is reported done
+        governor.close()
+        if manifest:
+            manifest.close()
+        if journal:
+            journal.close()
+        if metrics_server:
+            metrics_server.stop()
 
-        # 5. Semantic Routing (The 'Sorting Hat' Logic)
-        if has_pii:
-            target_collection = Config.COLLECTION_SECURE
-            print(f"   [!] PII DETECTED. Routing to Secure Index.")
-        else:
-            target_collection = Config.COLLECTION_PUBLIC
-            print(f"   [OK] Content Clean. Routing to Public Index.")
+    summary = stages.stats
+    report = {
+        "processed": processed,
+        "elapsed_secs": time.perf_counter() - started,
+        "stats": dict(summary),
+        "errors": executor.errors,
+        "stage_timings": executor.stage_timings,
+        "vector_flush_timings": writer.flush_timings,
+        "emission": governor.emission_stats(),
+        "dedup": dedup_stats(),
+    }
+    report_path = telemetry.write_report(report)
+    if not summary["discovered"]:
+        print(f"[!] No valid documents found to process.")
+        return report
 
-        # 6. Vector Storage (ChromaDB)
-        save_to_chroma(text_chunks, rel_path, target_collection)
+    print(
+        f"\n[*] Summary: {summary['discovered']} discovered, {summary['skipped']} unchanged, "
+        f"{processed} processed ({summary['secure']} secure / {summary['public']} public), "
+        f"{summary['empty']} empty, {summary['purged']} purged, {summary['resumed']} resumed, "
+        f"{summary['store_failed'] + summary['emit_failed'] + executor.errors} failed"
+    )
 
-        # 7. Metadata Publication (DataHub)
-        # Emits technical, operational, and business metadata to the catalog
-        governor.emit_file_metadata(
-            filename=rel_path, 
-            target_collection=target_collection,
-            pii_details=pii_log,
-            chunk_count=len(text_chunks),
-            system_meta=system_meta
-        ) 
-        print("   [+] DataHub Lineage & Governance updated.")
+    emission_stats = governor.emission_stats()
+    if "sent" in emission_stats:
+        print(
+            f"[*] DataHub: {emission_stats['sent']} MCPs sent in {emission_stats['batches']} batches, "
+            f"{emission_stats['deduplicated']} deduplicated, {emission_stats['failed_batches']} failed batches"
+        )
+    print(f"[*] DataHub: {emission_stats['skipped_unchanged']} unchanged aspects skipped")
 
+    cache_stats = embedding_cache_stats()
+    if cache_stats:
+        print(
+            f"[*] Embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries, {cache_stats['size_mb']} MB"
+        )
+    chunk_dedup = dedup_stats()
+    if chunk_dedup:
+        print(
+            f"[*] Dedup: {chunk_dedup['embeddings_saved']} of {chunk_dedup['chunks']} chunks linked instead of embedded "
+            f"({chunk_dedup['saved_ratio']:.0%}; {chunk_dedup['exact_duplicates']} exact, "
+            f"{chunk_dedup['near_duplicates']} near), {chunk_dedup['chars_skipped']} chars skipped"
+        )
+    if report_path:
+        print(f"[*] Run report: {report_path}")
     print("\n[Done] Pipeline execution complete.")
+    return report
+
+def run_maintenance(args):
+    """
+    Index maintenance entry point: '--delete-source' removes specific files,
+    '--rebalance' re-shards the collections, '--maintain' purges stale vectors
+    and compacts them.
+    """
+    from storage.maintenance import IndexMaintenance, print_report
+
+    ensure_directories()
+    manifest = IngestionManifest()
+    journal = StageJournal() if Config.ARTIFACTS_ENABLED else None
+    maintenance = IndexMaintenance(manifest=manifest, journal=journal)
+    try:
+        if args.delete_source:
+            for rel_path, deleted in maintenance.delete_sources(args.delete_source).items():
+                print(f"   [-] Deleted {deleted} vectors for {rel_path}")
+        if args.rebalance:
+            maintenance.rebalance(dry_run=args.dry_run)
+        if args.maintain:
+            report = maintenance.run(compact=not args.no_compact, dry_run=args.dry_run)
+            print_report(report)
+            report_path = telemetry.write_report(report, Config.MAINTENANCE_REPORT_PATH)
+            if report_path:
+                print(f"[*] Maintenance report: {report_path}")
+    finally:
+        manifest.close()
+        if journal:
+            journal.close()
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="DataHub AI Governance ingestion pipeline.")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Run as a daemon: keep models warm and ingest landing-zone changes continuously"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Pick up files of an interrupted run after their last completed stage"
+    )
+    parser.add_argument(
+        "--replay", choices=["store", "emit", "all"],
+        help="Re-run only vector storage, DataHub emission or both from the stage journal"
+    )
+    parser.add_argument(
+        "--files", nargs="+", metavar="REL_PATH",
+        help="With --replay: only these files (relative to the data directory)"
+    )
+    parser.add_argument(
+        "--maintain", action="store_true",
+        help="Purge orphaned/duplicate vectors and compact both indices (stop the pipeline first)"
+    )
+    parser.add_argument(
+        "--rebalance", action="store_true",
+        help="Move vectors into the shards the current SHARD_* settings route them to (stop the pipeline first)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="With --maintain / --rebalance: only report what would change")
+    parser.add_argument("--no-compact", action="store_true", help="With --maintain: purge without rebuilding")
+    parser.add_argument(
+        "--delete-source", nargs="+", metavar="REL_PATH",
+        help="Delete every vector of these source files from both indices"
+    )
+    args = parser.parse_args()
+
+    if args.watch:
+        from pipeline.daemon import IngestionDaemon
+        IngestionDaemon().run()
+    elif args.maintain or args.rebalance or args.delete_source:
+        run_maintenance(args)
+    elif args.replay:
+        from pipeline.replay import replay
+        replay(args.replay, args.files)
+    else:
+        run_pipeline(resume=args.resume)
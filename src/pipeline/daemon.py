@@ -0,0 +1,191 @@
+import collections
+import json
+import os
+import signal
+import threading
+import time
+from config import Config, ensure_directories
+from ingestion.manifest import IngestionManifest
+from ingestion.watcher import LandingZoneWatcher
+from ingestion.work_queue import WorkQueue
+from governance.datahub_client import DataHubGovernor
+from pipeline.executor import StagedExecutor
+from pipeline.journal import StageJournal
+from pipeline.stages import IngestionStages, VALID_EXTENSIONS
+from pipeline.warmup import preload
+from storage.vector_store import BufferedVectorWriter
+from telemetry import MetricsServer, percentile, telemetry
+
+# Drop-to-indexed latencies kept for the percentile metrics
+LATENCY_WINDOW = 500
+
+
+class IngestionDaemon:
+    """
+    Long-running variant of run_pipeline: models stay loaded and only changed files are processed.
+
+    Loop:
+    1. The watcher reports settled (fully written) and deleted files.
+    2. They go into the persistent WorkQueue, so nothing is lost across restarts.
+    3. Batches are claimed and pushed through the same IngestionStages as a batch run,
+       on an executor whose process pools (and loaded models) persist between batches.
+    4. Vectors and metadata are flushed right after each batch, making the files searchable.
+
+    A full reconciliation walk runs at startup and every DAEMON_RECONCILE_SECS to
+    catch anything the watcher missed (downtime, inotify queue overflow).
+    """
+
+    def __init__(self):
+        ensure_directories()
+        self.governor = DataHubGovernor()
+        self.manifest = IngestionManifest()
+        # Flushed explicitly after every batch; the timer only covers long batches
+        self.writer = BufferedVectorWriter()
+        # Retries resume after the last completed stage instead of re-partitioning
+        self.journal = StageJournal() if Config.ARTIFACTS_ENABLED else None
+        self.stages = IngestionStages(self.governor, self.manifest, self.writer, self.journal, resume=True)
+        self.executor = StagedExecutor(self.stages.build_stages(), persistent_pools=True)
+        self.queue = WorkQueue()
+        self.watcher = LandingZoneWatcher(extensions=VALID_EXTENSIONS, known_paths=self.manifest.paths_under)
+
+        self.metrics = {
+            "files_indexed": 0, "files_failed": 0, "files_retried": 0, "batches": 0,
+            "last_batch_secs": 0.0, "started_at": time.time(),
+        }
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._stop = threading.Event()
+        self._last_reconcile = 0.0
+        self._last_metrics = 0.0
+        self._metrics_server = None
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run(self):
+        print(f"[*] Starting watch daemon on {Config.DATA_DIR} (backend: {self.watcher.backend})")
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            # 1. Warm everything up before the first file arrives
+            preload()
+            if Config.TELEMETRY_PROMETHEUS_PORT:
+                self._metrics_server = MetricsServer().start()
+            self.watcher.start()
+            self._reconcile()
+
+            # 2. Main loop
+            while not self._stop.is_set():
+                settled, deleted = self.watcher.poll()
+                for rel_path, first_seen in settled + deleted:
+                    self.queue.put(rel_path, first_seen)
+
+                if time.monotonic() - self._last_reconcile >= Config.DAEMON_RECONCILE_SECS:
+                    self._reconcile()
+
+                batch = self.queue.claim(Config.DAEMON_BATCH_SIZE)
+                if batch:
+                    self._process(batch)
+                else:
+                    self._stop.wait(Config.DAEMON_TICK_SECS)
+
+                if time.monotonic() - self._last_metrics >= Config.DAEMON_METRICS_INTERVAL_SECS:
+                    self._report_metrics()
+        finally:
+            self.close()
+
+    def close(self):
+        self.watcher.stop()
+        self.executor.close()
+        self.writer.close()
+        self.governor.close()
+        self.manifest.close()
+        if self.journal:
+            self.journal.close()
+        self._report_metrics()
+        self.queue.close()
+        if self._metrics_server:
+            self._metrics_server.stop()
+        print("[Done] Watch daemon stopped.")
+
+    def _reconcile(self):
+        # Full walk: enqueues new/modified files and purges deleted ones (like a batch run)
+        started = time.time()
+        queued = 0
+        for job in self.stages.discover():
+            self.queue.put(job.rel_path, started)
+            queued += 1
+        self._last_reconcile = time.monotonic()
+        if queued:
+            print(f"[*] Reconciliation queued {queued} new or modified files")
+
+    def _process(self, batch: list[tuple[str, float, int]]):
+        started = time.perf_counter()
+        self.executor.run(self.stages.jobs_for([rel_path for rel_path, _, _ in batch]))
+        # Make the batch searchable now instead of waiting for the flush timers
+        self.writer.flush()
+        self.governor.flush()
+
+        now = time.time()
+        for rel_path, first_seen, attempts in batch:
+            if self._is_ingested(rel_path):
+                self.queue.finish(rel_path)
+                self.metrics["files_indexed"] += 1
+                self._latencies.append(now - first_seen)
+            elif attempts < Config.DAEMON_MAX_ATTEMPTS:
+                self.queue.finish(rel_path, retry=True)
+                self.metrics["files_retried"] += 1
+            else:
+                print(f"   [!] Giving up on {rel_path} after {attempts} attempts")
+                self.queue.finish(rel_path)
+                self.metrics["files_failed"] += 1
+
+        self.metrics["batches"] += 1
+        self.metrics["last_batch_secs"] = round(time.perf_counter() - started, 3)
+
+        # Timings are per run; a daemon would otherwise accumulate them forever
+        for timings in self.executor.stage_timings.values():
+            timings.clear()
+        self.writer.flush_timings.clear()
+
+    def _is_ingested(self, rel_path: str) -> bool:
+        """
+        True when the manifest reflects the file as it is on disk now (or its removal).
+        """
+        entry = self.manifest.get(rel_path)
+        try:
+            stats = os.stat(os.path.join(Config.DATA_DIR, rel_path))
+        except FileNotFoundError:
+            return entry is None
+        return entry is not None and (entry["size"], entry["mtime_ns"]) == (stats.st_size, stats.st_mtime_ns)
+
+    def snapshot_metrics(self) -> dict:
+        oldest = self.queue.oldest_first_seen()
+        latencies = list(self._latencies)
+        return {
+            **self.metrics,
+            "queue_depth": self.queue.depth(),
+            "settling": self.watcher.pending(),
+            "lag_secs": round(time.time() - oldest, 3) if oldest else 0.0,
+            "drop_to_indexed_p50_secs": round(percentile(latencies, 50), 3),
+            "drop_to_indexed_p95_secs": round(percentile(latencies, 95), 3),
+            "uptime_secs": round(time.time() - self.metrics["started_at"], 1),
+        }
+
+    def _report_metrics(self):
+        metrics = self.snapshot_metrics()
+        self._last_metrics = time.monotonic()
+        for name in ("queue_depth", "settling", "lag_secs", "drop_to_indexed_p50_secs", "drop_to_indexed_p95_secs"):
+            telemetry.gauge(f"daemon_{name}", metrics[name])
+
+        # Atomic replace, so readers never see a half-written file
+        tmp_path = f"{Config.DAEMON_METRICS_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(metrics, handle, indent=2)
+        os.replace(tmp_path, Config.DAEMON_METRICS_PATH)
+
+        print(
+            f"[*] Daemon: queue={metrics['queue_depth']} settling={metrics['settling']} "
+            f"lag={metrics['lag_secs']:.1f}s indexed={metrics['files_indexed']} failed={metrics['files_failed']} "
+            f"p50={metrics['drop_to_indexed_p50_secs']:.2f}s p95={metrics['drop_to_indexed_p95_secs']:.2f}s"
+        )
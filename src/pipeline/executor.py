@@ -0,0 +1,173 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from telemetry import call_with_telemetry, telemetry
+
+# End-of-stream marker passed down the queues once discovery is exhausted
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of the staged pipeline.
+
+    Args:
+        name (str): Label used in progress and error output.
+        handler (callable): Takes a job and returns it (possibly updated), or None to drop it.
+        workers (int): Number of threads pulling from this stage's input queue.
+        process_fn (callable): Optional picklable function to run in a process pool.
+            When set, 'handler' receives (job, run_in_pool) and calls run_in_pool(arg)
+            to execute process_fn(arg) on a pool worker.
+        initializer (callable): Optional picklable function run once in every pool
+            worker as it starts (e.g. to load models before the first job arrives).
+    """
+
+    def __init__(self, name, handler, workers=1, process_fn=None, initializer=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.process_fn = process_fn
+        self.initializer = initializer
+        # A process stage configured with 0 workers runs inline on a single thread
+        self.use_pool = process_fn is not None and workers > 0
+
+
+class StagedExecutor:
+    """
+    Runs jobs through a chain of stages connected by bounded queues.
+
+    Every stage has its own worker threads; CPU-heavy stages additionally own a
+    process pool sized to their worker count, so each thread keeps at most one
+    task in flight. Because every queue is bounded, a slow stage blocks the
+    stages before it (backpressure) and memory stays flat regardless of corpus size.
+
+    With 'persistent_pools', the process pools (and whatever their workers have
+    loaded) survive between run() calls until close(); long-running callers use
+    this to keep models warm across batches.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = Config.PIPELINE_QUEUE_SIZE, persistent_pools: bool = False):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.persistent_pools = persistent_pools
+        self.errors = 0
+        self._errors_lock = threading.Lock()
+        self._pools = {}
+        # stage name -> handler durations (secs), one entry per job
+        self.stage_timings = {stage.name: [] for stage in stages}
+
+    def _open_pools(self) -> dict:
+        context = multiprocessing.get_context(Config.PIPELINE_START_METHOD or None)
+        for stage in self.stages:
+            if stage.use_pool and stage.name not in self._pools:
+                self._pools[stage.name] = ProcessPoolExecutor(
+                    max_workers=stage.workers, mp_context=context, initializer=stage.initializer
+                )
+        return self._pools
+
+    def close(self):
+        """
+        Shuts down the process pools (run() does this itself unless pools are persistent).
+        """
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools = {}
+
+    def run(self, jobs):
+        """
+        Feeds jobs (any iterable, consumed lazily) through all stages and blocks until done.
+
+        Returns:
+            int: Number of jobs that made it through the final stage.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        pools = self._open_pools()
+        threads = []
+        completed = [0]
+
+        try:
+            for index, stage in enumerate(self.stages):
+                remaining = [stage.workers]
+                lock = threading.Lock()
+                for worker_id in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._stage_loop,
+                        args=(stage, pools.get(stage.name), queues[index], queues[index + 1], remaining, lock),
+                        name=f"{stage.name}-{worker_id}",
+                        daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+
+            # Sink: drain the last queue on its own thread so the producer never deadlocks
+            sink = threading.Thread(target=self._drain, args=(queues[-1], completed), daemon=True)
+            sink.start()
+
+            # Producer: blocks whenever the first stage is saturated
+            try:
+                for job in jobs:
+                    queues[0].put(job)
+            finally:
+                queues[0].put(_STOP)
+
+            for thread in threads:
+                thread.join()
+            sink.join()
+        finally:
+            if not self.persistent_pools:
+                self.close()
+
+        return completed[0]
+
+    def _stage_loop(self, stage, pool, inbox, outbox, remaining, lock):
+        if pool is not None:
+            def run_in_pool(arg):
+                # Worker-side spans and counters travel back with the result
+                result, worker_telemetry = pool.submit(call_with_telemetry, stage.process_fn, arg).result()
+                telemetry.merge(worker_telemetry)
+                return result
+        elif stage.process_fn is not None:
+            run_in_pool = stage.process_fn
+        else:
+            run_in_pool = None
+
+        while True:
+            job = inbox.get()
+            if job is _STOP:
+                with lock:
+                    remaining[0] -= 1
+                    last_worker = remaining[0] == 0
+                # The last worker forwards the marker downstream; others hand it to their siblings
+                (outbox if last_worker else inbox).put(_STOP)
+                return
+
+            started = time.perf_counter()
+            try:
+                if stage.process_fn is not None:
+                    result = stage.handler(job, run_in_pool)
+                else:
+                    result = stage.handler(job)
+            except Exception as e:
+                with self._errors_lock:
+                    self.errors += 1
+                print(f"   [!] Stage '{stage.name}' failed for {getattr(job, 'label', 'job')} ({e})")
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                # list.append is atomic, no lock needed
+                self.stage_timings[stage.name].append(elapsed)
+                telemetry.observe("stage_seconds", elapsed, stage=stage.name)
+
+            if result is not None:
+                outbox.put(result)
+
+    @staticmethod
+    def _drain(inbox, completed):
+        while True:
+            job = inbox.get()
+            if job is _STOP:
+                return
+            completed[0] += 1
@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+from ingestion.spool import ChunkSpool
+
+STAGE_PARTITION = "partition"
+STAGE_SCAN = "scan"
+STAGE_STORE = "store"
+STAGE_EMIT = "emit"
+
+
+class StageJournal:
+    """
+    Per-file record of what each pipeline stage produced, so later stages can be
+    resumed or replayed without re-running partitioning and PII scanning.
+
+    - Chunks are written once per file version to a gzipped JSONL artifact under
+      Config.ARTIFACTS_DIR (one JSON string per line, in document order).
+    - Everything small lives in one SQLite table: fingerprint, system metadata,
+      chunk count, per-chunk PII findings, routing decision and the completion
+      time (or last error) of every stage. Governance replays read only this table.
+
+    A new partition result starts a new version of the row: later stage results
+    of the previous version are cleared.
+    """
+
+    def __init__(self, db_path: str = Config.STAGE_JOURNAL_PATH, artifacts_dir: str = Config.ARTIFACTS_DIR):
+        self.artifacts_dir = artifacts_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_stages (
+                rel_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                fingerprint TEXT,
+                system_meta TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                artifact TEXT,
+                pii_findings TEXT,
+                target_collection TEXT,
+                partitioned_at REAL,
+                scanned_at REAL,
+                stored_at REAL,
+                emitted_at REAL,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    # --- Artifacts ---
+
+    def artifact_path(self, rel_path: str) -> str:
+        # Two-level fan-out keeps directories small on 100k+ file corpora
+        key = hashlib.sha1(rel_path.encode("utf-8")).hexdigest()
+        return os.path.join(self.artifacts_dir, key[:2], f"{key}.jsonl.gz")
+
+    def save_chunks(self, rel_path: str, spool: ChunkSpool) -> str:
+        """
+        Writes a file's chunks to its artifact (atomically) and returns the path.
+        """
+        path = self.artifact_path(rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=Config.ARTIFACTS_COMPRESSION_LEVEL) as handle:
+            for window in spool.iter_windows():
+                for chunk in window:
+                    handle.write(json.dumps(chunk) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+    def load_chunks(self, entry: dict) -> ChunkSpool | None:
+        """
+        Streams a journaled file's chunks back into a spool, or None if the artifact is gone.
+        """
+        path = entry.get("artifact")
+        if not path or not os.path.exists(path):
+            return None
+
+        def read_chunks():
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    yield json.loads(line)
+
+        return ChunkSpool.from_iter(read_chunks())
+
+    # --- Stage results ---
+
+    def record_partition(self, rel_path: str, full_path: str, fingerprint: dict | None, system_meta: dict, spool: ChunkSpool):
+        stats = os.stat(full_path)
+        if len(spool):
+            artifact = self.save_chunks(rel_path, spool)
+        else:
+            artifact = None
+            if os.path.exists(self.artifact_path(rel_path)):
+                # The previous version had text, this one has none
+                os.remove(self.artifact_path(rel_path))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_stages "
+                "(rel_path, size, mtime_ns, fingerprint, system_meta, chunk_count, artifact, partitioned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    rel_path, stats.st_size, stats.st_mtime_ns, json.dumps(fingerprint),
+                    json.dumps(system_meta), len(spool), artifact, time.time(),
+                )
+            )
+            self._conn.commit()
+
+    def record_scan(self, rel_path: str, findings: list, target_collection: str):
+        """
+        Args:
+            findings (list): [chunk_index, [entity, ...]] for every chunk with PII.
+            target_collection (str): The routing decision.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE file_stages SET pii_findings = ?, target_collection = ?, scanned_at = ? WHERE rel_path = ?",
+                (json.dumps(findings), target_collection, time.time(), rel_path)
+            )
+            self._conn.commit()
+
+    def record_route(self, rel_path: str, target_collection: str):
+        """
+        Updates the routing of a file whose vectors were re-routed by a replay.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE file_stages SET target_collection = ? WHERE rel_path = ?", (target_collection, rel_path)
+            )
+            self._conn.commit()
+
+    def record_outcome(self, rel_path: str, stage: str, ok: bool, error: str | None = None):
+        """
+        Marks the store or emit stage of a file as done (or failed, keeping the error).
+        """
+        column = {STAGE_STORE: "stored_at", STAGE_EMIT: "emitted_at"}[stage]
+        with self._lock:
+            if ok:
+                self._conn.execute(f"UPDATE file_stages SET {column} = ? WHERE rel_path = ?", (time.time(), rel_path))
+            else:
+                self._conn.execute(
+                    f"UPDATE file_stages SET {column} = NULL, last_error = ? WHERE rel_path = ?",
+                    (f"{stage}: {error or 'failed'}", rel_path)
+                )
+            self._conn.commit()
+
+    # --- Reading ---
+
+    _COLUMNS = (
+        "rel_path", "size", "mtime_ns", "fingerprint", "system_meta", "chunk_count", "artifact",
+        "pii_findings", "target_collection", "partitioned_at", "scanned_at", "stored_at", "emitted_at", "last_error",
+    )
+
+    def _to_entry(self, row) -> dict:
+        entry = dict(zip(self._COLUMNS, row))
+        entry["fingerprint"] = json.loads(entry["fingerprint"]) if entry["fingerprint"] else None
+        entry["system_meta"] = json.loads(entry["system_meta"])
+        entry["pii_findings"] = json.loads(entry["pii_findings"]) if entry["pii_findings"] else None
+        return entry
+
+    def get(self, rel_path: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM file_stages WHERE rel_path = ?", (rel_path,)
+            ).fetchone()
+        return self._to_entry(row) if row else None
+
+    def entries(self, rel_paths: list[str] | None = None, scanned_only: bool = True):
+        """
+        Yields journal entries (all, or only the given paths), optionally only scanned ones.
+        """
+        if rel_paths is not None:
+            for rel_path in rel_paths:
+                entry = self.get(rel_path)
+                if entry and (entry["scanned_at"] or not scanned_only):
+                    yield entry
+            return
+
+        where = " WHERE scanned_at IS NOT NULL" if scanned_only else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM file_stages{where} ORDER BY rel_path"
+            ).fetchall()
+        for row in rows:
+            yield self._to_entry(row)
+
+    def incomplete_count(self) -> int:
+        """
+        Files whose last journaled version has not been both stored and emitted.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM file_stages WHERE chunk_count > 0 AND (stored_at IS NULL OR emitted_at IS NULL)"
+            ).fetchone()[0]
+
+    @staticmethod
+    def is_current(entry: dict, full_path: str) -> bool:
+        """
+        True when the journaled version is the file as it is on disk now.
+        """
+        try:
+            stats = os.stat(full_path)
+        except FileNotFoundError:
+            return False
+        return (entry["size"], entry["mtime_ns"]) == (stats.st_size, stats.st_mtime_ns)
+
+    def remove(self, rel_path: str):
+        """
+        Drops a deleted file's row and chunk artifact.
+        """
+        path = self.artifact_path(rel_path)
+        if os.path.exists(path):
+            os.remove(path)
+        with self._lock:
+            self._conn.execute("DELETE FROM file_stages WHERE rel_path = ?", (rel_path,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,80 @@
+import time
+from config import Config, ensure_directories
+from ingestion.manifest import IngestionManifest
+from governance.datahub_client import DataHubGovernor
+from pipeline.executor import StagedExecutor
+from pipeline.journal import STAGE_EMIT, STAGE_STORE, StageJournal
+from pipeline.stages import IngestionStages
+from storage.vector_store import BufferedVectorWriter
+from telemetry import telemetry
+
+REPLAYABLE_STAGES = {
+    STAGE_STORE: (STAGE_STORE,),
+    STAGE_EMIT: (STAGE_EMIT,),
+    "all": (STAGE_STORE, STAGE_EMIT),
+}
+
+
+def replay(target: str, rel_paths: list[str] | None = None):
+    """
+    Re-runs the store and/or emit stage from the stage journal, without partitioning
+    or scanning a single file again.
+
+    Typical uses: re-embedding after an embedding or index change ('store'), or
+    re-publishing governance metadata after a DataHub outage or restore ('emit').
+    Routing is re-evaluated from the journaled PII findings, so a changed policy
+    is applied on replay: a 'store' replay moves re-routed files and records their
+    new collection in the journal and manifest, while an 'emit'-only replay keeps
+    the collection their vectors are in. Files changed since they were journaled
+    are skipped; the next normal run ingests them.
+
+    Args:
+        target (str): 'store', 'emit' or 'all'.
+        rel_paths (list[str]): Only replay these files (paths relative to DATA_DIR).
+
+    Returns:
+        dict: Run report in the same shape as run_pipeline()'s.
+    """
+    stage_names = REPLAYABLE_STAGES[target]
+    print(f"[*] Replaying {' + '.join(stage_names)} from the stage journal: {Config.STAGE_JOURNAL_PATH}")
+    ensure_directories()
+
+    journal = StageJournal()
+    governor = DataHubGovernor()
+    manifest = IngestionManifest() if Config.INCREMENTAL_INGESTION else None
+    writer = BufferedVectorWriter() if Config.VECTOR_WRITE_BUFFERED else BufferedVectorWriter(batch_size=1, max_delay=0)
+    stages = IngestionStages(governor, manifest, writer, journal)
+    executor = StagedExecutor(stages.build_replay_stages(stage_names))
+
+    started = time.perf_counter()
+    try:
+        processed = executor.run(stages.replay_jobs(stage_names, rel_paths))
+    finally:
+        writer.close()
+        governor.close()
+        if manifest:
+            manifest.close()
+        journal.close()
+
+    summary = stages.stats
+    report = {
+        "replay": list(stage_names),
+        "processed": processed,
+        "elapsed_secs": time.perf_counter() - started,
+        "stats": dict(summary),
+        "errors": executor.errors,
+        "stage_timings": executor.stage_timings,
+        "vector_flush_timings": writer.flush_timings,
+        "emission": governor.emission_stats(),
+    }
+    report_path = telemetry.write_report(report)
+
+    print(
+        f"\n[*] Replay summary: {processed} of {summary['replayed']} files replayed "
+        f"({summary['secure']} secure / {summary['public']} public), "
+        f"{summary['stale']} changed since journaled (skipped), "
+        f"{summary['store_failed'] + summary['emit_failed'] + executor.errors} failed"
+    )
+    if report_path:
+        print(f"[*] Run report: {report_path}")
+    return report
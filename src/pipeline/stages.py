@@ -0,0 +1,439 @@
+import datetime
+import os
+import threading
+from dataclasses import dataclass, field
+from config import Config
+from telemetry import telemetry
+from ingestion.loader import LOADERS
+from ingestion.manifest import STATUS_UNCHANGED
+from ingestion.spool import ChunkSpool
+from storage.vector_store import delete_source_vectors
+from pipeline.executor import Stage
+from pipeline.journal import STAGE_EMIT, STAGE_STORE
+from pipeline.workers import format_pii_log, init_scan_worker, partition_file, scan_chunks
+
+# Every extension with a registered loader is ingested
+VALID_EXTENSIONS = tuple(LOADERS)
+
+
+@dataclass
+class FileJob:
+    """
+    State of a single file as it moves through the pipeline stages.
+    """
+    full_path: str
+    rel_path: str
+    fingerprint: dict | None = None
+    previous: dict | None = None
+    system_meta: dict = field(default_factory=dict)
+    spool: ChunkSpool | None = None
+    # [chunk_index, [entity, ...]] per chunk with PII, and the audit lines derived from it
+    findings: list = field(default_factory=list)
+    pii_log: list[str] = field(default_factory=list)
+    chunk_count: int = 0
+    target_collection: str | None = None
+    stored: bool = False
+    emitted: bool = False
+    # Storage and governance may finish in either order (buffered writes);
+    # the manifest is updated once both have reported back.
+    pending_steps: int = 2
+    # Stage journal entry this job resumes or replays from (earlier stages are not re-run)
+    journaled: dict | None = None
+
+    @property
+    def label(self) -> str:
+        return self.rel_path
+
+
+class IngestionStages:
+    """
+    The per-file steps of the pipeline, split into independently scheduled stages:
+    Discovery -> Partition -> Scan/Route -> Store (embed + upsert) -> Governance.
+
+    Each handler only touches its own FileJob, so running them concurrently yields
+    the same routing decision per file as processing files one at a time.
+
+    With a StageJournal, every file's chunks, findings and routing are persisted
+    as they are produced. 'resume' then lets a re-run pick files up after their
+    last completed stage, and replay_jobs() feeds journaled files straight into
+    the store and/or emit stages.
+    """
+
+    def __init__(self, governor, manifest, writer, journal=None, resume: bool = False):
+        self.governor = governor
+        self.manifest = manifest
+        self.writer = writer
+        self.journal = journal
+        self.resume = resume and journal is not None
+        self.stats = {
+            "discovered": 0, "skipped": 0, "purged": 0, "empty": 0,
+            "public": 0, "secure": 0, "store_failed": 0, "emit_failed": 0,
+            "chunks": 0, "bytes": 0, "resumed": 0, "replayed": 0, "stale": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+        telemetry.count(f"ingest_{key}", amount)
+
+    def build_stages(self) -> list[Stage]:
+        """
+        Wires the handlers into executor stages using the worker counts from Config.
+        Embedding happens inside the BufferedVectorWriter's flushes, one window at a time.
+        """
+        return [
+            Stage("partition", self.partition, Config.PIPELINE_PARTITION_WORKERS, process_fn=partition_file),
+            Stage("scan", self.scan, Config.PIPELINE_SCAN_WORKERS, process_fn=scan_chunks, initializer=init_scan_worker),
+            Stage("store", self.store, Config.PIPELINE_STORE_WORKERS),
+            Stage("emit", self.emit, Config.PIPELINE_EMIT_WORKERS),
+        ]
+
+    def _complete_step(self, job: FileJob, stored: bool | None = None, emitted: bool | None = None):
+        """
+        Called once by storage and once by governance, each with its outcome.
+        The file is only marked as ingested once its vectors are safely stored and
+        its metadata delivered, so a failed write or emission is retried on the next run.
+        """
+        with self._stats_lock:
+            if stored is not None:
+                job.stored = stored
+            if emitted is not None:
+                job.emitted = emitted
+            job.pending_steps -= 1
+            finished = job.pending_steps == 0
+
+        if self.journal:
+            if stored is not None:
+                self.journal.record_outcome(job.rel_path, STAGE_STORE, stored)
+            if emitted is not None:
+                self.journal.record_outcome(job.rel_path, STAGE_EMIT, emitted)
+
+        if stored:
+            # The vectors now live in the target collection (a re-routed file, or a replay
+            # under a changed policy); --delete-source and --maintain look them up there
+            if self.journal and job.journaled and job.journaled["target_collection"] != job.target_collection:
+                self.journal.record_route(job.rel_path, job.target_collection)
+            if self.manifest and job.previous and job.previous["target_collection"] != job.target_collection:
+                self.manifest.update_collection(job.rel_path, job.target_collection)
+
+        if not finished:
+            return
+        if not job.stored:
+            self._count("store_failed")
+        if not job.emitted:
+            self._count("emit_failed")
+        if job.stored and job.emitted and self.manifest and job.fingerprint:
+            self.manifest.record(job.rel_path, job.fingerprint, job.target_collection, job.chunk_count)
+
+    # --- 1. Discovery ---
+
+    def discover(self, data_dir: str = Config.DATA_DIR):
+        """
+        Walks the landing zone lazily and yields a FileJob per new or modified file.
+        Once the walk completes, vectors of files that disappeared are purged.
+        """
+        seen_paths = set()
+
+        for root, _, filenames in os.walk(data_dir):
+            for filename in filenames:
+                if not filename.lower().endswith(VALID_EXTENSIONS):
+                    continue
+
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, data_dir)
+                seen_paths.add(rel_path)
+
+                job = self._make_job(full_path, rel_path)
+                if job is not None:
+                    yield job
+
+        if self.manifest:
+            for rel_path, _ in self.manifest.missing_files(seen_paths):
+                self._purge(rel_path)
+
+    def jobs_for(self, rel_paths: list[str], data_dir: str = Config.DATA_DIR):
+        """
+        Targeted discovery for known paths (e.g. from a file watcher) instead of a full walk.
+        Paths that no longer exist are purged; unchanged files are skipped as usual.
+        """
+        for rel_path in rel_paths:
+            full_path = os.path.join(data_dir, rel_path)
+            if not os.path.isfile(full_path):
+                if self.manifest and self.manifest.get(rel_path):
+                    self._purge(rel_path)
+                continue
+
+            try:
+                job = self._make_job(full_path, rel_path)
+            except FileNotFoundError:
+                # Deleted after the check above; the watcher reports the deletion separately
+                continue
+            if job is not None:
+                yield job
+
+    def _make_job(self, full_path: str, rel_path: str) -> FileJob | None:
+        self._count("discovered")
+        job = FileJob(full_path=full_path, rel_path=rel_path)
+        if self.manifest:
+            status, job.fingerprint = self.manifest.check(full_path, rel_path)
+            if status == STATUS_UNCHANGED:
+                self._count("skipped")
+                return None
+            job.previous = self.manifest.get(rel_path)
+        if self.resume:
+            entry = self.journal.get(rel_path)
+            if entry and entry["partitioned_at"] and self.journal.is_current(entry, full_path):
+                self._resume_from(job, entry)
+                self._count("resumed")
+                if not job.pending_steps:
+                    # Stored and emitted before the interruption; only the manifest was missing
+                    if self.manifest:
+                        self.manifest.record(rel_path, job.fingerprint, entry["target_collection"], entry["chunk_count"])
+                    return None
+        return job
+
+    def _resume_from(self, job: FileJob, entry: dict):
+        # Steps that already succeeded for this exact version are not repeated
+        job.journaled = entry
+        if entry["stored_at"]:
+            job.stored = True
+            job.pending_steps -= 1
+        if entry["emitted_at"]:
+            job.emitted = True
+            job.pending_steps -= 1
+
+    def replay_jobs(self, stage_names: tuple, rel_paths: list[str] | None = None, data_dir: str = Config.DATA_DIR):
+        """
+        Yields a FileJob per journaled (partitioned and scanned) file for a replay of
+        the given stages ('store', 'emit'); the other stage counts as already done.
+        Routing is re-evaluated from the stored findings, so policy changes apply.
+        """
+        for entry in self.journal.entries(rel_paths):
+            if not entry["chunk_count"]:
+                continue
+            full_path = os.path.join(data_dir, entry["rel_path"])
+            if not self.journal.is_current(entry, full_path):
+                # Changed or deleted since it was journaled: a normal run picks it up
+                self._count("stale")
+                continue
+
+            job = FileJob(full_path=full_path, rel_path=entry["rel_path"], fingerprint=entry["fingerprint"])
+            job.previous = self.manifest.get(job.rel_path) if self.manifest else None
+            job.journaled = entry
+            if STAGE_STORE not in stage_names:
+                job.stored = True
+                job.pending_steps -= 1
+            if STAGE_EMIT not in stage_names:
+                job.emitted = True
+                job.pending_steps -= 1
+            self._count("replayed")
+            yield job
+
+    def build_replay_stages(self, stage_names: tuple) -> list[Stage]:
+        """
+        Stages for a replay: artifacts are loaded instead of partitioning and scanning.
+        """
+        stages = [Stage("load", self.load_journaled, Config.PIPELINE_PARTITION_WORKERS)]
+        if STAGE_STORE in stage_names:
+            stages.append(Stage("store", self.store, Config.PIPELINE_STORE_WORKERS))
+        if STAGE_EMIT in stage_names:
+            stages.append(Stage("emit", self.emit, Config.PIPELINE_EMIT_WORKERS))
+        return stages
+
+    def load_journaled(self, job: FileJob) -> FileJob | None:
+        entry = job.journaled
+        job.system_meta = entry["system_meta"]
+        job.chunk_count = entry["chunk_count"]
+        if not job.stored:
+            # Only the store stage needs the chunks themselves
+            job.spool = self.journal.load_chunks(entry)
+            if job.spool is None:
+                print(f"   [!] Chunk artifact missing for {job.rel_path}; run the pipeline to rebuild it.")
+                return None
+        self._route(job, entry["pii_findings"] or [])
+
+        routed_to = entry["target_collection"]
+        if routed_to and job.target_collection != routed_to:
+            if job.stored:
+                # Emit-only replay: the vectors stay put, so the lineage must keep naming their collection
+                print(f"   [!] Keeping '{routed_to}' for {job.rel_path}; replay 'store' to move it to '{job.target_collection}'.")
+                job.target_collection = routed_to
+            elif job.emitted:
+                print(f"   [!] {job.rel_path} moves to '{job.target_collection}'; replay 'emit' to update its DataHub lineage.")
+        return job
+
+    def _purge(self, rel_path: str):
+        removed = delete_source_vectors(rel_path)
+        self.manifest.remove(rel_path)
+        if self.journal:
+            self.journal.remove(rel_path)
+        self._count("purged")
+        print(f"   [-] Purged {removed} vectors for deleted file: {rel_path}")
+
+    # --- 2. Partition (process pool) ---
+
+    def partition(self, job: FileJob, run_in_pool) -> FileJob | None:
+        if job.journaled:
+            # Resumed: chunks come from the artifact of this exact file version
+            job.spool = self.journal.load_chunks(job.journaled)
+            if job.spool is not None:
+                print(f"[Resuming] {job.rel_path}")
+                job.system_meta = job.journaled["system_meta"]
+                job.chunk_count = len(job.spool)
+                return job
+            job.journaled = None
+
+        print(f"[Processing] {job.rel_path}")
+
+        # System Metadata Extraction (Operational Metadata)
+        # Capturing raw OS level attributes before processing
+        stats = os.stat(job.full_path)
+        job.system_meta = {
+            "file_size_kb": f"{round(stats.st_size / 1024, 2)}",
+            "created_at": datetime.datetime.fromtimestamp(stats.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
+            "extension": os.path.splitext(job.full_path)[1].lower()
+        }
+
+        # Content Ingestion (via Unstructured.io), streamed into a spool
+        job.spool = run_in_pool(job.full_path)
+        job.chunk_count = len(job.spool)
+        if self.journal:
+            self.journal.record_partition(job.rel_path, job.full_path, job.fingerprint, job.system_meta, job.spool)
+        self._count("chunks", job.chunk_count)
+        self._count("bytes", stats.st_size)
+        if not job.chunk_count:
+            print(f"   [Skipped] No text extracted from {job.rel_path}.")
+            self._count("empty")
+            if self.manifest:
+                # Remember empty files too, so they are not re-partitioned every run
+                if job.previous and job.previous["target_collection"]:
+                    delete_source_vectors(job.rel_path, [job.previous["target_collection"]])
+                self.manifest.record(job.rel_path, job.fingerprint, None, 0)
+            return None
+        return job
+
+    # --- 3. Governance Policy Validation & Routing (process pool) ---
+
+    def scan(self, job: FileJob, run_in_pool) -> FileJob:
+        if job.journaled and job.journaled["scanned_at"]:
+            findings = job.journaled["pii_findings"] or []
+        else:
+            findings = run_in_pool(job.spool)
+        self._route(job, findings)
+        if self.journal and not (job.journaled and job.journaled["scanned_at"]):
+            self.journal.record_scan(job.rel_path, job.findings, job.target_collection)
+        return job
+
+    def _route(self, job: FileJob, findings: list):
+        job.findings = findings
+        job.pii_log = format_pii_log(findings)
+
+        # Semantic Routing (The 'Sorting Hat' Logic)
+        if job.pii_log:
+            job.target_collection = Config.COLLECTION_SECURE
+            self._count("secure")
+            print(f"   [!] PII DETECTED in {job.rel_path}. Routing to Secure Index.")
+        else:
+            job.target_collection = Config.COLLECTION_PUBLIC
+            self._count("public")
+            print(f"   [OK] {job.rel_path} is clean. Routing to Public Index.")
+
+    # --- 4. Vector Storage (ChromaDB) ---
+
+    def store(self, job: FileJob) -> FileJob:
+        if job.stored:
+            # Resumed or governance-only replay: the vectors are already in place
+            if job.spool:
+                job.spool.discard()
+            return job
+
+        # A modified file may have been re-routed; clear its vectors from the old index
+        previous_collection = job.previous["target_collection"] if job.previous else None
+        if previous_collection not in (None, job.target_collection):
+            delete_source_vectors(job.rel_path, [previous_collection])
+
+        # The file is handed to the writer window by window; embedding + upsert
+        # happen in later cross-file batches. The first window replaces the
+        # file's old vectors, the rest append with continuing chunk ordinals.
+        tracker = _WindowTracker(lambda ok: self._complete_step(job, stored=ok))
+        ordinal = 0
+        # Not derived from the ordinal: a first window may yield no nodes (e.g. image-only pages)
+        first_window = True
+        try:
+            for window in job.spool.iter_windows():
+                ordinal += self.writer.add(
+                    window, job.rel_path, job.target_collection,
+                    on_done=tracker.expect(),
+                    start_ordinal=ordinal,
+                    replace=first_window
+                )
+                first_window = False
+        except Exception as e:
+            print(f"   [!] Storage Error: Could not queue {job.rel_path} ({e})")
+            tracker.fail()
+        finally:
+            # Chunks now live in the writer's buffer; the spill file is no longer needed
+            job.spool.discard()
+            tracker.seal()
+        return job
+
+    # --- 5. Metadata Publication (DataHub) ---
+
+    def emit(self, job: FileJob) -> FileJob:
+        if job.emitted:
+            # Resumed or storage-only replay: governance is already delivered
+            job.spool = None
+            return job
+
+        # Emits technical, operational, and business metadata to the catalog
+        self.governor.emit_file_metadata(
+            filename=job.rel_path,
+            target_collection=job.target_collection,
+            pii_details=job.pii_log,
+            chunk_count=job.chunk_count,
+            system_meta=job.system_meta,
+            on_done=lambda ok: self._complete_step(job, emitted=ok)
+        )
+        print(f"   [+] DataHub Lineage & Governance submitted for {job.rel_path}.")
+
+        job.spool = None
+        return job
+
+
+class _WindowTracker:
+    """
+    Folds the per-window writer callbacks of one file into a single outcome.
+    """
+
+    def __init__(self, on_done):
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._ok = True
+        self._sealed = False
+
+    def expect(self):
+        with self._lock:
+            self._outstanding += 1
+        return self._report
+
+    def fail(self):
+        with self._lock:
+            self._ok = False
+
+    def seal(self):
+        # No more windows will be added; fire now if every window already reported
+        with self._lock:
+            self._sealed = True
+            ready = self._outstanding == 0
+        if ready:
+            self._on_done(self._ok)
+
+    def _report(self, ok: bool):
+        with self._lock:
+            self._ok = self._ok and ok
+            self._outstanding -= 1
+            ready = self._sealed and self._outstanding == 0
+        if ready:
+            self._on_done(self._ok)
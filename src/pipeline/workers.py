@@ -0,0 +1,63 @@
+# Process-side entry points for the CPU-heavy pipeline stages.
+# Pool workers import this module, so it must only depend on the ingestion
+# package (Unstructured + Presidio), never on the vector store or DataHub client.
+import os
+from config import Config
+from telemetry import telemetry
+from ingestion.loader import iter_chunks, loader_name
+from ingestion.pii_scanner import get_batch_analyzer, scan_chunks_for_pii
+from ingestion.spool import ChunkSpool
+
+
+def partition_file(full_path: str) -> ChunkSpool:
+    """
+    Extracts text chunks from a single file (via the loader registry), streaming them
+    into a ChunkSpool so large documents spill to disk instead of memory.
+    """
+    with telemetry.span("partition", file=full_path) as span:
+        try:
+            spool = ChunkSpool.from_iter(iter_chunks(full_path))
+        except Exception as e:
+            print(f" {loader_name(full_path)} Error: {e}")
+            telemetry.count("partition_failures")
+            return ChunkSpool(chunks=[])
+        span.set(chunks=len(spool))
+
+    telemetry.count("files_partitioned", extension=os.path.splitext(full_path)[1].lower())
+    telemetry.count("chunks_extracted", len(spool))
+    telemetry.count("chars_extracted", spool.total_chars)
+    return spool
+
+
+def init_scan_worker():
+    """
+    Pool initializer: builds the Presidio analyzer (spaCy model) as the worker
+    starts, instead of inside the first file's scan.
+    """
+    get_batch_analyzer()
+
+
+def scan_chunks(spool: ChunkSpool) -> list[list]:
+    """
+    Runs the PII policy check over every chunk of a file, one bounded window at a time.
+
+    Returns:
+        list[list]: [chunk_index, [entity, ...]] for every chunk with findings.
+    """
+    findings = []
+    offset = 0
+    with telemetry.span("pii_scan", chunks=len(spool)):
+        for window in spool.iter_windows(Config.CHUNK_WINDOW_SIZE):
+            # One batched call per window instead of one Presidio pass per chunk
+            for i, secrets in enumerate(scan_chunks_for_pii(window)):
+                if secrets:
+                    findings.append([offset + i, list(secrets)])
+            offset += len(window)
+    return findings
+
+
+def format_pii_log(findings: list[list]) -> list[str]:
+    """
+    Audit log lines ("Chunk <i>: <ENTITY>, ...") as emitted to DataHub.
+    """
+    return [f"Chunk {index}: {', '.join(entities)}" for index, entities in findings]
@@ -0,0 +1,282 @@
+import collections
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from config import Config
+from governance.urns import source_dataset_urn, vector_index_urn
+from storage.dedup import DUPLICATE_SOURCES_KEY
+from storage.embedding_cache import normalize_text
+from storage.sharding import shard_names
+from storage.vector_store import get_collection, get_embed_model
+from telemetry import telemetry
+
+ACCESS_PUBLIC = "public"
+ACCESS_RESTRICTED = "restricted"
+
+# Collections each access level may read. PII-bearing chunks only live in the
+# secure index, so public callers can never retrieve them.
+ACCESS_COLLECTIONS = {
+    ACCESS_PUBLIC: (Config.COLLECTION_PUBLIC,),
+    ACCESS_RESTRICTED: (Config.COLLECTION_PUBLIC, Config.COLLECTION_SECURE),
+}
+
+
+def similarity(distance: float, space: str) -> float:
+    """
+    Cosine similarity of a hit, computed from its Chroma distance in the collection's HNSW space.
+
+    Collections may use different spaces (Config.COLLECTION_HNSW), and their raw distances are
+    not comparable. The embeddings are unit-normalized, so each space maps back to the same
+    scale: 'l2' is the squared distance (2 - 2cos), 'cosine' is 1 - cos, 'ip' is 1 - dot product.
+    """
+    if space == "l2":
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+
+@dataclass
+class RetrievedChunk:
+    """
+    A single search hit, with the lineage needed to trace it back to its source file.
+    """
+    text: str
+    score: float
+    distance: float
+    chunk_id: str
+    collection: str
+    source: str
+    lineage: dict = field(default_factory=dict)
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe in-memory LRU of query embeddings keyed by normalized query text.
+    Interactive traffic repeats itself (suggested questions, retries, pagination),
+    and a hit skips the model forward pass entirely.
+    """
+
+    def __init__(self, max_entries: int = Config.RETRIEVAL_QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> list[float] | None:
+        key = normalize_text(query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, query: str, embedding: list[float]):
+        if self.max_entries <= 0:
+            return
+        key = normalize_text(query)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+def embed_queries(queries: list[str]) -> list[list[float]]:
+    """
+    Embeds several queries in one forward pass, with the model's query prompt.
+    """
+    model = get_embed_model()
+    # Queries never go through the document embedding cache
+    base_model = getattr(model, "_inner", model)
+    try:
+        return [list(embedding) for embedding in base_model._embed(queries, prompt_name="query")]
+    except (AttributeError, TypeError):
+        # Embedding backend without batched prompt support: one pass per query
+        return [model.get_query_embedding(query) for query in queries]
+
+
+class RetrievalService:
+    """
+    Long-lived semantic search over the public and secure vector indices.
+
+    Unlike test_retrieval's original per-query setup (new ChromaVectorStore,
+    VectorStoreIndex and retriever for every question), everything expensive is
+    created once: the embedding model and Chroma collection handles are reused,
+    query embeddings are cached, a batch of queries is embedded in one pass and
+    sent to Chroma in one call per collection, and the collections an access
+    level may read (every shard of them, when sharding is on) are queried
+    concurrently and merged by cosine similarity.
+
+    Usage:
+        service = RetrievalService().warm()
+        hits = service.search("What is the IBAN?", access_level="restricted")
+        batches = service.search_batch(["q1", "q2"], access_level="public")
+    """
+
+    def __init__(
+        self,
+        top_k: int = Config.RETRIEVAL_TOP_K,
+        cache_size: int = Config.RETRIEVAL_QUERY_CACHE_SIZE,
+        fanout_workers: int = Config.RETRIEVAL_FANOUT_WORKERS,
+        access_collections: dict = ACCESS_COLLECTIONS,
+    ):
+        self.top_k = top_k
+        self.access_collections = access_collections
+        self.query_cache = QueryEmbeddingCache(cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, fanout_workers), thread_name_prefix="retrieval")
+
+    def warm(self):
+        """
+        Loads the model and opens the collections before the first request arrives.
+        """
+        from pipeline.warmup import preload
+
+        preload(embedding=True, vector_store=True, pii=False)
+        return self
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def search(self, query: str, access_level: str = Config.RETRIEVAL_DEFAULT_ACCESS, top_k: int | None = None,
+               collections: list[str] | None = None) -> list[RetrievedChunk]:
+        """
+        Returns the closest chunks for one query across every collection the caller may read.
+        """
+        return self.search_batch([query], access_level, top_k, collections)[0]
+
+    def search_batch(self, queries: list[str], access_level: str = Config.RETRIEVAL_DEFAULT_ACCESS,
+                     top_k: int | None = None, collections: list[str] | None = None) -> list[list[RetrievedChunk]]:
+        """
+        Runs several queries with one embedding pass and one Chroma call per collection.
+
+        Args:
+            queries (list[str]): Natural-language queries.
+            access_level (str): 'public' or 'restricted' (see ACCESS_COLLECTIONS).
+            top_k (int): Hits per query after merging the collections.
+            collections (list[str]): Narrow the search to these collections; each
+                must be readable at the given access level.
+
+        Returns:
+            list[list[RetrievedChunk]]: Hits per query, best first.
+
+        Raises:
+            PermissionError: A requested collection is above the caller's access level.
+        """
+        if not queries:
+            return []
+        started = time.perf_counter()
+        top_k = top_k or self.top_k
+
+        # 1. Access Enforcement
+        targets = self._resolve_collections(access_level, collections)
+
+        # 2. Query Embeddings (cache first, misses in one batch)
+        embeddings = self._embed(queries)
+
+        # 3. Fan-out: every shard of every collection is queried concurrently with the whole batch
+        futures = [
+            self._pool.submit(self._query_collection, name, shard, embeddings, top_k)
+            for name in targets for shard in shard_names(name)
+        ]
+        per_collection = [future.result() for future in futures]
+
+        # 4. Merge per query by similarity (raw distances differ between HNSW spaces)
+        results = []
+        for index in range(len(queries)):
+            hits = [hit for collection_hits in per_collection for hit in collection_hits[index]]
+            hits.sort(key=lambda hit: hit.score, reverse=True)
+            results.append(hits[:top_k])
+
+        telemetry.observe("retrieval_seconds", time.perf_counter() - started, access=access_level)
+        telemetry.count("retrieval_queries", len(queries))
+        return results
+
+    def _resolve_collections(self, access_level: str, collections: list[str] | None) -> tuple:
+        allowed = self.access_collections.get(access_level)
+        if allowed is None:
+            raise ValueError(f"Unknown access level '{access_level}' (expected one of {sorted(self.access_collections)})")
+        if not collections:
+            return allowed
+        denied = [name for name in collections if name not in allowed]
+        if denied:
+            telemetry.count("retrieval_denied", access=access_level)
+            raise PermissionError(f"Access level '{access_level}' may not read {', '.join(denied)}")
+        return tuple(collections)
+
+    def _embed(self, queries: list[str]) -> list[list[float]]:
+        embeddings = [self.query_cache.get(query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        telemetry.count("query_cache_hits", len(queries) - len(missing))
+        telemetry.count("query_cache_misses", len(missing))
+        if missing:
+            # Duplicates within one batch are embedded once
+            unique = list(dict.fromkeys(normalize_text(queries[i]) for i in missing))
+            with telemetry.span("query_embed", queries=len(unique)):
+                fresh = dict(zip(unique, embed_queries(unique)))
+            for i in missing:
+                embeddings[i] = fresh[normalize_text(queries[i])]
+                self.query_cache.put(queries[i], embeddings[i])
+        return embeddings
+
+    def _query_collection(self, collection_name: str, shard: str, embeddings: list[list[float]],
+                          top_k: int) -> list[list[RetrievedChunk]]:
+        chroma_collection = get_collection(shard, create=False)
+        if chroma_collection is None:
+            # Nothing was ever routed here
+            return [[] for _ in embeddings]
+
+        with telemetry.span("vector_query", collection=collection_name, shard=shard, queries=len(embeddings)):
+            response = chroma_collection.query(
+                query_embeddings=embeddings,
+                n_results=top_k,
+                include=["documents", "metadatas", "distances"]
+            )
+
+        # The space the collection was built with, which may predate a configuration change
+        space = (chroma_collection.metadata or {}).get("hnsw:space", "l2")
+        results = []
+        for ids, documents, metadatas, distances in zip(
+            response["ids"], response["documents"], response["metadatas"], response["distances"]
+        ):
+            results.append([
+                self._to_chunk(collection_name, chunk_id, document, metadata or {}, distance, space)
+                for chunk_id, document, metadata, distance in zip(ids, documents, metadatas, distances)
+            ])
+        return results
+
+    @staticmethod
+    def _to_chunk(collection_name: str, chunk_id: str, document: str, metadata: dict, distance: float,
+                  space: str) -> RetrievedChunk:
+        source = metadata.get("source", "")
+        return RetrievedChunk(
+            text=document or "",
+            # Comparable across collections and shards, 1.0 for an exact match
+            score=similarity(distance, space),
+            distance=distance,
+            chunk_id=chunk_id,
+            collection=collection_name,
+            source=source,
+            lineage={
+                "source": source,
+                "source_urn": source_dataset_urn(source) if source else None,
+                # Other files the same (or near-identical) chunk was found in
+                "duplicate_sources": json.loads(metadata.get(DUPLICATE_SOURCES_KEY) or "[]"),
+                "vector_index_urn": vector_index_urn(collection_name),
+                "ref_doc_id": metadata.get("ref_doc_id") or metadata.get("doc_id"),
+            },
+        )
@@ -0,0 +1,443 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from config import Config
+from storage.embedding_cache import normalize_text
+from telemetry import telemetry
+
+# Mersenne prime for the MinHash permutations (a * h + b) mod p; shingle hashes are reduced below it
+_MINHASH_PRIME = (1 << 61) - 1
+
+# Metadata key listing the other files a stored chunk also came from
+DUPLICATE_SOURCES_KEY = "duplicate_sources"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, banded for locality-sensitive hashing.
+
+    Two chunks whose shingle sets have Jaccard similarity s agree on each signature
+    position with probability s, and share at least one LSH bucket with probability
+    1 - (1 - s^rows)^bands, so near-duplicates meet in a bucket while unrelated
+    chunks almost never do.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = Config.DEDUP_NUM_PERM,
+        bands: int = Config.DEDUP_LSH_BANDS,
+        shingle_size: int = Config.DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be a multiple of DEDUP_LSH_BANDS ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed seed: signatures must stay comparable across runs
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME)) for _ in range(num_perm)]
+
+    def _shingles(self, text: str) -> set:
+        words = normalize_text(text).lower().split()
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)}
+        return {" ".join(words[i : i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> array:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") % _MINHASH_PRIME
+            for shingle in self._shingles(text)
+        ]
+        return array("Q", [min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in self._perms])
+
+    def buckets(self, signature: array) -> list[str]:
+        """
+        One bucket key per band; equal keys mean the band's rows are identical.
+        """
+        return [
+            hashlib.blake2b(signature[band * self.rows : (band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first: array, second: array) -> float:
+        """
+        Estimated Jaccard similarity of the two underlying shingle sets.
+        """
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class ChunkDeduplicator:
+    """
+    Persistent index of the chunks stored per collection, used to skip embedding
+    and storing repeated content (templated invoices, legal footers, re-exports).
+
+    A chunk is a duplicate when its normalized text matches a stored chunk exactly
+    (SHA-256) or, with near-duplicate detection on, when its MinHash signature
+    meets a stored one in an LSH bucket and the estimated similarity reaches the
+    threshold. Duplicates are not embedded; their file is recorded as an extra
+    source of the stored chunk (DUPLICATE_SOURCES_KEY in its Chroma metadata),
+    so lineage still reaches every file the content came from.
+
+    When the file that owns a stored chunk is re-ingested without it or deleted,
+    ownership passes to one of the extra sources and the vector is kept.
+
+    All changes happen inside transaction(), which the vector writer wraps around
+    each batch write: if the write fails, the index rolls back with it.
+    """
+
+    def __init__(
+        self,
+        db_path: str = Config.DEDUP_INDEX_PATH,
+        near_duplicates: bool = Config.DEDUP_NEAR_DUPLICATES,
+        threshold: float = Config.DEDUP_SIMILARITY_THRESHOLD,
+        hasher: MinHasher | None = None,
+    ):
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.stats_counts = {"chunks": 0, "exact_duplicates": 0, "near_duplicates": 0, "chars_skipped": 0}
+        self._lock = threading.RLock()
+        self._replacing = set()
+        self._claimed = set()
+        self._batch_counts = dict.fromkeys(self.stats_counts, 0)
+        # node_id -> (kind, chars) of the duplicates skipped in the current batch
+        self._skipped = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                signature BLOB,
+                synced INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (collection, content_hash)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_owner ON chunks (collection, owner);
+            CREATE TABLE IF NOT EXISTS chunk_sources (
+                collection TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (collection, content_hash, source)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunk_sources_source ON chunk_sources (collection, source);
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                collection TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_lookup ON lsh_buckets (collection, band, bucket);
+            CREATE INDEX IF NOT EXISTS idx_lsh_hash ON lsh_buckets (collection, content_hash);
+            """
+        )
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            # Files whose previous version this batch replaces, and chunk IDs it writes
+            self._replacing = set()
+            self._claimed = set()
+            # Counted only once the batch commits (a failed batch is retried per file)
+            self._batch_counts = dict.fromkeys(self.stats_counts, 0)
+            self._skipped = {}
+            self._conn.execute("BEGIN")
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            for key, value in self._batch_counts.items():
+                self.stats_counts[key] += value
+
+    # --- Filtering ---
+
+    def filter_nodes(self, nodes: list, filename: str, collection_name: str, replace: bool) -> tuple[list, list]:
+        """
+        Splits a file's nodes into the ones to embed and the duplicates to skip.
+
+        Args:
+            nodes (list[BaseNode]): The file's nodes (one window of them).
+            filename (str): Source file.
+            collection_name (str): Target collection; duplicates are only matched within it.
+            replace (bool): First window of a new file version: its old extra-source
+                entries are dropped first (they are re-recorded if still present).
+
+        Returns:
+            tuple: (kept nodes, [(duplicate node, canonical chunk_id)]).
+        """
+        if replace:
+            self._replacing.add(filename)
+            self._drop_extra_source(filename, collection_name)
+
+        kept, duplicates = [], []
+        for node in nodes:
+            text = node.get_content()
+            if not text.strip():
+                kept.append(node)
+                continue
+            self._batch_counts["chunks"] += 1
+
+            # 1. Exact match
+            digest = content_hash(text)
+            row = self._conn.execute(
+                "SELECT chunk_id, owner FROM chunks WHERE collection = ? AND content_hash = ?",
+                (collection_name, digest)
+            ).fetchone()
+            kind = "exact_duplicates"
+
+            # 2. Near match through the LSH buckets
+            signature = None
+            if row is None and self.near_duplicates:
+                signature = self.hasher.signature(text)
+                match = self._near_match(collection_name, signature)
+                if match:
+                    digest, row = match
+                    kind = "near_duplicates"
+
+            if row is None:
+                self._register(collection_name, digest, node.node_id, filename, signature)
+                kept.append(node)
+            elif row[1] == filename and (
+                row[0] == node.node_id or (filename in self._replacing and row[0] not in self._claimed)
+            ):
+                # The file's own chunk, or its previous version being replaced: this node is the stored copy
+                if row[0] != node.node_id:
+                    self._conn.execute(
+                        "UPDATE chunks SET chunk_id = ?, synced = 0 WHERE collection = ? AND content_hash = ?",
+                        (node.node_id, collection_name, digest)
+                    )
+                self._claimed.add(node.node_id)
+                kept.append(node)
+            elif row[1] == filename:
+                # Repeated within the file itself
+                self._skip(kind, node, text)
+                duplicates.append((node, row[0]))
+            else:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO chunk_sources (collection, content_hash, source) VALUES (?, ?, ?)",
+                    (collection_name, digest, filename)
+                )
+                self._conn.execute(
+                    "UPDATE chunks SET synced = 0 WHERE collection = ? AND content_hash = ?", (collection_name, digest)
+                )
+                self._skip(kind, node, text)
+                duplicates.append((node, row[0]))
+        return kept, duplicates
+
+    def adopt(self, node, filename: str, collection_name: str, chunk_id: str):
+        """
+        Turns a skipped duplicate back into the stored copy (its canonical vector is missing).
+        """
+        self._conn.execute(
+            "UPDATE chunks SET chunk_id = ?, owner = ?, synced = 0 WHERE collection = ? AND chunk_id = ?",
+            (node.node_id, filename, collection_name, chunk_id)
+        )
+        self._claimed.add(node.node_id)
+        # Written after all: no longer a saving
+        kind, chars = self._skipped.pop(node.node_id)
+        self._batch_counts[kind] -= 1
+        self._batch_counts["chars_skipped"] -= chars
+        self._conn.execute(
+            "DELETE FROM chunk_sources WHERE collection = ? AND source = ? AND content_hash IN "
+            "(SELECT content_hash FROM chunks WHERE collection = ? AND chunk_id = ?)",
+            (collection_name, filename, collection_name, node.node_id)
+        )
+
+    def _near_match(self, collection_name: str, signature: array):
+        candidates = set()
+        for band, bucket in enumerate(self.hasher.buckets(signature)):
+            candidates.update(
+                digest for (digest,) in self._conn.execute(
+                    "SELECT content_hash FROM lsh_buckets WHERE collection = ? AND band = ? AND bucket = ?",
+                    (collection_name, band, bucket)
+                )
+            )
+
+        best = None
+        for digest in candidates:
+            row = self._conn.execute(
+                "SELECT chunk_id, owner, signature FROM chunks WHERE collection = ? AND content_hash = ?",
+                (collection_name, digest)
+            ).fetchone()
+            if row is None or row[2] is None:
+                continue
+            similarity = self.hasher.similarity(signature, array("Q", row[2]))
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, digest, row[:2])
+        return (best[1], best[2]) if best else None
+
+    def _register(self, collection_name: str, digest: str, chunk_id: str, owner: str, signature: array | None):
+        self._conn.execute(
+            "INSERT INTO chunks (collection, content_hash, chunk_id, owner, signature, synced) VALUES (?, ?, ?, ?, ?, 1)",
+            (collection_name, digest, chunk_id, owner, signature.tobytes() if signature is not None else None)
+        )
+        self._claimed.add(chunk_id)
+        if signature is not None:
+            self._conn.executemany(
+                "INSERT INTO lsh_buckets (collection, band, bucket, content_hash) VALUES (?, ?, ?, ?)",
+                [(collection_name, band, bucket, digest) for band, bucket in enumerate(self.hasher.buckets(signature))]
+            )
+
+    def _skip(self, kind: str, node, text: str):
+        self._skipped[node.node_id] = (kind, len(text))
+        self._batch_counts[kind] += 1
+        self._batch_counts["chars_skipped"] += len(text)
+        telemetry.count("dedup_skipped", kind=kind)
+
+    # --- Source removal ---
+
+    def _drop_extra_source(self, filename: str, collection_name: str):
+        self._conn.execute(
+            "UPDATE chunks SET synced = 0 WHERE collection = ? AND content_hash IN "
+            "(SELECT content_hash FROM chunk_sources WHERE collection = ? AND source = ?)",
+            (collection_name, collection_name, filename)
+        )
+        self._conn.execute(
+            "DELETE FROM chunk_sources WHERE collection = ? AND source = ?", (collection_name, filename)
+        )
+
+    def release_source(self, filename: str, collection_name: str, keep_ids=frozenset(), forget: bool = False) -> set:
+        """
+        Gives up the file's stored chunks before its vectors are deleted.
+
+        Chunks other files also came from are handed over to one of them (and must
+        not be deleted); the rest leave the index.
+
+        Args:
+            keep_ids (set): IDs the file is writing again right now (its new version).
+            forget (bool): The file is gone: also drop it as an extra source everywhere.
+
+        Returns:
+            set: chunk IDs that were handed over and must survive the delete.
+        """
+        if forget:
+            self._drop_extra_source(filename, collection_name)
+
+        handed_over = set()
+        rows = self._conn.execute(
+            "SELECT content_hash, chunk_id FROM chunks WHERE collection = ? AND owner = ?", (collection_name, filename)
+        ).fetchall()
+        for digest, chunk_id in rows:
+            if chunk_id in keep_ids:
+                continue
+            heir = self._conn.execute(
+                "SELECT source FROM chunk_sources WHERE collection = ? AND content_hash = ? ORDER BY source LIMIT 1",
+                (collection_name, digest)
+            ).fetchone()
+            if heir:
+                self._conn.execute(
+                    "UPDATE chunks SET owner = ?, synced = 0 WHERE collection = ? AND content_hash = ?",
+                    (heir[0], collection_name, digest)
+                )
+                self._conn.execute(
+                    "DELETE FROM chunk_sources WHERE collection = ? AND content_hash = ? AND source = ?",
+                    (collection_name, digest, heir[0])
+                )
+                handed_over.add(chunk_id)
+            else:
+                self._conn.execute("DELETE FROM chunks WHERE collection = ? AND content_hash = ?", (collection_name, digest))
+                self._conn.execute(
+                    "DELETE FROM lsh_buckets WHERE collection = ? AND content_hash = ?", (collection_name, digest)
+                )
+        return handed_over
+
+    def relocate(self, chunk_ids: list[str], from_collection: str, to_collection: str):
+        """
+        Moves the index entries of chunks whose vectors were rebalanced into another shard.
+        """
+        with self.transaction():
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                digests = [
+                    digest for (digest,) in self._conn.execute(
+                        f"SELECT content_hash FROM chunks WHERE collection = ? AND chunk_id IN ({placeholders})",
+                        [from_collection, *batch]
+                    )
+                ]
+                for table in ("chunks", "chunk_sources", "lsh_buckets"):
+                    self._conn.executemany(
+                        f"UPDATE OR IGNORE {table} SET collection = ? WHERE collection = ? AND content_hash = ?",
+                        [(to_collection, from_collection, digest) for digest in digests]
+                    )
+                    # Rows the target shard already had (the same text stored there too) win
+                    self._conn.executemany(
+                        f"DELETE FROM {table} WHERE collection = ? AND content_hash = ?",
+                        [(from_collection, digest) for digest in digests]
+                    )
+
+    # --- Chroma metadata ---
+
+    def sync(self, chroma_collection, collection_name: str) -> int:
+        """
+        Writes owner and extra sources of every changed chunk into its Chroma metadata.
+
+        Returns:
+            int: Number of vectors updated.
+        """
+        rows = self._conn.execute(
+            "SELECT content_hash, chunk_id, owner FROM chunks WHERE collection = ? AND synced = 0", (collection_name,)
+        ).fetchall()
+        if not rows:
+            return 0
+
+        updated = 0
+        for start in range(0, len(rows), 500):
+            batch = rows[start : start + 500]
+            existing = chroma_collection.get(ids=[chunk_id for _, chunk_id, _ in batch], include=["metadatas"])
+            metadata_by_id = dict(zip(existing["ids"], existing["metadatas"]))
+
+            ids, metadatas = [], []
+            for digest, chunk_id, owner in batch:
+                if chunk_id not in metadata_by_id:
+                    # Not written (yet); stays pending
+                    continue
+                sources = [
+                    source for (source,) in self._conn.execute(
+                        "SELECT source FROM chunk_sources WHERE collection = ? AND content_hash = ? ORDER BY source",
+                        (collection_name, digest)
+                    )
+                ]
+                metadata = dict(metadata_by_id[chunk_id] or {})
+                metadata["source"] = owner
+                metadata[DUPLICATE_SOURCES_KEY] = json.dumps(sources)
+                ids.append(chunk_id)
+                metadatas.append(metadata)
+
+            if ids:
+                chroma_collection.update(ids=ids, metadatas=metadatas)
+                self._conn.executemany(
+                    "UPDATE chunks SET synced = 1 WHERE collection = ? AND chunk_id = ?",
+                    [(collection_name, chunk_id) for chunk_id in ids]
+                )
+                updated += len(ids)
+        return updated
+
+    def stats(self) -> dict:
+        """
+        Duplicates skipped in this process and the share of embedding work saved.
+        """
+        counts = dict(self.stats_counts)
+        skipped = counts["exact_duplicates"] + counts["near_duplicates"]
+        counts["embeddings_saved"] = skipped
+        counts["saved_ratio"] = round(skipped / counts["chunks"], 4) if counts["chunks"] else 0.0
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,134 @@
+import os
+import shutil
+from config import Config
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+
+def embedding_model_id(backend: str = Config.EMBEDDING_BACKEND) -> str:
+    """
+    Identity of the vectors a backend produces, used as the embedding cache key.
+
+    ONNX and int8 outputs differ slightly from PyTorch's, so each backend gets its
+    own cache entries; the PyTorch id stays the bare model name, keeping existing caches valid.
+    """
+    if backend == BACKEND_TORCH:
+        return Config.EMBEDDING_MODEL_NAME
+    if backend == BACKEND_ONNX_INT8:
+        return f"{Config.EMBEDDING_MODEL_NAME}@{backend}-{Config.EMBEDDING_QUANTIZATION_CONFIG}"
+    return f"{Config.EMBEDDING_MODEL_NAME}@{backend}"
+
+
+def build_embedding(
+    backend: str = Config.EMBEDDING_BACKEND,
+    batch_size: int = Config.EMBED_BATCH_SIZE,
+    threads: int = Config.EMBEDDING_THREADS,
+):
+    """
+    Creates the LlamaIndex embedding model for the given runtime backend.
+
+    Every backend runs the same model through sentence-transformers, so pooling,
+    normalization and the query/text instructions are identical; only the runtime
+    differs:
+      - 'torch':     PyTorch (the original setup).
+      - 'onnx':      ONNX Runtime on CPU, from a one-time export under EMBEDDING_ONNX_DIR.
+      - 'onnx-int8': The ONNX export with int8 dynamic quantization of its weights.
+
+    Args:
+        backend (str): One of BACKENDS.
+        batch_size (int): Texts per forward pass.
+        threads (int): Intra-op CPU threads for the runtime (0 = runtime default).
+
+    Returns:
+        HuggingFaceEmbedding: The model (without the embedding cache).
+
+    Raises:
+        ValueError: Unknown backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.embeddings.huggingface.utils import (
+        get_query_instruct_for_model_name,
+        get_text_instruct_for_model_name,
+    )
+
+    # Instructions are looked up by the hub name; an exported model lives under a local path
+    instructions = {
+        "query_instruction": get_query_instruct_for_model_name(Config.EMBEDDING_MODEL_NAME),
+        "text_instruction": get_text_instruct_for_model_name(Config.EMBEDDING_MODEL_NAME),
+    }
+
+    if backend == BACKEND_TORCH:
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return HuggingFaceEmbedding(
+            model_name=Config.EMBEDDING_MODEL_NAME,
+            embed_batch_size=batch_size,
+            **instructions
+        )
+
+    import onnxruntime
+
+    export_dir = export_onnx_model(quantize=backend == BACKEND_ONNX_INT8)
+    session_options = onnxruntime.SessionOptions()
+    if threads:
+        session_options.intra_op_num_threads = threads
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+    if backend == BACKEND_ONNX_INT8:
+        model_kwargs["file_name"] = _quantized_file_name()
+    else:
+        model_kwargs["file_name"] = _onnx_file_name(export_dir)
+
+    return HuggingFaceEmbedding(
+        model_name=export_dir,
+        embed_batch_size=batch_size,
+        backend="onnx",
+        model_kwargs=model_kwargs,
+        **instructions
+    )
+
+
+def export_onnx_model(quantize: bool = False, export_root: str = Config.EMBEDDING_ONNX_DIR) -> str:
+    """
+    Exports the embedding model to ONNX once (and its int8 variant, if asked) and
+    returns the local model directory. Later calls only check that the files exist.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = os.path.join(export_root, Config.EMBEDDING_MODEL_NAME.replace("/", "__"))
+    if not os.path.exists(os.path.join(export_dir, "modules.json")):
+        print(f"[*] Exporting {Config.EMBEDDING_MODEL_NAME} to ONNX (one-time): {export_dir}")
+        # Written to a temporary directory first, so an interrupted export is never picked up
+        tmp_dir = f"{export_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        SentenceTransformer(Config.EMBEDDING_MODEL_NAME, backend="onnx").save_pretrained(tmp_dir)
+        os.makedirs(export_root, exist_ok=True)
+        os.replace(tmp_dir, export_dir)
+
+    if quantize and not os.path.exists(os.path.join(export_dir, _quantized_file_name())):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        print(f"[*] Quantizing the ONNX model to int8 ({Config.EMBEDDING_QUANTIZATION_CONFIG}, one-time)")
+        model = SentenceTransformer(
+            export_dir, backend="onnx", model_kwargs={"file_name": _onnx_file_name(export_dir)}
+        )
+        export_dynamic_quantized_onnx_model(model, Config.EMBEDDING_QUANTIZATION_CONFIG, export_dir)
+    return export_dir
+
+
+def _onnx_file_name(export_dir: str) -> str:
+    # Depending on the sentence-transformers version the export lands in the root or in onnx/
+    for candidate in (os.path.join("onnx", "model.onnx"), "model.onnx"):
+        if os.path.exists(os.path.join(export_dir, candidate)):
+            return candidate
+    raise FileNotFoundError(f"No ONNX model found in {export_dir}; delete the directory to re-export")
+
+
+def _quantized_file_name() -> str:
+    return os.path.join("onnx", f"model_qint8_{Config.EMBEDDING_QUANTIZATION_CONFIG}.onnx")
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from config import Config
+from telemetry import telemetry
+
+# How many writes happen between two checks of the on-disk size cap
+EVICTION_CHECK_INTERVAL = 256
+
+# After eviction the cache is trimmed to this share of the cap, so we don't evict on every write
+EVICTION_TARGET_RATIO = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: Unicode NFC with whitespace runs collapsed.
+    The BERT tokenizer behind bge-small splits on whitespace, so this never changes the vector.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(model_name: str, text: str) -> str:
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk store of text embeddings keyed by (model, normalized text).
+
+    Backed by SQLite in WAL mode, so several worker processes can read and write the
+    same file concurrently. Entries are evicted least-recently-used first once the
+    stored vectors exceed the configured size cap.
+    """
+
+    def __init__(self, db_path: str = Config.EMBEDDING_CACHE_PATH, max_mb: int = Config.EMBEDDING_CACHE_MAX_MB):
+        self.db_path = db_path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._writes_since_check = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite handles must not cross a fork: reopen in each worker process
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get_many(self, model_name: str, texts: list[str]) -> list[list[float] | None]:
+        """
+        Looks up embeddings for a batch of texts.
+
+        Returns:
+            list[list[float] | None]: The cached vector per text, or None on a miss.
+        """
+        keys = [make_cache_key(model_name, text) for text in texts]
+        found = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                # Refresh recency so frequently repeated boilerplate stays cached
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model_name: str, texts: list[str], embeddings: list[list[float]]):
+        """
+        Stores freshly computed embeddings and evicts old entries if the cap is exceeded.
+        """
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            blob = array("f", embedding).tobytes()
+            rows.append((make_cache_key(model_name, text), model_name, blob, len(blob), now))
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+            self._writes_since_check += len(rows)
+            if self._writes_since_check >= EVICTION_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        to_free = total_bytes - int(self.max_bytes * EVICTION_TARGET_RATIO)
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC"):
+            victims.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters for this process plus the current on-disk footprint.
+        """
+        with self._lock:
+            entries, total_bytes = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "size_mb": round(total_bytes / (1024 * 1024), 2),
+            }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    LlamaIndex embedding model that consults an EmbeddingCache before delegating
+    to the wrapped model. Only document (text) embeddings are cached; queries pass through.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, model_name: str | None = None, **kwargs):
+        # model_name is the cache key namespace (defaults to the wrapped model's name)
+        super().__init__(
+            model_name=model_name or inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._inner._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return await self._inner._aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        embeddings = self._cache.get_many(self.model_name, texts)
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        telemetry.count("embedding_cache_hits", len(texts) - len(missing))
+        telemetry.count("embedding_cache_misses", len(missing))
+        if missing:
+            # Embed each distinct missing text once, even if it repeats within the batch
+            distinct = list(dict.fromkeys(texts[i] for i in missing))
+            computed = dict(zip(distinct, self._inner._get_text_embeddings(distinct)))
+            self._cache.put_many(self.model_name, distinct, [computed[text] for text in distinct])
+            for i in missing:
+                embeddings[i] = computed[texts[i]]
+
+        return embeddings
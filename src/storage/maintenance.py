@@ -0,0 +1,389 @@
+import hashlib
+import os
+import re
+import time
+from config import Config, ensure_directories
+from storage.sharding import logical_name, route, shard_names, shard_path, storage_paths
+from storage.vector_store import (
+    CHROMA_MAX_WRITE_BATCH,
+    delete_source_vectors,
+    forget_collection,
+    get_chroma_client,
+    get_collection,
+    get_deduplicator,
+    get_storage_client,
+    hnsw_metadata,
+    list_collections,
+)
+from telemetry import percentile, telemetry
+
+# A collection is rebuilt under this temporary name and swapped in once complete
+COMPACT_SUFFIX = "__compacting"
+
+
+# make_chunk_id layout: <source key>-<ordinal>-<content key>
+_CHUNK_ID = re.compile(r"[0-9a-f]{16}-\d{6,}-[0-9a-f]{16}")
+
+
+def _store_size_mb() -> float:
+    # Every storage directory, so sharded layouts are measured as a whole
+    total = 0
+    for path in storage_paths():
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except FileNotFoundError:
+                    pass
+    return round(total / (1024 * 1024), 2)
+
+
+class IndexMaintenance:
+    """
+    Housekeeping for the vector indices, which otherwise only ever grow.
+
+    - Stale vectors are found by comparing every vector's 'source' with DATA_DIR
+      and the manifest:
+        orphaned   - the source file no longer exists
+        misrouted  - the manifest routes the file to another collection (re-routing leftovers)
+        unlabeled  - no 'source' metadata at all
+        duplicates - leftover copies under IDs from before deterministic chunk IDs,
+                     whose text the same file also stores under a current ID
+                     (a paragraph repeated within a file is real content and is kept)
+        misplaced  - in the wrong shard after a sharding change (only reported;
+                     rebalance() moves them)
+      Orphaned and misrouted files are removed through delete_source_vectors, so
+      chunks that deduplication shares with other files are handed over, not lost.
+    - Compaction rebuilds a collection from its stored vectors (no re-embedding):
+      HNSW graphs keep deleted entries around, and a rebuild is also the only way
+      to apply changed HNSW parameters (Config.COLLECTION_HNSW).
+    - Rebalancing moves vectors to the shard (and storage path) the current
+      SHARD_COUNT / SHARD_KEY / SHARD_PATHS route them to.
+
+    Each shard is maintained as a collection of its own. Compaction and rebalancing
+    move vectors between collections, so run them while no pipeline or daemon is writing.
+
+    Usage:
+        report = IndexMaintenance(manifest=IngestionManifest()).run(dry_run=True)
+    """
+
+    def __init__(
+        self,
+        data_dir: str = Config.DATA_DIR,
+        manifest=None,
+        journal=None,
+        page_size: int = Config.MAINTENANCE_PAGE_SIZE,
+        latency_queries: int = Config.MAINTENANCE_LATENCY_QUERIES,
+        top_k: int = Config.RETRIEVAL_TOP_K,
+    ):
+        self.data_dir = data_dir
+        self.manifest = manifest
+        self.journal = journal
+        self.page_size = page_size
+        self.latency_queries = latency_queries
+        self.top_k = top_k
+
+    def run(self, collection_names: list[str] | None = None, purge: bool = True, compact: bool = True,
+            dry_run: bool = False) -> dict:
+        """
+        Measures, purges and compacts each collection and reports the difference.
+
+        Args:
+            collection_names (list[str]): Logical collections to maintain (all their shards).
+                Defaults to both indices.
+            purge (bool): Remove stale vectors.
+            compact (bool): Rebuild the collections afterwards.
+            dry_run (bool): Only measure and count what would be removed.
+
+        Returns:
+            dict: Per collection: 'before' / 'after' measurements, stale counts,
+            removed vectors and compaction time; plus the on-disk size of the store.
+        """
+        ensure_directories()
+        report = {"dry_run": dry_run, "disk_mb_before": _store_size_mb(), "collections": {}}
+
+        logical_names = collection_names or [Config.COLLECTION_PUBLIC, Config.COLLECTION_SECURE]
+        for collection_name in [shard for name in logical_names for shard in shard_names(name)]:
+            self._recover(collection_name)
+            chroma_collection = get_collection(collection_name, create=False)
+            if chroma_collection is None:
+                # Nothing was ever routed here
+                continue
+
+            print(f"[*] Maintaining '{collection_name}'")
+            entry = {"before": self.measure(chroma_collection)}
+            if purge:
+                stale = self.find_stale(collection_name)
+                entry["stale"] = {kind: len(items) for kind, items in stale.items()}
+                if not dry_run:
+                    entry["removed"] = self.purge(collection_name, stale)
+            if compact and not dry_run:
+                started = time.perf_counter()
+                entry["compacted_vectors"] = self.compact(collection_name)
+                entry["compact_secs"] = round(time.perf_counter() - started, 2)
+            entry["after"] = self.measure(get_collection(collection_name, create=False))
+            report["collections"][collection_name] = entry
+
+        report["disk_mb_after"] = _store_size_mb()
+        return report
+
+    def delete_sources(self, rel_paths: list[str], collection_names: list[str] | None = None) -> dict:
+        """
+        Deletes every vector of the given source files.
+        The files are also dropped from the manifest and stage journal, so a later run
+        re-ingests them if they still exist.
+
+        Returns:
+            dict: Vectors deleted per file.
+        """
+        deleted = {}
+        for rel_path in rel_paths:
+            deleted[rel_path] = delete_source_vectors(rel_path, collection_names)
+            for store in (self.manifest, self.journal):
+                if store:
+                    store.remove(rel_path)
+        return deleted
+
+    # --- 1. Measurement ---
+
+    def measure(self, chroma_collection) -> dict:
+        """
+        Vector count, HNSW settings and query latency, using stored vectors as queries
+        (so no embedding model is needed).
+        """
+        count = chroma_collection.count()
+        result = {
+            "vectors": count,
+            "hnsw": {key: value for key, value in (chroma_collection.metadata or {}).items() if key.startswith("hnsw:")},
+        }
+        if not count or not self.latency_queries:
+            return result
+
+        sample = chroma_collection.get(limit=self.latency_queries, include=["embeddings"])
+        latencies = []
+        for embedding in sample["embeddings"]:
+            started = time.perf_counter()
+            chroma_collection.query(
+                query_embeddings=[[float(value) for value in embedding]],
+                n_results=min(self.top_k, count),
+                include=["distances"]
+            )
+            latencies.append(time.perf_counter() - started)
+        result["query_p50_ms"] = round(percentile(latencies, 50) * 1000, 2)
+        result["query_p95_ms"] = round(percentile(latencies, 95) * 1000, 2)
+        return result
+
+    # --- 2. Stale Vector Detection ---
+
+    def find_stale(self, collection_name: str) -> dict:
+        """
+        Returns {'orphaned': [source], 'misrouted': [source], 'misplaced': [source],
+        'unlabeled': [id], 'duplicates': [id]}.
+        """
+        chroma_collection = get_collection(collection_name, create=False)
+
+        # source -> {content digest -> [chunk ids]}; digests keep this small on large collections
+        by_source = {}
+        unlabeled = []
+        for page in self._pages(chroma_collection, ["metadatas", "documents"]):
+            for chunk_id, metadata, document in zip(page["ids"], page["metadatas"], page["documents"]):
+                source = (metadata or {}).get("source")
+                if not source:
+                    unlabeled.append(chunk_id)
+                    continue
+                digest = hashlib.sha256((document or "").encode("utf-8")).digest()[:16]
+                by_source.setdefault(source, {}).setdefault(digest, []).append(chunk_id)
+
+        logical = logical_name(collection_name)
+        orphaned, misrouted, misplaced, duplicates = [], [], [], []
+        for source, contents in by_source.items():
+            if not os.path.isfile(os.path.join(self.data_dir, source)):
+                orphaned.append(source)
+                continue
+            entry = self.manifest.get(source) if self.manifest else None
+            if entry and entry["target_collection"] != logical:
+                misrouted.append(source)
+                continue
+            if route(logical, source) != collection_name:
+                misplaced.append(source)
+            for chunk_ids in contents.values():
+                # Only a legacy ID next to a current one is a leftover; current IDs are never
+                # removed (positional repeats, chunks handed over by deduplication)
+                legacy = [chunk_id for chunk_id in chunk_ids if not _CHUNK_ID.fullmatch(chunk_id)]
+                if legacy and len(legacy) < len(chunk_ids):
+                    duplicates.extend(legacy)
+
+        return {
+            "orphaned": orphaned, "misrouted": misrouted, "misplaced": misplaced,
+            "unlabeled": unlabeled, "duplicates": duplicates,
+        }
+
+    def purge(self, collection_name: str, stale: dict) -> int:
+        """
+        Deletes the vectors found by find_stale() and returns how many were removed.
+        """
+        removed = 0
+        for source in stale["orphaned"] + stale["misrouted"]:
+            removed += delete_source_vectors(source, [collection_name])
+
+        chroma_collection = get_collection(collection_name, create=False)
+        chunk_ids = stale["unlabeled"] + stale["duplicates"]
+        for start in range(0, len(chunk_ids), CHROMA_MAX_WRITE_BATCH):
+            batch = chunk_ids[start : start + CHROMA_MAX_WRITE_BATCH]
+            chroma_collection.delete(ids=batch)
+            removed += len(batch)
+
+        telemetry.count("maintenance_vectors_removed", removed, collection=collection_name)
+        print(f"   [-] Removed {removed} stale vectors from '{collection_name}'")
+        return removed
+
+    # --- 3. Compaction ---
+
+    def compact(self, collection_name: str) -> int:
+        """
+        Rebuilds a collection with its configured HNSW parameters and swaps it in.
+
+        Returns:
+            int: Vectors copied into the rebuilt collection.
+        """
+        client = get_chroma_client(collection_name)
+        source = get_collection(collection_name, create=False)
+        temp_name = f"{collection_name}{COMPACT_SUFFIX}"
+        try:
+            client.delete_collection(temp_name)
+        except Exception:
+            pass
+
+        metadata = {key: value for key, value in (source.metadata or {}).items() if not key.startswith("hnsw:")}
+        metadata.update(hnsw_metadata(collection_name))
+        target = client.create_collection(temp_name, metadata=metadata or None)
+
+        copied = 0
+        for page in self._pages(source, ["embeddings", "documents", "metadatas"]):
+            target.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"])
+            copied += len(page["ids"])
+
+        # Swap: the original is only dropped once the copy is complete
+        client.delete_collection(collection_name)
+        target.modify(name=collection_name)
+        forget_collection(collection_name)
+        print(f"   [+] Compacted '{collection_name}' ({copied} vectors)")
+        return copied
+
+    def _recover(self, collection_name: str):
+        # Finishes (or discards) a compaction that was interrupted mid-swap
+        client = get_chroma_client(collection_name)
+        try:
+            temp = client.get_collection(f"{collection_name}{COMPACT_SUFFIX}")
+        except Exception:
+            return
+        if get_collection(collection_name, create=False) is None:
+            temp.modify(name=collection_name)
+            print(f"   [!] Restored '{collection_name}' from an interrupted compaction")
+        else:
+            client.delete_collection(temp.name)
+        forget_collection(collection_name)
+
+    # --- 4. Rebalancing ---
+
+    def rebalance(self, collection_names: list[str] | None = None, dry_run: bool = False) -> dict:
+        """
+        Moves every vector to the shard its source file routes to under the current
+        sharding settings. Shards that end up empty and are no longer part of the
+        layout (e.g. after lowering SHARD_COUNT) are dropped. Setting SHARD_COUNT=1
+        merges all shards back into the unsharded collection.
+
+        Args:
+            collection_names (list[str]): Logical collections. Defaults to both indices.
+            dry_run (bool): Only count the vectors that would move.
+
+        Returns:
+            dict: Per logical collection: vectors moved and vectors per current shard.
+        """
+        report = {}
+        for logical in collection_names or [Config.COLLECTION_PUBLIC, Config.COLLECTION_SECURE]:
+            layout = set(shard_names(logical))
+            moved = 0
+            for path, name in list_collections():
+                if logical_name(name) != logical or name.endswith(COMPACT_SUFFIX):
+                    continue
+                # The source is opened by its actual location, which may differ from
+                # where the current SHARD_PATHS would put it
+                source = get_storage_client(path).get_collection(name)
+                moves = {}
+                for page in self._pages(source, ["metadatas"]):
+                    for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                        file_source = (metadata or {}).get("source")
+                        if not file_source:
+                            # Unlabeled vectors are left to the stale-vector purge
+                            continue
+                        target = route(logical, file_source)
+                        if target != name or shard_path(target) != path:
+                            moves.setdefault(target, []).append(chunk_id)
+
+                for target, chunk_ids in moves.items():
+                    if not dry_run:
+                        self._move(source, name, target, chunk_ids)
+                    moved += len(chunk_ids)
+
+                stays = name in layout and shard_path(name) == path
+                if not dry_run and not stays and source.count() == 0:
+                    get_storage_client(path).delete_collection(name)
+                    forget_collection(name)
+                    print(f"   [-] Dropped empty collection '{name}' ({path})")
+
+            shard_sizes = {}
+            for shard in sorted(layout):
+                chroma_collection = get_collection(shard, create=False)
+                shard_sizes[shard] = chroma_collection.count() if chroma_collection is not None else 0
+            report[logical] = {"moved": moved, "shards": shard_sizes}
+            print(f"[*] {logical}: {moved} vectors {'to move' if dry_run else 'moved'} across {len(layout)} shard(s)")
+        return report
+
+    def _move(self, source, source_name: str, target_name: str, chunk_ids: list[str]):
+        # Copy first, delete after: an interruption leaves a duplicate, never a loss
+        target = get_collection(target_name)
+        dedup = get_deduplicator()
+        for start in range(0, len(chunk_ids), self.page_size):
+            page = source.get(
+                ids=chunk_ids[start : start + self.page_size], include=["embeddings", "documents", "metadatas"]
+            )
+            target.upsert(
+                ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"]
+            )
+            if dedup and source_name != target_name:
+                dedup.relocate(page["ids"], source_name, target_name)
+            source.delete(ids=page["ids"])
+        telemetry.count("shard_vectors_moved", len(chunk_ids))
+
+    def _pages(self, chroma_collection, include: list[str]):
+        offset = 0
+        while True:
+            page = chroma_collection.get(include=include, limit=self.page_size, offset=offset)
+            if not len(page["ids"]):
+                return
+            yield page
+            offset += len(page["ids"])
+
+
+def print_report(report: dict):
+    """
+    One line per collection: vectors, query latency and what was removed.
+    """
+    for collection_name, entry in report["collections"].items():
+        before, after = entry["before"], entry["after"]
+        stale = entry.get("stale", {})
+        print(
+            f"[*] {collection_name}: {before['vectors']} -> {after['vectors']} vectors, "
+            f"query p50 {before.get('query_p50_ms', 0)} -> {after.get('query_p50_ms', 0)} ms, "
+            f"p95 {before.get('query_p95_ms', 0)} -> {after.get('query_p95_ms', 0)} ms"
+        )
+        if stale:
+            print(
+                f"    stale: {stale['orphaned']} orphaned files, {stale['misrouted']} misrouted files, "
+                f"{stale['unlabeled']} unlabeled vectors, {stale['duplicates']} duplicate vectors"
+                f"{' (dry run, nothing removed)' if report['dry_run'] else ''}"
+            )
+            if stale["misplaced"]:
+                print(f"    [!] {stale['misplaced']} files are in the wrong shard; run 'main.py --rebalance'")
+    print(f"[*] Vector store on disk: {report['disk_mb_before']} -> {report['disk_mb_after']} MB")
@@ -0,0 +1,77 @@
+import hashlib
+import re
+from config import Config
+
+SHARD_KEY_HASH = "hash"
+SHARD_KEY_FOLDER = "folder"
+
+# Physical shard collections are named '<logical collection>__shardNN'
+_SHARD_SUFFIX = re.compile(r"__shard(\d+)")
+
+
+def shard_key(source: str, key: str | None = None) -> str:
+    """
+    The part of a source path that decides its shard: the whole relative path
+    ('hash') or its top-level folder ('folder', files at the root share one shard).
+    """
+    if (key or Config.SHARD_KEY) == SHARD_KEY_FOLDER:
+        parts = source.replace("\\", "/").split("/")
+        return parts[0] if len(parts) > 1 else ""
+    return source
+
+
+def shard_index(source: str, count: int | None = None, key: str | None = None) -> int:
+    # Stable across processes and runs (unlike hash()), so a file always lands in the same shard
+    digest = hashlib.sha256(shard_key(source, key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % (count or Config.SHARD_COUNT)
+
+
+def shard_name(collection_name: str, index: int) -> str:
+    return f"{collection_name}__shard{index:02d}"
+
+
+def shard_names(collection_name: str, count: int | None = None) -> list[str]:
+    """
+    Physical collections of a logical collection (just itself when sharding is off).
+    """
+    count = count or Config.SHARD_COUNT
+    if count <= 1:
+        return [collection_name]
+    return [shard_name(collection_name, index) for index in range(count)]
+
+
+def is_shard(collection_name: str) -> bool:
+    return _SHARD_SUFFIX.search(collection_name) is not None
+
+
+def route(collection_name: str, source: str) -> str:
+    """
+    Physical collection holding a file's vectors within a logical collection.
+    Names that already denote a shard are returned unchanged.
+    """
+    if Config.SHARD_COUNT <= 1 or is_shard(collection_name):
+        return collection_name
+    return shard_name(collection_name, shard_index(source))
+
+
+def logical_name(collection_name: str) -> str:
+    match = _SHARD_SUFFIX.search(collection_name)
+    return collection_name[:match.start()] if match else collection_name
+
+
+def storage_paths() -> list[str]:
+    """
+    Every directory that may hold collections: the default store plus the shard paths.
+    """
+    return list(dict.fromkeys([Config.CHROMA_DB_PATH, *Config.SHARD_PATHS]))
+
+
+def shard_path(collection_name: str) -> str:
+    """
+    Storage directory of a collection: shard N lives in SHARD_PATHS[N % len(SHARD_PATHS)],
+    everything else in CHROMA_DB_PATH.
+    """
+    match = _SHARD_SUFFIX.search(collection_name)
+    if not match or not Config.SHARD_PATHS:
+        return Config.CHROMA_DB_PATH
+    return Config.SHARD_PATHS[int(match.group(1)) % len(Config.SHARD_PATHS)]
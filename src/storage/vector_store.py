@@ -1,26 +1,317 @@
+import contextlib
+import hashlib
 import logging
-import chromadb
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import VectorStoreIndex, Document, StorageContext, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from config import Config
+import os
+import threading
+import time
+from llama_index.core import Document, Settings
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from storage.embedding_backends import build_embedding, embedding_model_id
+from storage.embedding_cache import EmbeddingCache, CachedEmbedding
+from storage.sharding import logical_name, route, shard_path, storage_paths
+from storage.dedup import ChunkDeduplicator
+from config import Config, ensure_directories
+from telemetry import telemetry
 
 # --- Service Initialization ---
+# The embedding model and the Chroma client are heavy (seconds, hundreds of MB), so they
+# are created on first use rather than at import time. Every accessor is thread-safe;
+# long-running processes can load them up front via pipeline.warmup.preload().
 
 # 1. Suppressing Telemetry & Verbose Logs
 # ChromaDB and HuggingFace can be noisy; we restrict logs to Errors only for a clean CLI.
 logging.getLogger("chromadb").setLevel(logging.ERROR)
 
-# 2. Configuring Local Embeddings (Privacy-First)
-# We are using 'BAAI/bge-small-en-v1.5', a high performance local model.
-# This ensures data never leaves the local environment for vectorization.
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+_embed_model = None
+_embed_model_lock = threading.Lock()
 
-# 3. Initialize Persistent Database Connection
-# We initialize the client at the module level to maintain a connection pool.
-_chroma_client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+# One persistent client per storage directory (several when shards span SHARD_PATHS)
+_chroma_clients = {}
+_chroma_client_lock = threading.Lock()
 
-def save_to_chroma(text_chunks: list[str], filename: str, collection_name: str):
+_deduplicator = None
+_deduplicator_lock = threading.Lock()
+
+# Collection Handles
+# Resolved once per process and reused by every write, delete and flush.
+_collections = {}
+_collections_lock = threading.Lock()
+
+# Chroma rejects oversized add/upsert calls; writes are split into slices of this size.
+CHROMA_MAX_WRITE_BATCH = 5000
+
+# Per-file node metadata that must not influence a chunk's vector (see build_nodes)
+EMBED_EXCLUDED_METADATA_KEYS = ["source"]
+
+# Config.COLLECTION_HNSW keys -> Chroma collection metadata keys
+HNSW_METADATA_KEYS = {
+    "space": "hnsw:space",
+    "M": "hnsw:M",
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef",
+}
+
+def get_embed_model():
+    """
+    Returns the process-wide embedding model, loading it on first call.
+
+    We are using 'BAAI/bge-small-en-v1.5', a high performance local model.
+    This ensures data never leaves the local environment for vectorization.
+    Config.EMBEDDING_BACKEND selects the runtime (PyTorch, ONNX or int8 ONNX);
+    ingestion and retrieval share this one instance, so both always agree.
+    The model is also installed as LlamaIndex's Settings.embed_model.
+    """
+    global _embed_model
+    if _embed_model is None:
+        with _embed_model_lock:
+            if _embed_model is None:
+                ensure_directories()
+                embed_model = build_embedding()
+                # Embedding Cache: identical chunks (boilerplate, re-ingested files)
+                # are looked up instead of re-embedded. Keyed per backend.
+                if Config.EMBEDDING_CACHE_ENABLED:
+                    embed_model = CachedEmbedding(embed_model, EmbeddingCache(), model_name=embedding_model_id())
+                Settings.embed_model = embed_model
+                _embed_model = embed_model
+    return _embed_model
+
+def get_chroma_client(collection_name: str | None = None):
+    """
+    Returns the process-wide persistent ChromaDB client, opening it on first call.
+    One client per process (and storage directory) maintains the connection pool for every collection.
+
+    Args:
+        collection_name (str): Return the client of the directory holding this
+            collection (shards may live under SHARD_PATHS). Defaults to CHROMA_DB_PATH.
+    """
+    return get_storage_client(shard_path(collection_name) if collection_name else Config.CHROMA_DB_PATH)
+
+def get_storage_client(path: str):
+    """
+    Returns the persistent ChromaDB client of one storage directory.
+    """
+    client = _chroma_clients.get(path)
+    if client is None:
+        with _chroma_client_lock:
+            client = _chroma_clients.get(path)
+            if client is None:
+                import chromadb
+
+                ensure_directories()
+                os.makedirs(path, exist_ok=True)
+                client = chromadb.PersistentClient(path=path)
+                _chroma_clients[path] = client
+    return client
+
+def list_collections() -> list[tuple[str, str]]:
+    """
+    (storage path, collection name) of every collection across all storage directories.
+    """
+    found = []
+    for path in storage_paths():
+        for collection in get_storage_client(path).list_collections():
+            # Older Chroma versions return Collection objects, newer ones plain names
+            found.append((path, getattr(collection, "name", collection)))
+    return found
+
+def get_deduplicator() -> ChunkDeduplicator | None:
+    """
+    Returns the process-wide chunk deduplication index, or None when Config.DEDUP_ENABLED is off.
+    """
+    global _deduplicator
+    if not Config.DEDUP_ENABLED:
+        return None
+    if _deduplicator is None:
+        with _deduplicator_lock:
+            if _deduplicator is None:
+                ensure_directories()
+                _deduplicator = ChunkDeduplicator()
+    return _deduplicator
+
+def get_collection(collection_name: str, create: bool = True):
+    """
+    Returns a cached handle to a ChromaDB collection.
+
+    Args:
+        collection_name (str): Name of the collection.
+        create (bool): Create the collection if missing; otherwise return None for it.
+    """
+    with _collections_lock:
+        chroma_collection = _collections.get(collection_name)
+        if chroma_collection is None:
+            if create:
+                client = get_chroma_client(collection_name)
+                try:
+                    chroma_collection = client.get_collection(collection_name)
+                except Exception:
+                    # New collections are built with their configured HNSW parameters
+                    chroma_collection = client.get_or_create_collection(
+                        collection_name, metadata=hnsw_metadata(collection_name) or None
+                    )
+            else:
+                try:
+                    chroma_collection = get_chroma_client(collection_name).get_collection(collection_name)
+                except Exception:
+                    # Collection was never created
+                    return None
+            _collections[collection_name] = chroma_collection
+        return chroma_collection
+
+def forget_collection(collection_name: str):
+    """
+    Drops the cached handle, e.g. after the collection was rebuilt under the same name.
+    """
+    with _collections_lock:
+        _collections.pop(collection_name, None)
+
+def hnsw_metadata(collection_name: str) -> dict:
+    """
+    Chroma metadata carrying the configured HNSW parameters of a collection.
+    Shards use their logical collection's settings; collections without an entry
+    in Config.COLLECTION_HNSW (benchmarks) use Chroma's defaults.
+    """
+    settings = Config.COLLECTION_HNSW.get(logical_name(collection_name), {})
+    return {HNSW_METADATA_KEYS[key]: value for key, value in settings.items()}
+
+def make_chunk_id(filename: str, ordinal: int, text: str) -> str:
+    """
+    Builds a deterministic vector ID from the source file, chunk position and content.
+    Re-ingesting the same file yields the same IDs, so vectors are replaced, not duplicated.
+    """
+    source_key = hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+    content_key = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{source_key}-{ordinal:06d}-{content_key}"
+
+def delete_source_vectors(filename: str, collection_names: list[str] | None = None) -> int:
+    """
+    Removes every vector whose 'source' metadata matches the given file.
+    With deduplication on, vectors other files also came from are handed over
+    to one of them instead of being deleted.
+
+    Args:
+        filename (str): Source identifier used at ingestion time.
+        collection_names (list[str]): Collections to purge (logical ones are resolved
+            to the file's shard). Defaults to both indices.
+
+    Returns:
+        int: Number of vectors deleted.
+    """
+    deleted = 0
+    for collection_name in collection_names or [Config.COLLECTION_PUBLIC, Config.COLLECTION_SECURE]:
+        collection_name = route(collection_name, filename)
+        chroma_collection = get_collection(collection_name, create=False)
+        if chroma_collection is None:
+            # Collection was never created, nothing to purge
+            continue
+
+        dedup = get_deduplicator()
+        with dedup.transaction() if dedup else contextlib.nullcontext():
+            handed_over = dedup.release_source(filename, collection_name, forget=True) if dedup else set()
+            existing = chroma_collection.get(where={"source": filename}, include=[])
+            stale = [chunk_id for chunk_id in existing["ids"] if chunk_id not in handed_over]
+            if stale:
+                chroma_collection.delete(ids=stale)
+                deleted += len(stale)
+            if dedup:
+                dedup.sync(chroma_collection, collection_name)
+
+    return deleted
+
+def build_nodes(text_chunks: list[str], filename: str, start_ordinal: int = 0) -> list[BaseNode]:
+    """
+    Converts raw chunks into LlamaIndex nodes with deterministic IDs.
+
+    Args:
+        text_chunks (list[str]): The raw text content to index.
+        filename (str): Source identifier for metadata (lineage tracking).
+        start_ordinal (int): Node ordinal to start from when a file arrives in several windows.
+
+    Returns:
+        list[BaseNode]: Nodes ready for embedding.
+    """
+    # Convert raw strings into LlamaIndex Document objects with source metadata.
+    # The source is lineage only: kept out of the embedded text, so the same paragraph
+    # in two files embeds to the same vector and hits the embedding cache.
+    documents = [
+        Document(
+            text=chunk, 
+            metadata={"source": filename},
+            excluded_embed_metadata_keys=EMBED_EXCLUDED_METADATA_KEYS
+        ) for chunk in text_chunks
+    ]
+
+    # Split exactly like 'from_documents' would, then pin each node ID to
+    # (source, ordinal, content) so a re-ingested file overwrites its old vectors.
+    nodes = Settings.node_parser.get_nodes_from_documents(documents)
+    for ordinal, node in enumerate(nodes, start=start_ordinal):
+        node.id_ = make_chunk_id(filename, ordinal, node.get_content())
+    return nodes
+
+def embed_nodes(nodes: list[BaseNode]) -> list[BaseNode]:
+    """
+    Calculates vectors for the given nodes (using the BAAI model) in one batch.
+    Uses the same metadata-aware text as VectorStoreIndex, so vectors are identical.
+    """
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    with telemetry.span("embed", chunks=len(texts)):
+        embeddings = get_embed_model().get_text_embedding_batch(texts)
+    telemetry.count("chunks_embedded", len(texts))
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+    return nodes
+
+def upsert_nodes(chroma_collection, nodes: list[BaseNode]):
+    """
+    Bulk-writes embedded nodes, using the same record layout as LlamaIndex's
+    ChromaVectorStore so collections stay queryable through LlamaIndex.
+    """
+    telemetry.count("vectors_upserted", len(nodes))
+    for start in range(0, len(nodes), CHROMA_MAX_WRITE_BATCH):
+        batch = nodes[start : start + CHROMA_MAX_WRITE_BATCH]
+        metadatas = []
+        for node in batch:
+            metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=True)
+            # Chroma does not accept None metadata values
+            metadatas.append({key: ("" if value is None else value) for key, value in metadata.items()})
+
+        with telemetry.span("chroma_upsert", vectors=len(batch)):
+            chroma_collection.upsert(
+                ids=[node.node_id for node in batch],
+                embeddings=[node.get_embedding() for node in batch],
+                metadatas=metadatas,
+                documents=[node.get_content(metadata_mode=MetadataMode.NONE) or "" for node in batch]
+            )
+
+def store_nodes(nodes: list[BaseNode], filename: str, collection_name: str) -> bool:
+    """
+    Writes already-embedded nodes into a collection, replacing the file's previous vectors.
+
+    Returns:
+        bool: True if the nodes were written, False on a database error.
+    """
+    try:
+        # 1. entity Selection
+        # Get or create the specific collection (shard) for this security level
+        collection_name = route(collection_name, filename)
+        chroma_collection = get_collection(collection_name)
+
+        # 2. Replace Previous Version
+        # A modified file may now produce fewer chunks; drop its old vectors first.
+        delete_source_vectors(filename, [collection_name])
+
+        # 3. Persist
+        upsert_nodes(chroma_collection, nodes)
+
+        print(f"   [+] Indexed {len(nodes)} chunks from '{filename}' into '{collection_name}'")
+        return True
+
+    except Exception as e:
+        print(f"   [!] Database Error: Could not save to {collection_name} ({e})")
+        return False
+
+@telemetry.timed("save_to_chroma")
+def save_to_chroma(text_chunks: list[str], filename: str, collection_name: str) -> bool:
     """
     Vectorizes text chunks and persists them into the specified ChromaDB collection.
     
@@ -28,38 +319,254 @@ def save_to_chroma(text_chunks: list[str], filename: str, collection_name: str):
         text_chunks (list[str]): The raw text content to index.
         filename (str): Source identifier for metadata (lineage tracking).
         collection_name (str): The target 'Wardrobe' (Secure or Public).
+
+    Returns:
+        bool: True if the chunks were written, False on an embedding or database error.
     """
     if not text_chunks:
-        return
+        return False
 
     try:
-        # 1. entity Selection
-        # Get or create the specific collection for this security level
-        chroma_collection = _chroma_client.get_or_create_collection(collection_name)
-        
-        # 2. LlamaIndex Bridge
-        # Wrap ChromaDB in a LlamaIndex VectorStore adapter
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-        # 3. Document Construction
-        # Convert raw strings into LlamaIndex Document objects with source metadata
-        documents = [
-            Document(
-                text=chunk, 
-                metadata={"source": filename}
-            ) for chunk in text_chunks
-        ]
-
-        # 4. Ingestion & Embedding
-        # This step calculates vectors (using BAAI model) and writes to disk.
-        # We use 'from_documents' to  handle the insertion logic.
-        VectorStoreIndex.from_documents(
-            documents, 
-            storage_context=storage_context
-        )
-        
-        print(f"   [+] Indexed {len(documents)} chunks into '{collection_name}'")
-
+        nodes = embed_nodes(build_nodes(text_chunks, filename))
     except Exception as e:
-        print(f"   [!] Database Error: Could not save to {collection_name} ({e})")
\ No newline at end of file
+        print(f"   [!] Embedding Error: Could not vectorize {filename} ({e})")
+        return False
+
+    return store_nodes(nodes, filename, collection_name)
+
+def dedup_stats() -> dict | None:
+    """
+    Duplicate chunks skipped so far, or None when deduplication is disabled.
+    """
+    return _deduplicator.stats() if _deduplicator else None
+
+def embedding_cache_stats() -> dict | None:
+    """
+    Hit/miss counters of the embedding cache, or None when caching is disabled.
+    """
+    # Never loads the model just to report on it
+    if isinstance(_embed_model, CachedEmbedding):
+        return _embed_model.cache.stats()
+    return None
+
+
+class BufferedVectorWriter:
+    """
+    Accumulates chunks from many files per target collection, then embeds them in
+    large batches and bulk-upserts them into ChromaDB.
+
+    A collection's buffer is flushed once it holds 'batch_size' chunks, once its
+    oldest entry is older than 'max_delay' seconds (checked by a background timer),
+    and on close(). Each add() can register a callback that receives True/False
+    once that file's vectors are written (or failed).
+
+    Large files can be added in several windows: the first one (replace=True)
+    supersedes the file's previous vectors, later ones (replace=False) append,
+    continuing the node ordinals returned by the previous add().
+
+    With a ChunkDeduplicator (Config.DEDUP_ENABLED), each flush first drops chunks
+    already stored in the collection and records their files as extra sources.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = Config.VECTOR_WRITE_BATCH_SIZE,
+        max_delay: float = Config.VECTOR_FLUSH_INTERVAL_SECS,
+        deduplicator: ChunkDeduplicator | None = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.deduplicator = deduplicator or get_deduplicator()
+        self.chunks_written = 0
+        # Duplicates that were linked to a stored chunk instead of being embedded
+        self.chunks_skipped = 0
+        # Duration (secs) of every flush: embedding + delete + upsert
+        self.flush_timings = []
+        self._lock = threading.RLock()
+        # collection -> list of (filename, nodes, on_done, replace)
+        self._pending = {}
+        self._pending_counts = {}
+        self._oldest = {}
+        self._closed = threading.Event()
+        self._timer = None
+        if self.max_delay > 0:
+            self._timer = threading.Thread(target=self._flush_stale_loop, name="vector-flush-timer", daemon=True)
+            self._timer.start()
+
+    def add(
+        self,
+        text_chunks: list[str],
+        filename: str,
+        collection_name: str,
+        on_done=None,
+        start_ordinal: int = 0,
+        replace: bool = True,
+    ) -> int:
+        """
+        Queues a file's chunks (or one window of them) for the given collection.
+
+        Args:
+            text_chunks (list[str]): The raw text content to index.
+            filename (str): Source identifier for metadata (lineage tracking).
+            collection_name (str): The target 'Wardrobe' (Secure or Public).
+            on_done (callable): Optional callback(bool) invoked after the flush.
+            start_ordinal (int): First node ordinal (see build_nodes).
+            replace (bool): Drop the file's previously stored vectors before writing.
+
+        Returns:
+            int: Number of nodes queued, i.e. the ordinal offset for the next window.
+        """
+        nodes = build_nodes(text_chunks, filename, start_ordinal)
+        # Buffers are kept per physical collection, so every flush writes to one shard
+        collection_name = route(collection_name, filename)
+        with self._lock:
+            if replace:
+                # The same file queued twice before a flush: only the latest version counts
+                self._drop_pending(filename, collection_name)
+            self._pending.setdefault(collection_name, []).append((filename, nodes, on_done, replace))
+            self._pending_counts[collection_name] = self._pending_counts.get(collection_name, 0) + len(nodes)
+            self._oldest.setdefault(collection_name, time.monotonic())
+            if self._pending_counts[collection_name] >= self.batch_size:
+                self._flush_collection(collection_name)
+        return len(nodes)
+
+    def flush(self):
+        """
+        Writes every buffered chunk, regardless of thresholds.
+        """
+        with self._lock:
+            for collection_name in list(self._pending):
+                self._flush_collection(collection_name)
+
+    def close(self):
+        """
+        Final flush at pipeline end; stops the background timer.
+        """
+        self._closed.set()
+        if self._timer:
+            self._timer.join()
+        self.flush()
+
+    def _drop_pending(self, filename: str, collection_name: str):
+        entries = self._pending.get(collection_name, [])
+        for entry in [entry for entry in entries if entry[0] == filename]:
+            entries.remove(entry)
+            self._pending_counts[collection_name] -= len(entry[1])
+            if entry[2]:
+                # Superseded before it was written
+                entry[2](False)
+
+    def _flush_stale_loop(self):
+        while not self._closed.wait(min(1.0, self.max_delay)):
+            with self._lock:
+                now = time.monotonic()
+                for collection_name, since in list(self._oldest.items()):
+                    if now - since >= self.max_delay:
+                        self._flush_collection(collection_name)
+
+    def _flush_collection(self, collection_name: str):
+        entries = self._pending.pop(collection_name, [])
+        self._pending_counts.pop(collection_name, None)
+        self._oldest.pop(collection_name, None)
+        if not entries:
+            return
+
+        started = time.perf_counter()
+        try:
+            self._write(collection_name, entries)
+            results = [(entry, True) for entry in entries]
+        except Exception as e:
+            if len(entries) == 1:
+                print(f"   [!] Database Error: Could not save {entries[0][0]} to {collection_name} ({e})")
+                results = [(entries[0], False)]
+            else:
+                # Isolate the offending file(s) by retrying per file
+                print(f"   [!] Batch write to {collection_name} failed, retrying per file ({e})")
+                results = []
+                for entry in entries:
+                    try:
+                        self._write(collection_name, [entry])
+                        results.append((entry, True))
+                    except Exception as file_error:
+                        print(f"   [!] Database Error: Could not save {entry[0]} to {collection_name} ({file_error})")
+                        results.append((entry, False))
+        elapsed = time.perf_counter() - started
+        self.flush_timings.append(elapsed)
+        telemetry.observe("vector_flush_seconds", elapsed, collection=collection_name)
+
+        for (filename, nodes, on_done, _), ok in results:
+            if ok:
+                self.chunks_written += len(nodes)
+            if on_done:
+                on_done(ok)
+
+    def _write(self, collection_name: str, entries: list):
+        chroma_collection = get_collection(collection_name)
+        dedup = self.deduplicator
+        # The dedup index commits only if the vectors were written
+        with dedup.transaction() if dedup else contextlib.nullcontext():
+            all_nodes = [node for _, nodes, _, _ in entries for node in nodes]
+
+            # 1. Duplicate Filter: repeated content is linked to its stored copy, not re-embedded
+            skipped = 0
+            if dedup:
+                all_nodes, skipped = self._deduplicate(chroma_collection, collection_name, entries)
+
+            # 2. One embedding pass for the whole batch (cache lookups included)
+            if all_nodes:
+                embed_nodes(all_nodes)
+
+            # 3. Replace previous versions, then one bulk upsert
+            replaced = list(dict.fromkeys(filename for filename, _, _, replace in entries if replace))
+            if replaced:
+                handed_over = set()
+                if dedup:
+                    keep_ids = {node.node_id for node in all_nodes}
+                    for filename in replaced:
+                        handed_over |= dedup.release_source(filename, collection_name, keep_ids)
+                existing = chroma_collection.get(where={"source": {"$in": replaced}}, include=[])
+                stale = [chunk_id for chunk_id in existing["ids"] if chunk_id not in handed_over]
+                if stale:
+                    chroma_collection.delete(ids=stale)
+            upsert_nodes(chroma_collection, all_nodes)
+
+            # 4. Lineage: owner and extra sources of the chunks touched by this batch
+            if dedup:
+                dedup.sync(chroma_collection, collection_name)
+
+        self.chunks_skipped += skipped
+        file_count = len({filename for filename, _, _, _ in entries})
+        duplicates_note = f" ({skipped} duplicates linked)" if skipped else ""
+        print(f"   [+] Indexed {len(all_nodes)} chunks from {file_count} files into '{collection_name}'{duplicates_note}")
+
+    def _deduplicate(self, chroma_collection, collection_name: str, entries: list) -> tuple[list[BaseNode], int]:
+        """
+        Returns the nodes to embed and the number of duplicates linked instead.
+        """
+        kept_nodes, duplicates = [], []
+        for filename, nodes, _, replace in entries:
+            kept, skipped = self.deduplicator.filter_nodes(nodes, filename, collection_name, replace)
+            kept_nodes.extend(kept)
+            duplicates.extend((filename, node, chunk_id) for node, chunk_id in skipped)
+        if not duplicates:
+            return kept_nodes, 0
+
+        # The index can outlive vectors removed behind its back (collection reset, manual
+        # deletes): a duplicate whose stored copy is gone is written after all.
+        written_now = {node.node_id for node in kept_nodes}
+        referenced = list({chunk_id for _, _, chunk_id in duplicates if chunk_id not in written_now})
+        present = set()
+        for start in range(0, len(referenced), CHROMA_MAX_WRITE_BATCH):
+            present.update(chroma_collection.get(ids=referenced[start : start + CHROMA_MAX_WRITE_BATCH], include=[])["ids"])
+
+        adopted = set()
+        skipped = 0
+        for filename, node, chunk_id in duplicates:
+            if chunk_id in written_now or chunk_id in present or chunk_id in adopted:
+                skipped += 1
+                continue
+            self.deduplicator.adopt(node, filename, collection_name, chunk_id)
+            adopted.add(chunk_id)
+            kept_nodes.append(node)
+
+        return kept_nodes, skipped
@@ -0,0 +1,398 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+# Latency buckets (seconds) shared by every histogram, Prometheus-style upper bounds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+def percentile(values, pct: float) -> float:
+    """
+    Nearest-rank percentile of raw samples (pct in 0-100); 0.0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class _NoopSpan:
+    # Shared by every span() call while telemetry is disabled: no allocation, no clock reads
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, registry, name: str, attrs: dict):
+        self._registry = registry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        duration = time.perf_counter() - self._started
+        self._registry.observe(f"{self.name}_seconds", duration)
+        if exc_type is not None:
+            self._registry.count(f"{self.name}_errors")
+        self._registry._trace(self.name, self._started, duration, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """
+        Attaches attributes known only after the span started (e.g. chunk count).
+        """
+        self.attrs.update(attrs)
+
+
+class Telemetry:
+    """
+    In-process registry of counters, gauges, latency histograms and (optionally) trace events.
+
+    Pipeline code records into the module-level 'telemetry' instance:
+
+        with telemetry.span("pii_scan", file=rel_path):
+            ...
+        telemetry.count("pii_hits", entity="US_SSN")
+
+    Process-pool workers record into their own copy; the executor drains it after
+    each task and merges it into the parent's registry. When disabled, every call
+    returns after a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = Config.TELEMETRY_ENABLED, trace: bool = Config.TELEMETRY_TRACE):
+        self.enabled = enabled
+        self.trace_enabled = enabled and trace
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._pid = os.getpid()
+        with self._lock:
+            # (name, labels) -> value
+            self._counters = {}
+            self._gauges = {}
+            # (name, labels) -> [bucket counts..., sum, count]
+            self._histograms = {}
+            self._trace_events = []
+
+    # --- Recording ---
+
+    def span(self, name: str, **attrs):
+        """
+        Times a block: records '<name>_seconds' (and '<name>_errors' on exceptions).
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, attrs)
+
+    def timed(self, name: str):
+        """
+        Decorator form of span(); the enabled check happens per call.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Adds a latency sample (seconds) to a histogram.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def _trace(self, name: str, started: float, duration: float, attrs: dict):
+        if not self.trace_enabled:
+            return
+        # Chrome trace-event format: open the saved file in chrome://tracing or Perfetto
+        event = {
+            "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+            "ts": round(started * 1e6), "dur": round(duration * 1e6),
+            "args": {key: str(value) for key, value in attrs.items()},
+        }
+        with self._lock:
+            if len(self._trace_events) < Config.TELEMETRY_TRACE_MAX_EVENTS:
+                self._trace_events.append(event)
+
+    # --- Cross-process merge ---
+
+    def drain(self) -> dict | None:
+        """
+        Returns everything recorded so far and resets the registry (pool worker side).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = {
+                "counters": self._counters, "gauges": self._gauges,
+                "histograms": self._histograms, "trace": self._trace_events,
+            }
+            self._counters, self._gauges, self._histograms, self._trace_events = {}, {}, {}, []
+        return data
+
+    def merge(self, data: dict | None):
+        """
+        Folds a drained registry (from a pool worker) into this one.
+        """
+        if not data or not self.enabled:
+            return
+        with self._lock:
+            for key, value in data["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            self._gauges.update(data["gauges"])
+            for key, values in data["histograms"].items():
+                histogram = self._histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+                for index, value in enumerate(values):
+                    histogram[index] += value
+            room = Config.TELEMETRY_TRACE_MAX_EVENTS - len(self._trace_events)
+            self._trace_events.extend(data["trace"][:max(0, room)])
+
+    # --- Export ---
+
+    @staticmethod
+    def _label_text(labels: tuple) -> str:
+        return ",".join(f"{key}={value}" for key, value in labels)
+
+    @staticmethod
+    def _quantile(histogram: list, q: float) -> float:
+        # Linear interpolation inside the bucket holding the q-th sample
+        total = histogram[-1]
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, bucket_count in zip(BUCKETS, histogram):
+            if seen + bucket_count >= rank and bucket_count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = bound if bound != float("inf") else lower
+        return lower
+
+    def snapshot(self) -> dict:
+        """
+        JSON-friendly view: counters, gauges and per-histogram count/sum/mean/p50/p95/p99.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        def label(key):
+            name, labels = key
+            return f"{name}{{{self._label_text(labels)}}}" if labels else name
+
+        return {
+            "counters": {label(key): value for key, value in sorted(counters.items())},
+            "gauges": {label(key): value for key, value in sorted(gauges.items())},
+            "histograms": {
+                label(key): {
+                    "count": values[-1],
+                    "sum_secs": round(values[-2], 6),
+                    "mean_ms": round(values[-2] / values[-1] * 1000, 3) if values[-1] else 0.0,
+                    "p50_ms": round(self._quantile(values, 0.50) * 1000, 3),
+                    "p95_ms": round(self._quantile(values, 0.95) * 1000, 3),
+                    "p99_ms": round(self._quantile(values, 0.99) * 1000, 3),
+                }
+                for key, values in sorted(histograms.items())
+            },
+        }
+
+    def prometheus_text(self) -> str:
+        """
+        Renders the registry in the Prometheus text exposition format.
+        """
+        def labels_text(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        lines = []
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(f"pipeline_{name}_total{labels_text(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            lines.append(f"pipeline_{name}{labels_text(labels)} {value}")
+        for (name, labels), values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, values):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"pipeline_{name}_bucket{labels_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"pipeline_{name}_sum{labels_text(labels)} {values[-2]}")
+            lines.append(f"pipeline_{name}_count{labels_text(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, run_report: dict, path: str = Config.TELEMETRY_REPORT_PATH) -> str | None:
+        """
+        Saves the structured JSON run report (plus the trace file, when tracing is on).
+
+        Returns:
+            str: Path of the report, or None when telemetry is disabled.
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        report = {"generated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "run": run_report, "telemetry": self.snapshot()}
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, default=str)
+
+        if self.trace_enabled:
+            with self._lock:
+                events = list(self._trace_events)
+            with open(Config.TELEMETRY_TRACE_PATH, "w", encoding="utf-8") as handle:
+                json.dump({"traceEvents": events}, handle)
+        return path
+
+
+telemetry = Telemetry()
+
+
+def call_with_telemetry(fn, arg):
+    """
+    Pool-worker wrapper: runs fn(arg) and ships the worker's telemetry back with the result.
+    """
+    if telemetry._pid != os.getpid():
+        # Forked worker: drop whatever the parent had recorded before the fork
+        telemetry.reset()
+    result = fn(arg)
+    return result, telemetry.drain()
+
+
+class MetricsServer:
+    """
+    Optional Prometheus scrape endpoint ('/metrics') on a background thread.
+    Unauthenticated, so it binds to loopback unless TELEMETRY_PROMETHEUS_HOST says otherwise.
+    """
+
+    def __init__(self, port: int = Config.TELEMETRY_PROMETHEUS_PORT, registry: Telemetry = telemetry,
+                 host: str = Config.TELEMETRY_PROMETHEUS_HOST):
+        registry_ref = registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                # Keep the CLI output clean
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry_ref.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        print(f"[*] Prometheus metrics on http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+@contextmanager
+def profiled(label: str, output_dir: str = Config.PROFILE_DIR, top: int = 25):
+    """
+    Opt-in cProfile + tracemalloc capture of a block (meant for a single file).
+
+    Writes '<label>.prof' (open with snakeviz or pstats) and prints the hottest
+    functions by cumulative time and the largest allocation sites.
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    os.makedirs(output_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        safe_label = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in label)
+        prof_path = os.path.join(output_dir, f"{safe_label}.prof")
+        profiler.dump_stats(prof_path)
+
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(top)
+        print(buffer.getvalue())
+
+        print(f"[*] Peak traced memory: {peak / (1024 * 1024):.1f} MB. Top allocation sites:")
+        for stat in snapshot.statistics("lineno")[:15]:
+            print(f"   {stat.size / 1024:>10.1f} KB  {stat.traceback}")
+        print(f"[OK] cProfile data saved to {prof_path}")
@@ -1,15 +1,10 @@
-import chromadb
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import VectorStoreIndex, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from config import Config
+from retrieval.service import ACCESS_RESTRICTED, RetrievalService
 
-# 1. Setup the same Local Embedding logic (Must match ingestion!)
-print("[*] Loading Local Embedding Model (BAAI/bge-small-en-v1.5)...")
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
-
-# 2. Connect to the Disk Database
-chroma_client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+# 1. One warm service for every query: the same local embedding model as ingestion
+# (loaded once) and cached collection handles, instead of a new index per query.
+print(f"[*] Loading Local Embedding Model ({Config.EMBEDDING_MODEL_NAME}, {Config.EMBEDDING_BACKEND} backend)...")
+service = RetrievalService(top_k=1).warm()
 
 def perform_retrieval_test(index_name, query_text):
     """
@@ -19,28 +14,14 @@ def perform_retrieval_test(index_name, query_text):
     print(f"\n Testing Index: '{index_name}'")
     print(f"   Query: {query_text}")
 
-    # Get the specific collection
-    try:
-        chroma_collection = chroma_client.get_collection(index_name)
-    except Exception:
-        print(f"   Target Index '{index_name}' not found! Did you run ingestion?")
-        return
-
-    # Load it into LlamaIndex
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    index = VectorStoreIndex.from_vector_store(
-        vector_store,
-        embed_model=Settings.embed_model
-    )
-
-    # Create a retriever (Not a chatbot, just a fetcher)
-    retriever = index.as_retriever(similarity_top_k=1)
-    results = retriever.retrieve(query_text)
+    # The test reads both indices explicitly, so it runs with the restricted access level
+    results = service.search(query_text, access_level=ACCESS_RESTRICTED, collections=[index_name])
 
     if results:
         print(f"   ✅ Found Match! (Score: {results[0].score:.2f})")
         print(f"    * Content: {results[0].text[:200]}...") # Show first 200 chars
-        print(f"    * Source: {results[0].metadata['source']}")
+        print(f"    * Source: {results[0].source}")
+        print(f"    * Lineage: {results[0].lineage['source_urn']} -> {results[0].lineage['vector_index_urn']}")
     else:
         print("   ❌ No relevant data found.")
 
@@ -59,4 +40,15 @@ if __name__ == "__main__":
     print("\n--- COMPLIANCE CROSS CHECK ---")
     # We ask the PUBLIC index for a SECRET. It should NOT find it.
     # It might find a random "safe" page, but not the actual credit card.
-    perform_retrieval_test(Config.COLLECTION_PUBLIC, "Show me the credit card details for Invoice 1.")
\ No newline at end of file
+    perform_retrieval_test(Config.COLLECTION_PUBLIC, "Show me the credit card details for Invoice 1.")
+
+    # --- TEST 4: ACCESS ENFORCEMENT ---
+    # A public caller must not be able to target the secure index at all.
+    print("\n--- ACCESS LEVEL CHECK ---")
+    try:
+        service.search("What is the IBAN number for the payment?", access_level="public", collections=[Config.COLLECTION_SECURE])
+        print("   ❌ Public caller was allowed to read the secure index!")
+    except PermissionError as e:
+        print(f"   ✅ Denied: {e}")
+
+    service.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline runs from src/ and imports its packages top-level (config, storage, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
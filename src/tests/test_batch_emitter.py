@@ -0,0 +1,119 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("datahub")
+
+import datahub.metadata.schema_classes as models  # noqa: E402
+from datahub.emitter.mcp import MetadataChangeProposalWrapper  # noqa: E402
+from governance.batch_emitter import BatchingEmitter  # noqa: E402
+
+OWNERSHIP = MetadataChangeProposalWrapper(
+    entityUrn="urn:li:dataset:(urn:li:dataPlatform:file,finance/q1.txt,PROD)",
+    aspect=models.StatusClass(removed=False),
+)
+
+
+class FlakyEmitter:
+    """
+    Fails the first 'failures' batches; the first one can be held on the wire with 'gate'.
+    """
+
+    def __init__(self, failures: int = 1, gate: threading.Event | None = None):
+        self.failures = failures
+        self.gate = gate
+        self.delivered = []
+
+    def emit_mcps(self, mcps):
+        if self.gate:
+            self.gate.wait()
+            self.gate = None
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("GMS unavailable")
+        self.delivered.extend(mcps)
+
+
+def make_batcher(emitter, batch_size: int = 100) -> BatchingEmitter:
+    return BatchingEmitter(emitter, batch_size=batch_size, flush_interval=0, max_retries=0, retry_backoff=0)
+
+
+def wait_for_submissions(batcher: BatchingEmitter, count: int):
+    deadline = time.monotonic() + 5
+    while batcher.stats["submitted"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_aspect_of_a_dropped_batch_is_sent_again():
+    emitter = FlakyEmitter(failures=1)
+    batcher = make_batcher(emitter)
+    outcomes = []
+
+    batcher.submit([OWNERSHIP], on_done=outcomes.append)
+    batcher.flush()
+    batcher.submit([OWNERSHIP], on_done=outcomes.append)
+    batcher.close()
+
+    assert outcomes == [False, True]
+    assert emitter.delivered == [OWNERSHIP]
+
+
+def test_duplicate_waits_for_the_batch_carrying_its_aspect():
+    gate = threading.Event()
+    emitter = FlakyEmitter(failures=1, gate=gate)
+    # batch_size=1: the first file's batch goes on the wire (and hangs) right away
+    batcher = make_batcher(emitter, batch_size=1)
+    outcomes = {}
+
+    batcher.submit([OWNERSHIP], on_done=lambda ok: outcomes.setdefault("first", ok))
+    batcher.submit([OWNERSHIP], on_done=lambda ok: outcomes.setdefault("second", ok))
+    wait_for_submissions(batcher, 2)
+    # The second file was folded into the in-flight batch, so it must not report success yet
+    assert "second" not in outcomes
+
+    gate.set()
+    batcher.flush()
+    assert outcomes == {"first": False, "second": False}
+
+    batcher.submit([OWNERSHIP], on_done=lambda ok: outcomes.setdefault("third", ok))
+    batcher.close()
+    assert outcomes["third"] is True
+    assert emitter.delivered == [OWNERSHIP]
+
+
+def test_aspect_is_sent_again_after_changing_back():
+    emitter = FlakyEmitter(failures=0)
+    batcher = make_batcher(emitter)
+    version_a = OWNERSHIP
+    version_b = MetadataChangeProposalWrapper(entityUrn=OWNERSHIP.entityUrn, aspect=models.StatusClass(removed=True))
+    outcomes = []
+
+    # A -> B -> A within one long-lived emitter (the watch daemon)
+    for mcp in (version_a, version_b, version_a):
+        batcher.submit([mcp], on_done=outcomes.append)
+        batcher.flush()
+    batcher.close()
+
+    assert outcomes == [True, True, True]
+    assert emitter.delivered == [version_a, version_b, version_a]
+
+
+class BrokenAspect:
+    def to_obj(self):
+        raise ValueError("not serializable")
+
+
+def test_broken_submission_fails_without_stopping_the_batcher():
+    emitter = FlakyEmitter(failures=0)
+    batcher = make_batcher(emitter)
+    outcomes = []
+    broken = SimpleNamespace(entityUrn=OWNERSHIP.entityUrn, aspect=BrokenAspect())
+
+    batcher.submit([broken], on_done=lambda ok: outcomes.append(("broken", ok)))
+    batcher.submit([OWNERSHIP], on_done=lambda ok: outcomes.append(("valid", ok)))
+    # Must not hang: the batching thread survives the broken submission
+    batcher.close()
+
+    assert outcomes == [("broken", False), ("valid", True)]
+    assert emitter.delivered == [OWNERSHIP]
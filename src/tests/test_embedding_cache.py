@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core import Settings  # noqa: E402
+from llama_index.core.base.embeddings.base import BaseEmbedding  # noqa: E402
+from llama_index.core.bridge.pydantic import PrivateAttr  # noqa: E402
+from llama_index.core.node_parser import SentenceSplitter  # noqa: E402
+from storage import vector_store  # noqa: E402
+from storage.embedding_cache import CachedEmbedding, EmbeddingCache  # noqa: E402
+
+BOILERPLATE = "This document is confidential and intended solely for the use of the addressee."
+
+
+class CountingEmbedding(BaseEmbedding):
+    """
+    Deterministic stand-in for the model that records every text it embeds.
+    """
+
+    _embedded: list = PrivateAttr(default_factory=list)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CountingEmbedding"
+
+    @property
+    def embedded(self) -> list[str]:
+        return self._embedded
+
+    def _vector(self, text: str) -> list[float]:
+        return [float(len(text)), float(sum(map(ord, text)) % 997), 1.0]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        self._embedded.append(text)
+        return self._vector(text)
+
+
+@pytest.fixture
+def cached_model(tmp_path, monkeypatch):
+    inner = CountingEmbedding(model_name="counting")
+    model = CachedEmbedding(inner, EmbeddingCache(db_path=str(tmp_path / "cache.db")))
+    monkeypatch.setattr(vector_store, "_embed_model", model)
+    # Whitespace tokenizer: no tokenizer download, and each short chunk stays one node
+    monkeypatch.setattr(Settings, "node_parser", SentenceSplitter(chunk_size=512, chunk_overlap=0, tokenizer=str.split))
+    return inner, model
+
+
+def test_shared_paragraph_in_two_files_hits_the_cache(cached_model):
+    inner, model = cached_model
+
+    first = vector_store.embed_nodes(vector_store.build_nodes([BOILERPLATE, "Quarterly revenue grew."], "finance/q1.txt"))
+    second = vector_store.embed_nodes(vector_store.build_nodes([BOILERPLATE, "Hiring is paused."], "hr/policy.txt"))
+
+    # The boilerplate was embedded once, for the first file; the second file was served from the cache
+    assert inner.embedded.count(BOILERPLATE) == 1
+    assert model.cache.hits == 1
+    assert first[0].get_embedding() == second[0].get_embedding()
+    # The source stays on the node for lineage
+    assert second[0].metadata["source"] == "hr/policy.txt"
+
+
+def test_embedded_text_excludes_the_source(cached_model):
+    inner, _ = cached_model
+
+    vector_store.embed_nodes(vector_store.build_nodes(["Hiring is paused."], "hr/policy.txt"))
+
+    assert inner.embedded == ["Hiring is paused."]
@@ -0,0 +1,121 @@
+import pytest
+from ingestion import pii_scanner
+from ingestion.pii_scanner import (
+    CONFIDENCE_THRESHOLD,
+    MAX_ANALYSIS_CHUNK_SIZE,
+    PATTERN_ENTITIES,
+    _may_contain_pii,
+    scan_chunks_for_pii,
+    scan_for_pii,
+)
+
+# Chunks on the edge of the prefilter: every pattern entity in its common spellings,
+# digit runs that are not PII, and text with neither '@' nor digits
+EMAILS = [
+    "Reach me at jane.doe@example.com for details.",
+    "Billing contact: j.doe+invoices@corp.example.org",
+]
+SSNS = [
+    "SSN: 078-05-1120",
+    "Employee social security number 078 05 1120 is on file.",
+    "social security number 078051120",
+]
+CARDS = [
+    "Card 4111-1111-1111-1111 expires soon.",
+    "Credit card 4111 1111 1111 1111",
+    "Visa 4111111111111111 was charged.",
+]
+OTHER_CANDIDATES = [
+    "Call (212) 555-0143 tomorrow morning.",
+    "IBAN: DE89 3704 0044 0532 0130 00",
+    "Invoice total 48213 due 2024-05-01",
+]
+NAMES = [
+    "John Smith approved the transfer for Maria Garcia.",
+    "Please forward the contract to Dr. Emily Chen in Boston.",
+]
+NO_CANDIDATES = [
+    "Quarterly revenue grew by 4 percent in 2023.",
+    "The meeting moved to Thursday.",
+    "",
+    "abc",
+]
+EDGE_CHUNKS = EMAILS + SSNS + CARDS + OTHER_CANDIDATES + NAMES + NO_CANDIDATES
+
+
+@pytest.mark.parametrize("chunk", EMAILS + SSNS + CARDS + OTHER_CANDIDATES)
+def test_prefilter_passes_pattern_candidates(chunk):
+    assert _may_contain_pii(chunk)
+
+
+@pytest.mark.parametrize("chunk", NAMES + NO_CANDIDATES)
+def test_prefilter_skips_text_without_candidates(chunk):
+    assert not _may_contain_pii(chunk)
+
+
+@pytest.mark.parametrize("chunk", NAMES)
+def test_prefilter_passes_names_when_person_is_a_target(monkeypatch, chunk):
+    monkeypatch.setattr(pii_scanner, "TARGET_ENTITIES", [*pii_scanner.TARGET_ENTITIES, "PERSON"])
+    assert _may_contain_pii(chunk)
+
+
+# --- Equivalence with the original per-chunk, full-NLP Presidio scan ---
+
+def _reference_engine():
+    presidio_analyzer = pytest.importorskip("presidio_analyzer")
+    try:
+        return presidio_analyzer.AnalyzerEngine()
+    except (OSError, SystemExit) as e:
+        # spaCy model not downloaded
+        pytest.skip(f"Presidio NLP engine unavailable ({e})")
+
+
+def _reference_scan(analyzer, entities: list[str], text_content: str) -> set[str]:
+    # The original behaviour: full NLP pipeline, no prefilter, one analyze() per chunk
+    if not text_content or len(text_content.strip()) < 5:
+        return set()
+    detected = set()
+    for i in range(0, len(text_content), MAX_ANALYSIS_CHUNK_SIZE):
+        results = analyzer.analyze(
+            text=text_content[i : i + MAX_ANALYSIS_CHUNK_SIZE],
+            entities=entities,
+            language='en'
+        )
+        detected.update(r.entity_type for r in results if r.score >= CONFIDENCE_THRESHOLD)
+    return detected
+
+
+@pytest.fixture
+def fresh_analyzers(monkeypatch):
+    # Analyzers are built per process on first use; rebuild them for the patched settings
+    monkeypatch.setattr(pii_scanner, "_analyzer", None)
+    monkeypatch.setattr(pii_scanner, "_batch_analyzer", None)
+
+
+@pytest.fixture(scope="module")
+def reference_engine():
+    return _reference_engine()
+
+
+def _assert_matches_reference(reference_engine, entities: list[str]):
+    expected = [_reference_scan(reference_engine, entities, chunk) for chunk in EDGE_CHUNKS]
+    batched = [set(found) for found in scan_chunks_for_pii(EDGE_CHUNKS)]
+    per_chunk = [set(scan_for_pii(chunk)) for chunk in EDGE_CHUNKS]
+
+    assert batched == expected
+    assert per_chunk == expected
+    # The fixture is meaningful only if the edge cases actually produce findings
+    assert any(expected)
+
+
+def test_batched_scan_matches_reference(reference_engine, fresh_analyzers):
+    _assert_matches_reference(reference_engine, pii_scanner.TARGET_ENTITIES)
+
+
+def test_batched_scan_matches_reference_with_person(reference_engine, fresh_analyzers, monkeypatch):
+    entities = [*pii_scanner.TARGET_ENTITIES, "PERSON"]
+    monkeypatch.setattr(pii_scanner, "TARGET_ENTITIES", entities)
+    # 'auto' keeps NER on once a non-pattern entity is configured
+    monkeypatch.setattr(pii_scanner, "_PATTERN_ONLY", set(entities) <= PATTERN_ENTITIES)
+
+    _assert_matches_reference(reference_engine, entities)